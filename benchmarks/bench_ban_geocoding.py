@@ -0,0 +1,58 @@
+"""
+Benchmark BAN geocoding : async engine vs legacy thread pool.
+Runs against a local stand-in BAN server (no network needed).
+
+usage : python benchmarks/bench_ban_geocoding.py --n 300 --latency 0.05 --threads 10
+"""
+import os
+import sys
+import time
+import argparse
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+TESTS_DIR = os.path.join(ROOT_DIR, 'tests')
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, TESTS_DIR)
+
+from conftest import set_config
+from standins import FakeBanServer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=300, help="number of addresses")
+    parser.add_argument("--latency", type=float, default=0.05, help="server latency (s)")
+    parser.add_argument("--threads", type=int, default=10, help="threads for the legacy path")
+    args = parser.parse_args()
+
+    set_config(os.path.join(TESTS_DIR, 'config'), os.path.join(TESTS_DIR, 'data'))
+    from src.dpe_enedis_ademe_etl_engine.pipelines import DataEnedisAdemeExtractor
+    extractor = DataEnedisAdemeExtractor()
+    adresses = [f"{i} RUE DU BENCHMARK 69259 Vénissieux" for i in range(args.n)]
+
+    with FakeBanServer(latency=args.latency) as server:
+        extractor.get_url_ban_filter_on_adresse = server.url_for_adresse
+
+        s = time.perf_counter()
+        res_threads = extractor.multithreaded_api_request(
+            num_threads=args.threads,
+            api_call_func=extractor.call_ban_api_individually,
+            obj_list=adresses,
+            rate_limit=30
+        )
+        t_threads = time.perf_counter() - s
+
+        s = time.perf_counter()
+        res_async = extractor.request_ban_async(adresses)
+        t_async = time.perf_counter() - s
+
+    n_ok_threads = len([r for r in res_threads if r is not None])
+    n_ok_async = len([r for r in res_async if r is not None])
+    print(f"{'engine':<10}{'found':>8}{'wall (s)':>12}{'req/s':>10}")
+    print(f"{'threads':<10}{n_ok_threads:>8}{t_threads:>12.2f}{args.n / t_threads:>10.1f}")
+    print(f"{'async':<10}{n_ok_async:>8}{t_async:>12.2f}{args.n / t_async:>10.1f}")
+    print(f"speedup x{t_threads / t_async:.1f} (async engine capped at {extractor.ban_rate_limit} req/s)")
+
+
+if __name__ == "__main__":
+    main()
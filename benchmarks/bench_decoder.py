@@ -0,0 +1,84 @@
+"""
+Benchmark of the decoding of Ademe `lines` pages into `ademe_data` :
+legacy `res.json()` + list of dicts + `pd.DataFrame(list_of_dicts)` vs the columnar
+decoder (orjson + `ColumnarBuilder` with the typed Ademe schema, pages dropped once in columns).
+Pages are built from the lines of tests/data/example_extract_output.parquet (no network).
+
+usage : python benchmarks/bench_decoder.py --n-lines 200000 --page-size 1000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+import pandas as pd
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+TESTS_DIR = os.path.join(ROOT_DIR, 'tests')
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, TESTS_DIR)
+
+from conftest import set_config
+set_config(os.path.join(TESTS_DIR, 'config'), os.path.join(TESTS_DIR, 'data'))
+from standins import StandinDataset
+from src.dpe_enedis_ademe_etl_engine.scripts.decoder import ColumnarBuilder, ADEME_SCHEMA, loads
+
+
+def make_pages(n_lines, page_size):
+    """JSON payloads of data-fair pages (bytes, as received), lines copied from the seed with unique _id."""
+    dataset = StandinDataset.from_extract_output(os.path.join(TESTS_DIR, 'data', 'example_extract_output.parquet'))
+    seed = [line for lines in dataset.ademe_lines.values() for line in lines]
+    pages = []
+    for start in range(0, n_lines, page_size):
+        lines = [{**seed[i % len(seed)], "_id": f"dpe{i:09d}"} for i in range(start, min(start + page_size, n_lines))]
+        pages.append(json.dumps({"total": n_lines, "results": lines}, default=str).encode("utf-8"))
+    return pages
+
+
+def legacy(pages):
+    lines = []
+    for content in pages:
+        lines.extend(json.loads(content).get("results", []))
+    return pd.DataFrame(lines)
+
+
+def columnar(pages):
+    builder = ColumnarBuilder(ADEME_SCHEMA)
+    for content in pages:
+        builder.extend(loads(content).get("results", []))
+    return builder.to_pandas()
+
+
+def measure(func, pages):
+    """Wall time of a plain run, then peak memory of a second, traced run."""
+    s = time.perf_counter()
+    res = func(pages)
+    wall = time.perf_counter() - s
+    del res
+    tracemalloc.start()
+    res = func(pages)
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return res, wall, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-lines", type=int, default=200_000, help="number of Ademe lines")
+    parser.add_argument("--page-size", type=int, default=1000, help="lines per page")
+    args = parser.parse_args()
+
+    pages = make_pages(args.n_lines, args.page_size)
+    print(f"{len(pages)} pages, {sum(len(p) for p in pages) / 2**20:.0f} MiB of json")
+    print(f"{'decoder':<10}{'rows':>10}{'cols':>6}{'wall (s)':>10}{'peak (MiB)':>12}")
+    results = {}
+    for name, func in (("legacy", legacy), ("columnar", columnar)):
+        df, wall, peak = measure(func, pages)
+        results[name] = wall
+        print(f"{name:<10}{len(df):>10}{df.shape[1]:>6}{wall:>10.2f}{peak:>12.0f}")
+    print(f"speedup x{results['legacy'] / results['columnar']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark of the Enedis csv ingestion (`load_batch_input` + `add_enedis_columns`) :
+legacy `pd.read_csv(sep=';')` + per-row `code_iris.apply(lambda r: int(r[:2]))`
+vs the pyarrow block reader (typed, schema columns, department filtered while reading)
++ vectorized derived columns. The csv is generated from tests/data/example_extract_input.csv.
+
+usage : python benchmarks/bench_enedis_csv.py --n-rows 2000000 [--departement 6]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+TESTS_DIR = os.path.join(ROOT_DIR, 'tests')
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, TESTS_DIR)
+
+from conftest import set_config
+set_config(os.path.join(TESTS_DIR, 'config'), os.path.join(TESTS_DIR, 'data'))
+os.environ["SCHEMA_INPUT_DATA_FILEPATH"] = os.path.join(TESTS_DIR, 'ressources', 'schemas', 'schema_input_data.json')
+
+
+def make_csv(fpath, n_rows, n_departements=10):
+    seed = pd.read_csv(os.path.join(TESTS_DIR, 'data', 'example_extract_input.csv'), dtype=str, index_col=0)
+    df = seed.sample(n_rows, replace=True, random_state=0, ignore_index=True)
+    dept = np.char.zfill((np.arange(n_rows) % n_departements + 1).astype(str), 2)
+    df["code_iris"] = np.char.add(dept, df["code_iris"].str[2:].to_numpy().astype(str))
+    df["adresse"] = np.char.add(np.arange(n_rows).astype(str), " " + df["adresse"].to_numpy().astype(str))
+    df.to_csv(fpath, sep=";", index=False)
+
+
+def legacy(fpath, departement):
+    df = pd.read_csv(fpath, sep=';')
+    df['code_departement'] = df['code_iris'].astype(str).str.zfill(9).apply(lambda r: int(r[:2]))
+    df['full_adress'] = df['adresse'] + ' ' + df['code_commune'].astype('str') + ' ' + df['nom_commune'].astype('str')
+    return df[df['code_departement'] == departement] if departement else df
+
+
+def arrow(extractor, fpath, departement):
+    extractor.PATH_FILE_INPUT_ENEDIS_CSV = fpath
+    extractor.input = extractor.read_enedis_csv(fpath, departement)
+    extractor.add_enedis_columns.fn(extractor)
+    return extractor.input
+
+
+def measure(func):
+    s = time.perf_counter()
+    res = func()
+    wall = time.perf_counter() - s
+    del res
+    tracemalloc.start()
+    res = func()
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return res, wall, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-rows", type=int, default=2_000_000, help="rows of the generated csv")
+    parser.add_argument("--departement", type=int, default=None, help="keep only this department")
+    args = parser.parse_args()
+
+    from src.dpe_enedis_ademe_etl_engine.pipelines import DataEnedisAdemeExtractor
+    extractor = DataEnedisAdemeExtractor(use_geocode_cache=False)
+    with tempfile.TemporaryDirectory() as tmp:
+        fpath = os.path.join(tmp, "conso_enedis.csv")
+        make_csv(fpath, args.n_rows)
+        print(f"csv : {args.n_rows} rows, {os.path.getsize(fpath) / 2**20:.0f} MiB")
+        print(f"{'reader':<10}{'rows':>10}{'wall (s)':>10}{'peak (MiB)':>12}")
+        walls = {}
+        for name, func in (("legacy", lambda: legacy(fpath, args.departement)), ("arrow", lambda: arrow(extractor, fpath, args.departement))):
+            df, walls[name], peak = measure(func)
+            print(f"{name:<10}{len(df):>10}{walls[name]:>10.2f}{peak:>12.0f}")
+        print(f"speedup x{walls['legacy'] / walls['arrow']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark of `DataEnedisAdemeExtractor.extract()` end to end, against local stand-in
+Enedis / BAN / Ademe servers seeded from tests/data/example_extract_output.parquet
+(no network needed). Reports, per provider : requests, requests/s, p50 / p99 latency
+seen by the client, throttled (429) and failed (5xx) answers, and the extract wall time.
+
+usage : python benchmarks/bench_extract.py --scale 200 --latency 0.05 --jitter 0.05 \
+            --ban-rate-limit 50 --ademe-rate-limit 10 --error-rate 0.01 --ademe-engine batch
+"""
+import os
+import sys
+import time
+import argparse
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+TESTS_DIR = os.path.join(ROOT_DIR, 'tests')
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, TESTS_DIR)
+
+from conftest import set_config
+from standins import StandinDataset, FakeEnedisServer, FakeBanServer, FakeAdemeServer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=100, help="copies of each seed address")
+    parser.add_argument("--latency", type=float, default=0.05, help="server latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="random extra latency (s)")
+    parser.add_argument("--ban-rate-limit", type=float, default=None, help="BAN stand-in quota (req/s, 429 above)")
+    parser.add_argument("--ademe-rate-limit", type=float, default=None, help="Ademe stand-in quota (req/s, 429 above)")
+    parser.add_argument("--max-concurrent", type=int, default=None, help="stand-ins capacity (429 above)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of a 503")
+    parser.add_argument("--ban-engine", default="async", choices=["async", "threads"])
+    parser.add_argument("--ademe-engine", default="batch", choices=["batch", "async", "threads", "mirror"])
+    parser.add_argument("--enedis-source", default="export", choices=["export", "records"])
+    parser.add_argument("--chunk-size", type=int, default=None, help="streaming mode (rows per chunk)")
+    parser.add_argument("--threads", type=int, default=10, help="threads for the legacy engines")
+    args = parser.parse_args()
+
+    set_config(os.path.join(TESTS_DIR, 'config'), os.path.join(TESTS_DIR, 'data'))
+    from src.dpe_enedis_ademe_etl_engine.pipelines import DataEnedisAdemeExtractor
+    extractor = DataEnedisAdemeExtractor(use_geocode_cache=False)
+    dataset = StandinDataset.from_extract_output(os.path.join(TESTS_DIR, 'data', 'example_extract_output.parquet')).scaled(args.scale)
+    department = dataset.enedis["code_departement"].iloc[0]
+    annee = int(dataset.enedis["annee"].iloc[0])
+    common = dict(latency=args.latency, jitter=args.jitter, max_concurrent=args.max_concurrent, error_rate=args.error_rate)
+
+    with FakeEnedisServer(dataset.enedis, **common) as enedis, \
+            FakeBanServer(features=dataset.ban_features, rate_limit=args.ban_rate_limit, **common) as ban, \
+            FakeAdemeServer(
+                lines_by_id=dataset.ademe_lines, department_lines=dataset.department_lines(),
+                rate_limit=args.ademe_rate_limit, **common) as ademe:
+        extractor.enedis_base_url, extractor.ban_base_url, extractor.ademe_base_url = enedis.url, ban.url, ademe.url
+        extractor.ademe_mirror.base_url = f"{ademe.url}/data-fair/api/v1/datasets/dpe03existant/lines"
+        s = time.perf_counter()
+        extractor.extract(
+            code_departement=int(department),
+            annee=annee,
+            rows=-1,
+            n_threads_for_querying=args.threads,
+            save_schema=False,
+            ban_engine=args.ban_engine,
+            ademe_engine=args.ademe_engine,
+            enedis_source=args.enedis_source,
+            checkpoint=False,
+            chunk_size=args.chunk_size
+        )
+        wall = time.perf_counter() - s
+        servers = {"enedis": enedis, "ban": ban, "ademe": ademe}
+
+    stats = extractor.http.controller_stats()
+    print(f"\n{len(dataset.enedis)} Enedis rows, {len(dataset.ban_features)} addresses, "
+          f"{sum(len(v) for v in dataset.ademe_lines.values())} Ademe lines")
+    print(f"{'provider':<10}{'requests':>10}{'req/s':>9}{'p50 (ms)':>10}{'p99 (ms)':>10}{'429':>7}{'5xx':>7}")
+    for name, server in servers.items():
+        c = stats.get(extractor.http.host_of(server.url), {})
+        n_5xx = sum(n for status, n in server.status_counts.items() if status >= 500)
+        print(f"{name:<10}{server.n_requests:>10}{server.n_requests / wall:>9.1f}"
+              f"{1000 * c.get('p50_latency_s', 0):>10.1f}{1000 * c.get('p99_latency_s', 0):>10.1f}"
+              f"{server.status_counts.get(429, 0):>7}{n_5xx:>7}")
+    output = f"{len(extractor.output_parts)} silver parts" if args.chunk_size else f"{len(extractor.output)} rows"
+    print(f"wall time {wall:.2f}s, output : {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark of the final merge (Ademe lines left join Enedis+BAN rows on the id_ban + dedup) :
+legacy `pd.merge(...).drop_duplicates()` over every column vs the hashed join engine
+(integer key codes, pyarrow hash join, 64-bit row hash on the declared keys).
+Synthetic frames shaped like the silver data (no network, no file).
+
+usage : python benchmarks/bench_merge.py --n-ademe 1000000 --n-cols 60 [--skip-legacy]
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+TESTS_DIR = os.path.join(ROOT_DIR, 'tests')
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, TESTS_DIR)
+
+from conftest import set_config
+set_config(os.path.join(TESTS_DIR, 'config'), os.path.join(TESTS_DIR, 'data'))
+from src.dpe_enedis_ademe_etl_engine.scripts.join_engine import hash_join
+
+
+def make_frames(n_ademe, n_cols, lines_per_id=8, seed=0):
+    """Ademe lines (n_cols columns, half float half string) and the Enedis+BAN rows of their id_ban."""
+    rng = np.random.default_rng(seed)
+    n_ids = max(1, n_ademe // lines_per_id)
+    ids = np.array([f"69{i % 1000:03d}_{i:07d}" for i in range(n_ids)], dtype=object)
+    ademe = {"_id_ademe": np.array([f"dpe{i:09d}" for i in range(n_ademe)], dtype=object)}
+    ademe["identifiant_ban_ademe"] = pd.array(ids[rng.integers(0, n_ids, n_ademe)], dtype="string")
+    labels = np.array(list("ABCDEFG"), dtype=object)
+    for k in range(n_cols - 2):
+        ademe[f"col_{k}_ademe"] = rng.random(n_ademe) if k % 2 == 0 else labels[rng.integers(0, 7, n_ademe)]
+    ademe = pd.DataFrame(ademe)
+    # 1 ligne enedis par id_ban (+2% de doublons exacts, comme une adresse listée deux fois)
+    enedis = pd.DataFrame({
+        "id_BAN": pd.array(ids, dtype="string"),
+        "full_adress_enedis": np.array([f"{i} RUE DU BENCH 69259" for i in range(n_ids)], dtype=object),
+        "annee_enedis": "2023",
+        "segment_de_client_enedis": "RESIDENTIEL",
+        "consommation_annuelle_totale_de_l_adresse_mwh_enedis": rng.random(n_ids) * 100,
+        "nombre_de_logements_enedis": rng.integers(1, 200, n_ids),
+    })
+    enedis = pd.concat([enedis, enedis.sample(frac=0.02, random_state=seed)], ignore_index=True)
+    return ademe, enedis
+
+
+def measure(func):
+    """Wall time of a plain run, then peak memory of a second, traced run (tracemalloc slows allocations down)."""
+    s = time.perf_counter()
+    res = func()
+    wall = time.perf_counter() - s
+    del res
+    tracemalloc.start()
+    res = func()
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return res, wall, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-ademe", type=int, default=1_000_000, help="number of Ademe lines")
+    parser.add_argument("--n-cols", type=int, default=60, help="number of Ademe columns")
+    parser.add_argument("--skip-legacy", action="store_true", help="only run the hashed join")
+    args = parser.parse_args()
+
+    ademe, enedis = make_frames(args.n_ademe, args.n_cols)
+    print(f"ademe : {ademe.shape}, enedis+ban : {enedis.shape}")
+    dedup_keys = ["_id_ademe", "full_adress_enedis", "annee_enedis", "segment_de_client_enedis"]
+
+    hashed, t_hashed, m_hashed = measure(lambda: hash_join(
+        ademe, enedis, "identifiant_ban_ademe", "id_BAN", how="left", dedup_subset=dedup_keys))
+    print(f"{'engine':<10}{'rows':>12}{'wall (s)':>10}{'peak (MiB)':>12}")
+    print(f"{'hashed':<10}{len(hashed):>12}{t_hashed:>10.2f}{m_hashed:>12.0f}")
+    if not args.skip_legacy:
+        legacy, t_legacy, m_legacy = measure(lambda: pd.merge(
+            ademe, enedis, how="left", left_on="identifiant_ban_ademe", right_on="id_BAN").drop_duplicates().reset_index(drop=True))
+        print(f"{'legacy':<10}{len(legacy):>12}{t_legacy:>10.2f}{m_legacy:>12.0f}")
+        assert len(legacy) == len(hashed)
+        print(f"speedup x{t_legacy / t_hashed:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark of the S3 storage of a zone file (non-LOCAL `save_parquet_file` / `load_parquet_file`) :
+legacy JSON lines uploaded in one piece and parsed by `pd.read_json` vs parquet written by a
+streaming multipart upload and read back by parallel ranged GETs.
+Runs against the in-memory S3 stand-in (tests/standins.py), on a synthetic frame shaped like the silver data.
+
+usage : python benchmarks/bench_s3_parquet.py --n-rows 1000000 --codec snappy
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from io import BytesIO
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+TESTS_DIR = os.path.join(ROOT_DIR, 'tests')
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, TESTS_DIR)
+
+from conftest import set_config
+set_config(os.path.join(TESTS_DIR, 'config'), os.path.join(TESTS_DIR, 'data'))
+from standins import FakeS3Server
+from src.dpe_enedis_ademe_etl_engine.scripts.filestorage_helper import FileStorageConnexion
+
+
+def make_frame(n_rows, seed=0):
+    """Silver-like rows : codes and labels as text, consumptions as floats, counts as nullable ints."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "id_BAN": pd.array([f"69{i % 1000:03d}_{i:07d}" for i in range(n_rows)], dtype="string"),
+        "full_adress": pd.array([f"{i % 500} RUE DU BENCH 69259 Vénissieux" for i in range(n_rows)], dtype="string"),
+        "code_iris": pd.array([f"69259{i % 300:04d}" for i in range(n_rows)], dtype="string"),
+        "etiquette_dpe_ademe": pd.array(np.array(list("ABCDEFG"))[rng.integers(0, 7, n_rows)], dtype="string"),
+        "consommation_annuelle_totale_de_l_adresse_mwh": rng.random(n_rows) * 100,
+        "surface_habitable_logement_ademe": np.round(rng.random(n_rows) * 150, 1),
+        "nombre_de_logements": pd.array(rng.integers(1, 200, n_rows), dtype="Int64"),
+        "date_derniere_modification_dpe_ademe": pd.to_datetime("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, n_rows), unit="D"),
+    })
+
+
+def save_json(storage, df, object_name):
+    """Legacy S3 path : JSON lines uploaded in one piece."""
+    json_data = df.to_json(orient="records", lines=True).encode("utf-8")
+    storage.client.put_object(storage.BUCKET_NAME, object_name, data=BytesIO(json_data), length=len(json_data), content_type="application/json")
+
+
+def load_json(storage, object_name):
+    res = storage.client.get_object(storage.BUCKET_NAME, object_name)
+    try:
+        return pd.read_json(BytesIO(res.read()), orient="records", lines=True)
+    finally:
+        res.close()
+        res.release_conn()
+
+
+def timed(func):
+    s = time.perf_counter()
+    res = func()
+    return res, time.perf_counter() - s
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-rows", type=int, default=1_000_000, help="number of rows")
+    parser.add_argument("--codec", default="snappy", help="parquet codec (snappy, zstd, gzip, none)")
+    args = parser.parse_args()
+
+    df = make_frame(args.n_rows)
+    with FakeS3Server() as s3:
+        os.environ.update({"ENV": "NOLOCAL", "S3_ENDPOINT_URL": s3.endpoint, "S3_PARQUET_COMPRESSION": args.codec, "BATCH_CORRELATION_ID": "bench-s3"})
+        storage = FileStorageConnexion()
+        _, t_save_json = timed(lambda: save_json(storage, df, "bench/data.json"))
+        res_json, t_load_json = timed(lambda: load_json(storage, "bench/data.json"))
+        _, t_save_pq = timed(lambda: storage.upload_parquet_to_s3(df, "bench/data.parquet"))
+        res_pq, t_load_pq = timed(lambda: storage.download_parquet_from_s3("bench/data.parquet").to_pandas())
+        size_json = len(s3.objects[(storage.BUCKET_NAME, "bench/data.json")]) / 2**20
+        size_pq = len(s3.objects[(storage.BUCKET_NAME, "bench/data.parquet")]) / 2**20
+
+    print(f"{args.n_rows} rows, {df.shape[1]} columns, {s3.ops['upload_part']} parts, {s3.ops['get_range']} ranged GETs")
+    print(f"{'format':<16}{'size (MiB)':>12}{'save (s)':>10}{'load (s)':>10}{'dtypes kept':>13}")
+    for name, size, t_save, t_load, res in (
+        ("json", size_json, t_save_json, t_load_json, res_json),
+        (f"parquet/{args.codec}", size_pq, t_save_pq, t_load_pq, res_pq),
+    ):
+        kept = (res.dtypes == df.dtypes).sum()
+        print(f"{name:<16}{size:>12.1f}{t_save:>10.2f}{t_load:>10.2f}{kept:>9}/{df.shape[1]}")
+    print(f"size /{size_json / size_pq:.1f}, save x{t_save_json / t_save_pq:.1f}, load x{t_load_json / t_load_pq:.1f}")
+
+
+if __name__ == "__main__":
+    main()
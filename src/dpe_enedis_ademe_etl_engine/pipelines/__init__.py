@@ -10,6 +10,7 @@ from .etl_app import dpe_enedis_ademe_etl_flow as DataEnedisAdemeETL
 from ..scripts.extract import DataEnedisAdemeExtractor
 from ..scripts.transform import DataEnedisAdemeTransformer
 from ..scripts.load import DataEnedisAdemeLoader
+from ..scripts.housekeeping import LakeHousekeeper
 
 # DataEnedisAdemeETL = etl_flow
 
@@ -17,5 +18,6 @@ __all__ = [
     "DataEnedisAdemeETL",
     "DataEnedisAdemeExtractor",
     "DataEnedisAdemeTransformer",
-    "DataEnedisAdemeLoader"
+    "DataEnedisAdemeLoader",
+    "LakeHousekeeper"
     ]
\ No newline at end of file
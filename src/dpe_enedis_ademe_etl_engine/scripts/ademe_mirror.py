@@ -0,0 +1,267 @@
+import os
+import json
+import glob
+import time
+import httpx
+import datetime
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from urllib.parse import quote
+
+try:
+    from ..scripts.http_client import RetryPolicy
+    from ..scripts.decoder import ColumnarBuilder, loads
+    from ..utils import logger
+    from ..utils.fonctions import format_code_departement
+except ImportError:
+    import sys
+    from pathlib import Path
+    current_dir = Path(__file__).resolve().parent
+    parent_dir = current_dir.parent
+    sys.path.append(str(parent_dir))
+    from scripts.http_client import RetryPolicy
+    from scripts.decoder import ColumnarBuilder, loads
+    from utils import logger
+    from utils.fonctions import format_code_departement
+
+
+class AdemeDepartmentMirror:
+    """
+    Local mirror of the ADEME `dpe03existant` lines of a department.
+    Used for full-department runs instead of per id_ban API calls.
+
+    Layout (local disk, partitioned parquet) :
+        <root>/code_departement=<XX>/part-<timestamp>.parquet   lines, appended at each sync
+        <root>/code_departement=<XX>/_state.json                 last sync infos (+ resume cursor)
+        <root>/code_departement=<XX>/_index.parquet              id_ban -> (part, row offset)
+
+    - first sync : bulk download of every line of the department (paginated via 'next')
+    - next syncs : only the lines modified since the last sync (`date_derniere_modification_dpe`),
+    a line updated later overrides the previous versions (dedup on `_id` when indexing)
+    - lines already mirrored with the same modification date are not written again
+    - pages are retried on transient errors, the cursor is saved after each part :
+    an interrupted sync resumes where it stopped
+    - `select` : only these fields are downloaded (data-fair `select`), a sync with another
+    selection than the mirrored one rebuilds the partition from scratch
+    """
+    DEPT_FIELD = "code_departement_ban"
+    DATE_FIELD = "date_derniere_modification_dpe"
+    ID_BAN_FIELD = "identifiant_ban"
+    ROW_GROUP_ROWS = 2_000 # granularité de lecture de `lookup`
+
+    def __init__(
+        self,
+        root_dir: str,
+        base_url: str = "https://data.ademe.fr/data-fair/api/v1/datasets/dpe03existant/lines",
+        page_size: int = 10_000,
+        part_rows: int = 20_000,
+        timeout: float = 120,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        select: list = None,
+        schema=None
+    ):
+        self.root_dir = root_dir
+        self.base_url = base_url
+        self.page_size = page_size
+        self.part_rows = part_rows # lignes ademe larges (centaines de champs) : parts petites
+        self.timeout = timeout
+        self.retry_policy = RetryPolicy(max_retries=max_retries, backoff=backoff)
+        self.select = select # None : tous les champs
+        self.schema = schema # types des champs connus (pa.Schema), les autres sont inférés
+
+    @staticmethod
+    def format_departement(code_departement) -> str:
+        return format_code_departement(code_departement)
+
+    def partition_dir(self, code_departement) -> str:
+        return os.path.join(self.root_dir, f"code_departement={self.format_departement(code_departement)}")
+
+    def get_url_departement(self, code_departement, since=None) -> str:
+        qs = f'{self.DEPT_FIELD}:"{self.format_departement(code_departement)}"'
+        if since:
+            qs += f" AND {self.DATE_FIELD}:>={since}"
+        url = f"{self.base_url}?size={self.page_size}&sort=_id&qs={quote(qs)}"
+        select = self.selected_fields()
+        return url if select is None else f"{url}&select={quote(','.join(select), safe=',')}"
+
+    def selected_fields(self):
+        """Fields downloaded by the syncs (the mirror keys are always included), None for every field."""
+        if self.select is None:
+            return None
+        return sorted(set(self.select) | {"_id", self.ID_BAN_FIELD, self.DEPT_FIELD, self.DATE_FIELD})
+
+    def reset_partition(self, code_departement):
+        """Remove the mirrored parts, index and state of a department (next sync is a full one)."""
+        for fpath in glob.glob(os.path.join(self.partition_dir(code_departement), "*")):
+            os.remove(fpath)
+
+    def load_state(self, code_departement) -> dict:
+        fpath = os.path.join(self.partition_dir(code_departement), "_state.json")
+        if not os.path.exists(fpath):
+            return {}
+        with open(fpath, "r") as f:
+            return json.load(f)
+
+    def _save_state(self, code_departement, state):
+        fpath = os.path.join(self.partition_dir(code_departement), "_state.json")
+        with open(fpath + ".tmp", "w") as f:
+            json.dump(state, f, indent=4)
+        os.replace(fpath + ".tmp", fpath)
+
+    def _write_part(self, code_departement, rows) -> str:
+        """Write a part file (atomic), typed with `schema`, mixed json types are stored as strings."""
+        table = ColumnarBuilder(self.schema).extend(rows).to_arrow()
+        ts = datetime.datetime.now().strftime("%Y%m%d%H%M%S%f")
+        fpath = os.path.join(self.partition_dir(code_departement), f"part-{ts}.parquet")
+        pq.write_table(table, fpath + ".tmp", row_group_size=self.ROW_GROUP_ROWS)
+        os.replace(fpath + ".tmp", fpath)
+        return fpath
+
+    def _get_page(self, client, url) -> dict:
+        """Get one page, retried on transient errors (exponential backoff, `Retry-After` honoured)."""
+        policy = self.retry_policy
+        for attempt in range(policy.max_retries + 1):
+            try:
+                res = client.get(url)
+                res.raise_for_status()
+                return loads(res.content)
+            except Exception as e:
+                if attempt == policy.max_retries or not policy.is_retryable(e):
+                    raise
+                logger.warning(f"Ademe mirror page error ({e}), retry {attempt + 1}/{policy.max_retries}.")
+                time.sleep(policy.delay(attempt, getattr(e, "response", None)))
+
+    def sync(self, code_departement, client: httpx.Client = None) -> int:
+        """
+        Download the lines of the department (all of them at the first sync,
+        only the modified ones afterwards) then rebuild the id_ban index.
+        If the previous sync was interrupted, it is resumed from its saved cursor.
+        :param code_departement: Code of the department.
+        :param client: Optional httpx client (a pooled one is created otherwise).
+        :return: Number of lines downloaded.
+        """
+        os.makedirs(self.partition_dir(code_departement), exist_ok=True)
+        state = self.load_state(code_departement)
+        if state and state.get("select") != self.selected_fields():
+            logger.warning(f"Ademe mirror dept {code_departement} : field selection changed, full resync.")
+            self.reset_partition(code_departement)
+            state = {}
+        state["select"] = self.selected_fields()
+        since = state.get("max_modification_date")
+        url = state.get("resume_url") or self.get_url_departement(code_departement, since)
+        max_date = state.get("resume_max_date", since)
+        logger.info(f"Ademe mirror sync dept {code_departement} ({'resumed' if state.get('resume_url') else 'incremental since ' + since if since else 'full'}) : {url}")
+        known = self.known_versions(code_departement)
+
+        own_client = client is None
+        client = client or httpx.Client(timeout=self.timeout)
+        n_lines, n_written, rows = 0, 0, []
+        try:
+            while url:
+                j = self._get_page(client, url)
+                page = j.get("results", [])
+                for line in page:
+                    d = line.get(self.DATE_FIELD)
+                    if d and (max_date is None or str(d) > max_date):
+                        max_date = str(d)
+                    if (line.get("_id"), None if d is None else str(d)) not in known:
+                        rows.append(line)
+                n_lines += len(page)
+                url = j.get("next") if page else None
+                if len(rows) >= self.part_rows or (rows and not url):
+                    self._write_part(code_departement, rows)
+                    n_written += len(rows)
+                    rows = []
+                    # curseur sauvegardé apres chaque part : reprise possible si la sync echoue
+                    state.update({"resume_url": url, "resume_max_date": max_date})
+                    self._save_state(code_departement, state)
+        finally:
+            if own_client:
+                client.close()
+
+        state.pop("resume_url", None)
+        state.pop("resume_max_date", None)
+        state.update({
+            "last_sync": datetime.datetime.now().isoformat(),
+            "max_modification_date": max_date,
+            "n_lines_last_sync": n_lines,
+            "n_lines_written_last_sync": n_written,
+        })
+        self._save_state(code_departement, state)
+        if n_written or not os.path.exists(os.path.join(self.partition_dir(code_departement), "_index.parquet")):
+            self.build_index(code_departement)
+        logger.info(f"Ademe mirror sync dept {code_departement} done : {n_lines} lines downloaded, {n_written} new or updated.")
+        return n_lines
+
+    def known_versions(self, code_departement) -> set:
+        """The (_id, modification date) of the lines already mirrored."""
+        if not os.path.exists(os.path.join(self.partition_dir(code_departement), "_index.parquet")):
+            return set()
+        index = self.load_index(code_departement)
+        return set(zip(index["_id"], index[self.DATE_FIELD]))
+
+    def build_index(self, code_departement) -> pd.DataFrame:
+        """
+        Build the id_ban -> (part, row offset) index of the department.
+        Only the `_id`, `identifiant_ban` and modification date columns of the parts are read,
+        the latest version of each line (`_id`) wins.
+        """
+        parts = sorted(glob.glob(os.path.join(self.partition_dir(code_departement), "part-*.parquet")))
+        columns = ["_id", self.ID_BAN_FIELD, self.DATE_FIELD]
+        frames = []
+        for part in parts:
+            names = pq.read_schema(part).names
+            t = pq.read_table(part, columns=[c for c in columns if c in names]).to_pandas()
+            for c in columns:
+                if c not in t.columns: t[c] = None
+            t[self.DATE_FIELD] = t[self.DATE_FIELD].astype("string")
+            t["part"] = os.path.basename(part)
+            t["row"] = np.arange(len(t), dtype="int64")
+            frames.append(t)
+        if frames:
+            index = pd.concat(frames, ignore_index=True).drop_duplicates(subset="_id", keep="last")
+        else:
+            index = pd.DataFrame(columns=columns + ["part", "row"])
+        index = index.rename(columns={self.ID_BAN_FIELD: "id_ban"})[["id_ban", "_id", self.DATE_FIELD, "part", "row"]]
+        fpath = os.path.join(self.partition_dir(code_departement), "_index.parquet")
+        index.to_parquet(fpath + ".tmp", index=False)
+        os.replace(fpath + ".tmp", fpath)
+        return index
+
+    def load_index(self, code_departement) -> pd.DataFrame:
+        fpath = os.path.join(self.partition_dir(code_departement), "_index.parquet")
+        if not os.path.exists(fpath):
+            return self.build_index(code_departement)
+        index = pd.read_parquet(fpath)
+        if "_id" not in index.columns: # index d'une version precedente
+            index = self.build_index(code_departement)
+        return index
+
+    def lookup(self, code_departement, id_ban_list) -> pd.DataFrame:
+        """
+        Get the mirrored lines of a list of id_ban, reading only the needed rows of each part.
+        :param code_departement: Code of the department.
+        :param id_ban_list: The list of id_ban.
+        :return: DataFrame of the Ademe lines (raw column names, as returned by the API).
+        """
+        index = self.load_index(code_departement)
+        index = index[index["id_ban"].isin(set(id_ban_list))]
+        frames = []
+        for part, rows in index.groupby("part")["row"]:
+            # seuls les row groups contenant les lignes cherchées sont lus
+            pf = pq.ParquetFile(os.path.join(self.partition_dir(code_departement), part))
+            sizes = np.array([pf.metadata.row_group(i).num_rows for i in range(pf.num_row_groups)])
+            starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+            rows = np.sort(rows.values)
+            rg = np.searchsorted(starts, rows, side="right") - 1
+            groups = np.unique(rg)
+            table = pf.read_row_groups(groups.tolist())
+            # position de chaque row group lu dans la table concaténée
+            table_starts = dict(zip(groups, np.concatenate([[0], np.cumsum(sizes[groups])[:-1]])))
+            local_rows = rows - starts[rg] + np.array([table_starts[g] for g in rg], dtype="int64")
+            frames.append(table.take(local_rows).to_pandas())
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
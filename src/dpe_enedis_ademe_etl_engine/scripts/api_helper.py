@@ -0,0 +1,165 @@
+import time
+import asyncio
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Callable, Any, Awaitable
+
+try:
+    from ..scripts.rate_limiter import AsyncTokenBucket
+    from ..scripts.http_client import RetryPolicy
+    from ..utils import logger
+except ImportError:
+    import sys
+    from pathlib import Path
+    current_dir = Path(__file__).resolve().parent
+    parent_dir = current_dir.parent
+    sys.path.append(str(parent_dir))
+    from scripts.rate_limiter import AsyncTokenBucket
+    from scripts.http_client import RetryPolicy
+    from utils import logger
+
+
+def run_async(coro):
+    """
+    Run a coroutine from synchronous code (prefect task, script...).
+    If an event loop is already running in this thread (notebook, async flow),
+    the coroutine is run in a dedicated thread with its own loop.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+class AsyncApiRequester:
+    """
+    Async engine (asyncio + httpx) to send a lot of API requests.
+    - one httpx client for all the requests (shared keep-alive connection pool),
+    built by `client_factory` (e.g. `HttpClientRegistry.new_async_client`) if given
+    - at most `max_in_flight` requests in flight
+    - throughput bounded by a token bucket (`rate_limit` req/s, `burst` tokens)
+    - results are returned in the same order as the input list
+    (None for the items in error, as `multithreaded_api_request`)
+    - each item is retried on transient errors only, following `retry_policy`
+    (default : `max_retries` retries, exponential backoff from `backoff` seconds,
+    `Retry-After` honoured), a token is consumed for every attempt
+    - the token bucket state can be shared between processes (`backend`,
+    see `rate_limiter.make_backend`), wait-time metrics are kept in `rate_metrics`
+    - optional per-host `controller` (`AdaptiveConcurrencyController`) : the requests in flight
+    follow its AIMD limit (below `max_in_flight`) and stop while its circuit breaker is open
+    """
+    def __init__(
+        self,
+        rate_limit: float,
+        max_in_flight: int = 1000,
+        burst: float = 1,
+        timeout: float = 60,
+        max_connections: int = 100,
+        max_retries: int = 2,
+        backoff: float = 1.0,
+        backend=None,
+        retry_policy: RetryPolicy = None,
+        client_factory: Callable[[], httpx.AsyncClient] = None,
+        controller=None,
+        debug: bool = False
+    ):
+        self.rate_limit = rate_limit
+        self.max_in_flight = max_in_flight
+        self.burst = burst
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backend = backend
+        self.retry_policy = retry_policy or RetryPolicy(max_retries=max_retries, backoff=backoff)
+        self.client_factory = client_factory
+        self.controller = controller
+        self.debug = debug
+        self.errors = []
+        self.rate_metrics = {}
+
+    def run(
+        self,
+        api_call_func: Callable[[httpx.AsyncClient, Any], Awaitable[Any]],
+        obj_list: List[Any],
+        on_result: Callable[[int, Any], None] = None
+    ) -> List[Any]:
+        """
+        Synchronous entrypoint, see `arun`.
+        :param api_call_func: Coroutine function (client, obj) -> result.
+        :param obj_list: List of objects to process.
+        :param on_result: Optional callback (index, result) called as soon as an item succeeds (checkpoints).
+        :return: List of results (same order as obj_list).
+        """
+        return run_async(self.arun(api_call_func, obj_list, on_result))
+
+    async def arun(
+        self,
+        api_call_func: Callable[[httpx.AsyncClient, Any], Awaitable[Any]],
+        obj_list: List[Any],
+        on_result: Callable[[int, Any], None] = None
+    ) -> List[Any]:
+        if not obj_list:
+            return []
+        bucket = AsyncTokenBucket(self.rate_limit, self.burst, backend=self.backend)
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        results = [None] * len(obj_list)
+        self.errors = []
+
+        policy = self.retry_policy
+        controller = self.controller
+        if self.client_factory is not None:
+            client = self.client_factory()
+        else:
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections
+            )
+            client = httpx.AsyncClient(limits=limits, timeout=self.timeout)
+        async with client:
+            async def worker(index: int, obj: Any):
+                async with semaphore:
+                    for attempt in range(policy.max_retries + 1):
+                        try:
+                            if controller is not None:
+                                await controller.aacquire()
+                        except Exception as e: # circuit resté ouvert trop longtemps
+                            self.errors.append((index, e))
+                            return
+                        await bucket.acquire()
+                        start = time.perf_counter()
+                        try:
+                            result = await api_call_func(client, obj)
+                        except Exception as e:
+                            duration = time.perf_counter() - start
+                            bucket.metrics.record_call(duration)
+                            if controller is not None:
+                                controller.release(duration, overloaded=policy.is_retryable(e))
+                            if attempt == policy.max_retries or not policy.is_retryable(e):
+                                self.errors.append((index, e))
+                                return
+                            await asyncio.sleep(policy.delay(attempt, getattr(e, "response", None)))
+                            continue
+                        duration = time.perf_counter() - start
+                        bucket.metrics.record_call(duration)
+                        if controller is not None:
+                            controller.release(duration)
+                        results[index] = result
+                        if on_result is not None:
+                            on_result(index, result)
+                        return
+
+            await asyncio.gather(*(worker(i, obj) for i, obj in enumerate(obj_list)))
+
+        successful = len([r for r in results if r is not None])
+        self.rate_metrics = bucket.metrics.snapshot()
+        logger.info(f"Async requests completed : {successful}/{len(obj_list)} successful, {len(self.errors)} errors.")
+        logger.info(f"Rate limiter wait metrics : {self.rate_metrics}")
+        if controller is not None:
+            logger.info(f"Adaptive concurrency ({controller.name}) : {controller.snapshot()}")
+        if self.errors and self.debug:
+            for index, error in self.errors[:5]:
+                print(f"  Item {index}: {type(error).__name__}: {error}")
+        return results
@@ -0,0 +1,153 @@
+"""
+Autotune of the parquet write profiles of the lake zones : a real batch of each zone (files of
+its last batch in the catalog) is written and read back in memory with each profile, and the
+profile with the best score for the use of the zone is recommended.
+
+usage : python -m src.dpe_enedis_ademe_etl_engine.scripts.autotune --zones bronze silver gold --output config/lake_write_profiles.json
+(the output file is read through PATH_LAKE_WRITE_PROFILES)
+"""
+import json
+import time
+import argparse
+import pyarrow as pa
+from pyarrow import parquet as pq
+
+try:
+    from ..utils import logger
+    from ..scripts.filestorage_helper import FileStorageConnexion
+    from ..scripts.write_profiles import WRITE_PROFILES, resolve_profile, parquet_write_options
+    from ..utils.fonctions import get_env_var
+except ImportError:
+    import sys
+    from pathlib import Path
+    current_dir = Path(__file__).resolve().parent
+    parent_dir = current_dir.parent
+    sys.path.append(str(parent_dir))
+    from scripts.filestorage_helper import FileStorageConnexion
+    from scripts.write_profiles import WRITE_PROFILES, resolve_profile, parquet_write_options
+    from utils import logger
+    from utils.fonctions import get_env_var
+
+
+# poids (ecriture, lecture, taille) du score d'un profil, par zone
+ZONE_WEIGHTS = {
+    "bronze": (1.0, 1.0, 0.25), # écrit puis relu une fois, expiré apres quelques jours
+    "silver": (0.5, 1.0, 0.5),
+    "gold": (0.25, 1.0, 1.0), # relu a chaque chargement, gardé
+    "archive": (0.25, 0.25, 1.0),
+}
+
+
+def measure_profile(tables, profile, repeats=3) -> dict:
+    """
+    Write time, read time (best of `repeats`, in memory : codec and encodings only, no I/O)
+    and size of the tables written with a profile.
+    :param tables: {table name: pa.Table}
+    :return: {"write_s", "read_s", "n_bytes"} summed over the tables
+    """
+    res = {"write_s": 0.0, "read_s": 0.0, "n_bytes": 0}
+    for table in tables.values():
+        options = parquet_write_options(profile, table)
+        write_s, read_s = float("inf"), float("inf")
+        for _ in range(repeats):
+            sink = pa.BufferOutputStream()
+            s = time.perf_counter()
+            pq.write_table(table, sink, row_group_size=profile["row_group_size"], **options)
+            buffer = sink.getvalue()
+            write_s = min(write_s, time.perf_counter() - s)
+            s = time.perf_counter()
+            pq.read_table(pa.BufferReader(buffer))
+            read_s = min(read_s, time.perf_counter() - s)
+        res["write_s"] += write_s
+        res["read_s"] += read_s
+        res["n_bytes"] += buffer.size
+    return res
+
+
+def recommend(measures, weights) -> str:
+    """
+    Profile with the lowest score : sum of the write time, read time and size of the profile,
+    each divided by the best one among the profiles and weighted.
+    :param measures: {profile name: measure_profile result}
+    :param weights: (write, read, size) weights
+    """
+    keys = ["write_s", "read_s", "n_bytes"]
+    best = {k: max(min(m[k] for m in measures.values()), 1e-9) for k in keys}
+    scores = {name: sum(w * m[k] / best[k] for w, k in zip(weights, keys)) for name, m in measures.items()}
+    return min(scores, key=scores.get)
+
+
+class LakeWriteAutotuner(FileStorageConnexion):
+    """
+    Benchmark of the write profiles on the files of the lake (see module docstring).
+    Only the files registered in the catalog are sampled.
+    """
+    def __init__(self):
+        super().__init__()
+        if self.catalog is None:
+            raise ValueError("LakeWriteAutotuner samples the batches of the lake catalog, set LAKE_CATALOG_ENABLED to true.")
+
+    def sample_batch(self, zone, sample_rows=500_000):
+        """
+        Tables of the last batch written in a zone (first `sample_rows` rows of each).
+        :return: {table name: pa.Table}, empty if the catalog has no batch for the zone.
+        """
+        batch_id = next((e["batch_id"] for e in self.catalog.files(zone) if e["batch_id"] is not None), None)
+        if batch_id is None:
+            return {}
+        tables = {}
+        for table_name in self.catalog.tables(zone):
+            table = self.read_catalog_table(zone, table_name, batch_id=batch_id)
+            if table.num_rows:
+                tables[table_name] = table.slice(0, sample_rows).combine_chunks()
+        logger.info(f"Autotune {zone} : batch {batch_id}, tables {sorted(tables)}.")
+        return tables
+
+    def autotune(self, zones, profiles=None, sample_rows=500_000, repeats=3):
+        """
+        Measure each profile on a batch of each zone and recommend one per zone.
+        :param profiles: Names of the profiles tried (default : every profile of WRITE_PROFILES).
+        :return: {zone: {"recommended": profile name, "measures": {profile name: measures}}},
+        zones without any batch in the catalog left out.
+        """
+        res = {}
+        for zone in zones:
+            tables = self.sample_batch(zone, sample_rows=sample_rows)
+            if not tables:
+                logger.warning(f"Autotune {zone} : no batch registered in the catalog, zone skipped.")
+                continue
+            measures = {name: measure_profile(tables, resolve_profile(name), repeats=repeats) for name in profiles or WRITE_PROFILES}
+            res[zone] = {"recommended": recommend(measures, ZONE_WEIGHTS.get(zone, (1.0, 1.0, 1.0))), "measures": measures}
+        return res
+
+    @staticmethod
+    def save_recommendations(results, fpath):
+        """Write {zone: recommended profile} to `fpath` (format of PATH_LAKE_WRITE_PROFILES)."""
+        with open(fpath, "w") as f:
+            json.dump({zone: r["recommended"] for zone, r in results.items()}, f, indent=4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recommend a parquet write profile per lake zone.")
+    parser.add_argument("--zones", nargs="+", default=["bronze", "silver", "gold"], help="zones to tune")
+    parser.add_argument("--profiles", nargs="+", default=list(WRITE_PROFILES), help="profiles tried")
+    parser.add_argument("--sample-rows", type=int, default=500_000, help="rows sampled per table")
+    parser.add_argument("--repeats", type=int, default=3, help="runs per measure (best kept)")
+    parser.add_argument("--output", default=get_env_var('PATH_LAKE_WRITE_PROFILES', compulsory=False), help="json of the recommended profiles")
+    args = parser.parse_args()
+
+    tuner = LakeWriteAutotuner()
+    results = tuner.autotune(args.zones, profiles=args.profiles, sample_rows=args.sample_rows, repeats=args.repeats)
+    for zone, r in results.items():
+        print(f"\n{zone} (weights write/read/size {ZONE_WEIGHTS.get(zone, (1.0, 1.0, 1.0))})")
+        print(f"{'profile':<10}{'size (MiB)':>12}{'write (s)':>11}{'read (s)':>10}")
+        for name, m in r["measures"].items():
+            mark = " <-" if name == r["recommended"] else ""
+            print(f"{name:<10}{m['n_bytes'] / 2**20:>12.2f}{m['write_s']:>11.3f}{m['read_s']:>10.3f}{mark}")
+    if args.output and results:
+        tuner.save_recommendations(results, args.output)
+        print(f"\nrecommended profiles saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import datetime
+from typing import Iterable, List, Optional
+
+try:
+    from ..utils import logger
+except ImportError:
+    import sys
+    from pathlib import Path
+    current_dir = Path(__file__).resolve().parent
+    parent_dir = current_dir.parent
+    sys.path.append(str(parent_dir))
+    from utils import logger
+
+
+def schema_hash(schema) -> str:
+    """Short hash of an Arrow schema (names and types, metadata excluded)."""
+    return hashlib.sha1(schema.remove_metadata().to_string().encode("utf-8")).hexdigest()[:16]
+
+
+def _json_scalar(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return value
+
+
+def footer_statistics(metadata, columns: Iterable[str]) -> dict:
+    """
+    Min/max of `columns` over the row groups of a parquet file, read from its footer (no data read).
+    A column is left out if one of its row groups has no statistics.
+    :param metadata: pyarrow.parquet.FileMetaData of the file.
+    :return: {column: [min, max]}
+    """
+    columns = set(columns)
+    stats = {}
+    for rg in range(metadata.num_row_groups):
+        row_group = metadata.row_group(rg)
+        for i in range(row_group.num_columns):
+            chunk = row_group.column(i)
+            name = chunk.path_in_schema
+            if name not in columns or stats.get(name, ()) is None:
+                continue
+            s = chunk.statistics
+            if s is None or not s.has_min_max:
+                stats[name] = None
+                continue
+            lo, hi = _json_scalar(s.min), _json_scalar(s.max)
+            if name in stats:
+                lo, hi = min(stats[name][0], lo), max(stats[name][1], hi)
+            stats[name] = [lo, hi]
+    return {k: v for k, v in stats.items() if v is not None}
+
+
+def may_match(stats: dict, filters: Optional[List[tuple]]) -> bool:
+    """
+    False if the min/max statistics of a file prove that no row can match the filters
+    (conjunction of (column, op, value), ops ==, !=, <, <=, >, >=, in), True otherwise.
+    """
+    for column, op, value in filters or []:
+        if column not in stats:
+            continue
+        lo, hi = stats[column]
+        try:
+            if op in ("==", "=") and not lo <= value <= hi:
+                return False
+            if op == "!=" and lo == hi == value:
+                return False
+            if op == "in" and not any(lo <= v <= hi for v in value):
+                return False
+            if op == "<" and not lo < value:
+                return False
+            if op == "<=" and not lo <= value:
+                return False
+            if op == ">" and not hi > value:
+                return False
+            if op == ">=" and not hi >= value:
+                return False
+        except TypeError: # types non comparables (ex. int vs str) : pas d'elagage
+            continue
+    return True
+
+
+class _Conflict(Exception):
+    """Replaced file no longer registered (transaction rolled back)."""
+
+
+class LakeCatalog:
+    """
+    Manifest of the files written in the zones (SQLite), one row per file :
+    path (dir + fname), zone, table, batch_id, row count, byte size, schema hash and
+    min/max statistics of the key columns (from the parquet footer).
+    - inputs of a stage are looked up by (zone, table, batch_id) on an index, no listing nor
+    file name rebuilt from the date (a run crossing midnight finds its files)
+    - `files` skips the files whose statistics exclude a filter
+    - files replaced by a compaction are swapped in one transaction (`replace_files`) and kept
+    as tombstones until a grace delay, for the readers still holding their paths
+    - WAL journal + busy timeout, one connection per thread (as GeocodeCache)
+    """
+    # colonnes dont les min/max sont gardés (cles de jointure, partitions, dates)
+    KEY_COLUMNS = [
+        "id_BAN", "id_ban", "identifiant_ban_ademe", "_id_ademe",
+        "code_departement", "code_departement_enedis", "code_departement_ban_ademe",
+        "annee", "annee_enedis", "code_iris", "code_postal_ban_ademe",
+        "date_derniere_modification_dpe_ademe", "batch_id",
+    ]
+    FIELDS = ["path", "dir", "fname", "zone", "table_name", "batch_id", "n_rows", "n_bytes", "schema_hash", "stats", "created_at"]
+    INSERT_FILE = f"INSERT OR REPLACE INTO files ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})"
+
+    def __init__(self, fpath: str):
+        self.fpath = fpath
+        self._local = threading.local()
+        if os.path.dirname(fpath):
+            os.makedirs(os.path.dirname(fpath), exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                " path TEXT PRIMARY KEY,"
+                " dir TEXT NOT NULL,"
+                " fname TEXT NOT NULL,"
+                " zone TEXT NOT NULL,"
+                " table_name TEXT NOT NULL,"
+                " batch_id TEXT,"
+                " n_rows INTEGER,"
+                " n_bytes INTEGER,"
+                " schema_hash TEXT,"
+                " stats TEXT,"
+                " created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_files_table ON files(zone, table_name, batch_id, created_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tombstones ("
+                " path TEXT PRIMARY KEY,"
+                " dir TEXT NOT NULL,"
+                " fname TEXT NOT NULL,"
+                " delete_after REAL NOT NULL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.fpath, timeout=30)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _file_row(self, path, dir, fname, zone, table, batch_id, metadata, n_bytes=None, created_at=None) -> tuple:
+        stats = footer_statistics(metadata, self.KEY_COLUMNS)
+        return (path, dir, fname, zone, table, batch_id, metadata.num_rows, n_bytes,
+                schema_hash(metadata.schema.to_arrow_schema()), json.dumps(stats, default=str), created_at or time.time())
+
+    def register(self, path: str, dir: str, fname: str, zone: str, table: str, batch_id: Optional[str], metadata, n_bytes: Optional[int] = None) -> str:
+        """
+        Record (or replace) a written parquet file.
+        :param path: Path of the file (local path or object key), `dir` and `fname` as given to `load_parquet_file`.
+        :param metadata: pyarrow.parquet.FileMetaData of the file (row count, schema, statistics).
+        """
+        with self._conn() as conn:
+            conn.execute(self.INSERT_FILE, self._file_row(path, dir, fname, zone, table, batch_id, metadata, n_bytes))
+            conn.execute("DELETE FROM tombstones WHERE path = ?", (path,)) # chemin réécrit (batch relancé)
+        return path
+
+    def _rows(self, query, params) -> List[dict]:
+        entries = []
+        for row in self._conn().execute(query, params).fetchall():
+            entry = dict(zip(self.FIELDS, row))
+            entry["stats"] = json.loads(entry["stats"]) if entry["stats"] else {}
+            entries.append(entry)
+        return entries
+
+    def files(
+        self,
+        zone: str,
+        table: Optional[str] = None,
+        batch_id: Optional[str] = None,
+        filters: Optional[List[tuple]] = None,
+        prefix: Optional[str] = None,
+        created_before: Optional[float] = None
+    ) -> List[dict]:
+        """
+        Files of a zone (newest first), of one table and one batch if given.
+        :param filters: (column, op, value) conditions, the files whose statistics exclude them are skipped.
+        :param prefix: Only the paths starting with it (root of a dataset).
+        :param created_before: Only the files registered before this timestamp.
+        """
+        query = f"SELECT {', '.join(self.FIELDS)} FROM files WHERE zone = ?"
+        params = [zone]
+        for clause, value in [
+            ("table_name = ?", table),
+            ("batch_id = ?", batch_id),
+            ("substr(path, 1, ?) = ?", None if prefix is None else (len(prefix), prefix)),
+            ("created_at < ?", created_before),
+        ]:
+            if value is not None:
+                query += f" AND {clause}"
+                params.extend(value if isinstance(value, tuple) else [value])
+        entries = self._rows(query + " ORDER BY created_at DESC", params)
+        kept = [e for e in entries if may_match(e["stats"], filters)]
+        if len(kept) < len(entries):
+            logger.info(f"Catalog {zone}/{table} : {len(entries) - len(kept)} of {len(entries)} files skipped by their statistics.")
+        return kept
+
+    def latest(self, zone: str, table: str, batch_id: Optional[str] = None) -> Optional[dict]:
+        """Last file written for a table (and batch), None if not registered."""
+        query = f"SELECT {', '.join(self.FIELDS)} FROM files WHERE zone = ? AND table_name = ?"
+        params = [zone, table]
+        if batch_id is not None:
+            query += " AND batch_id = ?"
+            params.append(batch_id)
+        entries = self._rows(query + " ORDER BY created_at DESC LIMIT 1", params)
+        return entries[0] if entries else None
+
+    def remove(self, paths: Iterable[str]) -> int:
+        """Forget files (deleted or replaced)."""
+        paths = list(paths)
+        with self._conn() as conn:
+            conn.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in paths])
+        return len(paths)
+
+    def remove_batch(self, zone: str, table: str, batch_id: str) -> int:
+        """Forget the files of a batch of a table (partitions rewritten)."""
+        with self._conn() as conn:
+            return conn.execute(
+                "DELETE FROM files WHERE zone = ? AND table_name = ? AND batch_id = ?", (zone, table, batch_id)
+            ).rowcount
+
+    def remove_prefix(self, prefix: str) -> int:
+        """Forget the files whose path starts with `prefix` (partition directory rewritten)."""
+        with self._conn() as conn:
+            return conn.execute("DELETE FROM files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)).rowcount
+
+    def tables(self, zone: str) -> List[str]:
+        """Tables having files in a zone."""
+        rows = self._conn().execute("SELECT DISTINCT table_name FROM files WHERE zone = ? ORDER BY table_name", (zone,)).fetchall()
+        return [row[0] for row in rows]
+
+    def visible_paths(self, prefix: str):
+        """
+        (registered, tombstoned) paths starting with `prefix`, read in one statement (consistent
+        snapshot for a reader listing a dataset while it is compacted).
+        """
+        rows = self._conn().execute(
+            "SELECT path, 0 FROM files WHERE substr(path, 1, ?) = ?"
+            " UNION ALL SELECT path, 1 FROM tombstones WHERE substr(path, 1, ?) = ?",
+            (len(prefix), prefix, len(prefix), prefix)
+        ).fetchall()
+        return {p for p, dead in rows if not dead}, {p for p, dead in rows if dead}
+
+    def _tombstone(self, conn, entries: List[dict], grace_seconds: float):
+        delete_after = time.time() + grace_seconds
+        conn.executemany(
+            "INSERT OR REPLACE INTO tombstones (path, dir, fname, delete_after) VALUES (?, ?, ?, ?)",
+            [(e["path"], e["dir"], e["fname"], delete_after) for e in entries]
+        )
+
+    def replace_files(self, old_entries: List[dict], new_files: List[dict], grace_seconds: float = 0) -> bool:
+        """
+        Swap files in one transaction (compaction, expiry) : the readers of the catalog see either
+        the old files or the new ones. The old files become tombstones, to delete once
+        `grace_seconds` have passed (see `expired_tombstones`).
+        :param old_entries: Catalog entries of the replaced files.
+        :param new_files: Keyword arguments of `register` for each new file.
+        :return: False (nothing changed) if one of the old files is no longer registered
+        (replaced meanwhile by another job or a rerun of its batch).
+        """
+        rows = [self._file_row(**f) for f in new_files]
+        try:
+            with self._conn() as conn:
+                deleted = sum(conn.execute("DELETE FROM files WHERE path = ?", (e["path"],)).rowcount for e in old_entries)
+                if deleted < len(old_entries):
+                    raise _Conflict()
+                conn.executemany(self.INSERT_FILE, rows)
+                conn.executemany("DELETE FROM tombstones WHERE path = ?", [(row[0],) for row in rows])
+                self._tombstone(conn, old_entries, grace_seconds)
+        except _Conflict:
+            return False
+        return True
+
+    def relocate(self, entry: dict, new_path: str, new_dir: str, new_zone: str, grace_seconds: float = 0) -> bool:
+        """
+        Record the copy of a file to a new place (archiving), its statistics are kept and
+        its old path becomes a tombstone.
+        :return: False (nothing changed) if the file is no longer registered.
+        """
+        with self._conn() as conn:
+            moved = conn.execute(
+                "UPDATE files SET path = ?, dir = ?, zone = ? WHERE path = ?",
+                (new_path, new_dir, new_zone, entry["path"])
+            ).rowcount
+            if moved:
+                self._tombstone(conn, [entry], grace_seconds)
+        return bool(moved)
+
+    def expired_tombstones(self) -> List[dict]:
+        """Replaced files whose grace delay is over (to delete)."""
+        rows = self._conn().execute(
+            "SELECT path, dir, fname FROM tombstones WHERE delete_after <= ?", (time.time(),)
+        ).fetchall()
+        return [dict(zip(["path", "dir", "fname"], row)) for row in rows]
+
+    def forget_tombstones(self, paths: Iterable[str]):
+        with self._conn() as conn:
+            conn.executemany("DELETE FROM tombstones WHERE path = ?", [(p,) for p in paths])
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM files").fetchone()[0]
@@ -0,0 +1,98 @@
+import os
+import json
+import glob
+import time
+import shutil
+import datetime
+import threading
+from typing import Any, Dict
+
+try:
+    from ..utils import logger
+except ImportError:
+    import sys
+    from pathlib import Path
+    current_dir = Path(__file__).resolve().parent
+    parent_dir = current_dir.parent
+    sys.path.append(str(parent_dir))
+    from utils import logger
+
+
+class CheckpointJournal:
+    """
+    Append-only journal of the completed items of one extract stage (BAN, ADEME...).
+    - results are buffered then written as JSONL segments (atomic rename),
+    every `flush_every` items or `flush_interval` seconds : a failure loses at most
+    one checkpoint interval of work
+    - `load` merges every segment, a key written twice keeps its last value
+    Layout : <root>/batch_id=<id>/<stage>/segment-<timestamp>.jsonl
+    """
+    def __init__(self, stage_dir: str, flush_every: int = 500, flush_interval: float = 30):
+        self.stage_dir = stage_dir
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        os.makedirs(stage_dir, exist_ok=True)
+
+    def load(self) -> Dict[str, Any]:
+        """All the journaled results {key: value}."""
+        done = {}
+        for fpath in sorted(glob.glob(os.path.join(self.stage_dir, "segment-*.jsonl"))):
+            with open(fpath, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        done[entry["key"]] = entry["value"]
+        return done
+
+    def append(self, key: str, value: Any):
+        """Journal the result of one item (flushed by intervals)."""
+        with self._lock:
+            self._buffer.append({"key": key, "value": value})
+            if len(self._buffer) >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        ts = datetime.datetime.now().strftime("%Y%m%d%H%M%S%f")
+        fpath = os.path.join(self.stage_dir, f"segment-{ts}.jsonl")
+        with open(fpath + ".tmp", "w", encoding="utf-8") as f:
+            for entry in self._buffer:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(fpath + ".tmp", fpath)
+        self._buffer = []
+
+
+class CheckpointStore:
+    """
+    Checkpoints of an extract run, keyed by batch_id : a retried or restarted
+    `extract()` with the same batch_id only requests the items missing from the journals.
+    :param root_dir: Root directory of the checkpoints (bronze zone).
+    :param batch_id: Correlation id of the batch.
+    """
+    def __init__(self, root_dir: str, batch_id: str, flush_every: int = 500, flush_interval: float = 30):
+        self.batch_dir = os.path.join(root_dir, f"batch_id={batch_id}")
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._journals = {}
+
+    def journal(self, stage: str) -> CheckpointJournal:
+        if stage not in self._journals:
+            self._journals[stage] = CheckpointJournal(
+                os.path.join(self.batch_dir, stage), self.flush_every, self.flush_interval
+            )
+        return self._journals[stage]
+
+    def clear(self):
+        """Remove the journals of the batch (run completed)."""
+        shutil.rmtree(self.batch_dir, ignore_errors=True)
+        self._journals = {}
+        logger.info(f"Checkpoints cleared : {self.batch_dir}")
@@ -0,0 +1,220 @@
+import time
+import asyncio
+import threading
+import collections
+import numpy as np
+
+try:
+    from ..utils import logger
+except ImportError:
+    import sys
+    from pathlib import Path
+    current_dir = Path(__file__).resolve().parent
+    parent_dir = current_dir.parent
+    sys.path.append(str(parent_dir))
+    from utils import logger
+
+
+class CircuitOpenError(Exception):
+    """Raised when a host circuit breaker stays open longer than the caller accepts to wait."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of one host.
+    - closed : calls go through, `failure_threshold` overload failures in a row open it
+    - open : no call for `recovery_timeout` seconds (outage, the provider is left alone)
+    - half open : a single probe call, its success closes the circuit, its failure
+    opens it again for twice the previous timeout (capped at `max_recovery_timeout`)
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30, max_recovery_timeout: float = 300):
+        self.failure_threshold = failure_threshold
+        self.base_recovery_timeout = recovery_timeout
+        self.max_recovery_timeout = max_recovery_timeout
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.n_opened = 0
+
+    def wait_time(self) -> float:
+        """Seconds before a call may be sent (0 = now). Not thread-safe, called under the controller lock."""
+        if self.state == self.OPEN:
+            left = self.opened_at + self.recovery_timeout - time.monotonic()
+            if left > 0:
+                return left
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            return 0.0 if not self.probing else min(1.0, self.recovery_timeout)
+        return 0.0
+
+    def on_call(self):
+        if self.state == self.HALF_OPEN:
+            self.probing = True
+
+    def on_success(self):
+        if self.state != self.CLOSED:
+            logger.info("Circuit breaker closed : the host answers again.")
+        self.state = self.CLOSED
+        self.failures = 0
+        self.probing = False
+        self.recovery_timeout = self.base_recovery_timeout
+
+    def on_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            self.recovery_timeout = min(self.recovery_timeout * 2, self.max_recovery_timeout)
+            self._open()
+        elif self.state == self.CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.probing = False
+        self.n_opened += 1
+        logger.warning(f"Circuit breaker open for {self.recovery_timeout:.0f}s after {self.failures} failures.")
+
+
+class AdaptiveConcurrencyController:
+    """
+    Adaptive concurrency limit of one host (AIMD, as TCP congestion control).
+    - additive increase : +1 in flight request per `limit` healthy calls
+    (latency EWMA under `latency_tolerance` x the best observed latency, floored at `latency_floor` seconds)
+    - multiplicative decrease : limit x `decrease_factor` on overload
+    (429, 5xx, transport errors) or rising latency, at most once per window of calls
+    - a `CircuitBreaker` stops the calls during outages
+    Usable from threads (`acquire`) and coroutines (`aacquire`), `release` reports the outcome.
+    The latencies of the last `latency_window` calls are kept for the p50 / p99 of `snapshot`.
+    :param initial_limit: Concurrency limit at start.
+    :param max_wait: Max seconds a caller waits for an open circuit before `CircuitOpenError`.
+    """
+    def __init__(
+        self,
+        name: str = "",
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 3.0,
+        latency_floor: float = 0.05,
+        ewma_alpha: float = 0.2,
+        breaker: CircuitBreaker = None,
+        max_wait: float = 600,
+        latency_window: int = 10_000
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.latency_floor = latency_floor
+        self.ewma_alpha = ewma_alpha
+        self.breaker = breaker or CircuitBreaker()
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.n_calls = 0
+        self.n_overloaded = 0
+        self.latencies = collections.deque(maxlen=latency_window)
+        self.min_latency = None
+        self.ewma_latency = None
+        self.calls_since_decrease = int(self.limit) # la premiere surcharge baisse la limite immediatement
+        self.n_decreases = 0
+        self.max_reached = int(self.limit)
+        self._cond = threading.Condition()
+
+    def _wait_time(self) -> float:
+        """Seconds before a slot may be taken (0 = a slot is free), called under the lock."""
+        wait = self.breaker.wait_time()
+        if wait > 0:
+            return wait
+        return 0.0 if self.in_flight < int(self.limit) else None
+
+    def _take(self):
+        self.in_flight += 1
+        self.breaker.on_call()
+
+    def acquire(self):
+        """Block until a slot is free and the circuit lets the call through."""
+        deadline = time.monotonic() + self.max_wait
+        with self._cond:
+            while True:
+                wait = self._wait_time()
+                if wait == 0:
+                    return self._take()
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    raise CircuitOpenError(f"{self.name} : circuit still open after {self.max_wait}s.")
+                self._cond.wait(min(wait or left, left))
+
+    async def aacquire(self):
+        """Async version of `acquire` : only the coroutine waits, never the loop."""
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            with self._cond:
+                wait = self._wait_time()
+                if wait == 0:
+                    return self._take()
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise CircuitOpenError(f"{self.name} : circuit still open after {self.max_wait}s.")
+            await asyncio.sleep(min(wait or 0.005, left))
+
+    def release(self, latency: float, overloaded: bool = False):
+        """
+        Free the slot of a call and adapt the limit.
+        :param latency: Duration of the call (seconds).
+        :param overloaded: True for 429, 5xx and transport errors (the other outcomes are healthy for the host).
+        """
+        with self._cond:
+            self.in_flight -= 1
+            self.calls_since_decrease += 1
+            self.n_calls += 1
+            self.latencies.append(latency)
+            if overloaded:
+                self.n_overloaded += 1
+                self.breaker.on_failure()
+                self._decrease("overload")
+            else:
+                self.breaker.on_success()
+                self.min_latency = latency if self.min_latency is None else min(self.min_latency, latency)
+                self.ewma_latency = latency if self.ewma_latency is None \
+                    else self.ewma_alpha * latency + (1 - self.ewma_alpha) * self.ewma_latency
+                if self.ewma_latency > self.latency_tolerance * max(self.min_latency, self.latency_floor):
+                    self._decrease("latency")
+                else:
+                    self.limit = min(self.max_limit, self.limit + 1 / int(self.limit))
+                    self.max_reached = max(self.max_reached, int(self.limit))
+            self._cond.notify_all()
+
+    def _decrease(self, reason: str):
+        # une seule baisse par fenetre : les echecs d'une meme rafale ne comptent qu'une fois
+        if self.calls_since_decrease < int(self.limit):
+            return
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        self.calls_since_decrease = 0
+        self.n_decreases += 1
+        if reason == "latency": # la latence de reference repart de la mesure courante
+            self.ewma_latency = None
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            p50, p99 = np.percentile(self.latencies, [50, 99]) if self.latencies else (0.0, 0.0)
+            return {
+                "calls": self.n_calls,
+                "overloaded": self.n_overloaded,
+                "p50_latency_s": round(float(p50), 4),
+                "p99_latency_s": round(float(p99), 4),
+                "limit": int(self.limit),
+                "max_reached": self.max_reached,
+                "in_flight": self.in_flight,
+                "decreases": self.n_decreases,
+                "circuit": self.breaker.state,
+                "circuit_opened": self.breaker.n_opened,
+                "ewma_latency_s": round(self.ewma_latency or 0.0, 4),
+                "min_latency_s": round(self.min_latency or 0.0, 4),
+            }
@@ -0,0 +1,157 @@
+import json
+import pandas as pd
+import pyarrow as pa
+from typing import Dict, Iterable, Optional
+
+try:
+    import orjson
+except ImportError: # parser de la stdlib (plus lent, meme resultat)
+    orjson = None
+
+try:
+    from ..utils import logger
+except ImportError:
+    import sys
+    from pathlib import Path
+    current_dir = Path(__file__).resolve().parent
+    parent_dir = current_dir.parent
+    sys.path.append(str(parent_dir))
+    from utils import logger
+
+
+# types des champs connus des fournisseurs (les autres sont inférés par pyarrow)
+BAN_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("label", pa.string()),
+    ("score", pa.float64()),
+    ("housenumber", pa.string()),
+    ("name", pa.string()),
+    ("postcode", pa.string()),
+    ("citycode", pa.string()),
+    ("city", pa.string()),
+    ("context", pa.string()),
+    ("street", pa.string()),
+    ("type", pa.string()),
+    ("x", pa.float64()),
+    ("y", pa.float64()),
+    ("importance", pa.float64()),
+    ("lon", pa.float64()),
+    ("lat", pa.float64()),
+    ("full_adress", pa.string()),
+])
+ADEME_SCHEMA = pa.schema([
+    ("_id", pa.string()),
+    ("identifiant_ban", pa.string()),
+    ("code_postal_ban", pa.string()),
+    ("code_departement_ban", pa.string()),
+    ("code_insee_ban", pa.string()),
+    ("date_derniere_modification_dpe", pa.string()),
+    ("etiquette_dpe", pa.string()),
+    ("etiquette_ges", pa.string()),
+    ("surface_habitable_logement", pa.float64()),
+    ("conso_5_usages_par_m2_ep", pa.float64()),
+    ("conso_5_usages_par_m2_ef", pa.float64()),
+])
+# types arrow des dtypes pandas des schemas (ENEDIS_DTYPES, schema golden)
+ARROW_TYPES = {
+    "string": pa.string(),
+    "str": pa.string(),
+    "Int64": pa.int64(),
+    "int64": pa.int64(),
+    "float64": pa.float64(),
+    "float": pa.float64(),
+}
+
+
+def loads(content):
+    """Parse a JSON payload (bytes or str) with orjson when installed, the stdlib json otherwise."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def schema_from_dtypes(dtypes: Dict[str, str], base: Optional[pa.Schema] = None) -> pa.Schema:
+    """
+    Arrow schema of a {column: pandas dtype name} map (unknown dtypes are left to inference).
+    :param base: Schema completed (and overridden) by the map.
+    """
+    types = {f.name: f.type for f in base} if base is not None else {}
+    types.update({c: ARROW_TYPES[t] for c, t in dtypes.items() if t in ARROW_TYPES})
+    return pa.schema(list(types.items()))
+
+
+class ColumnarBuilder:
+    """
+    Build a typed table from JSON records (dicts), column by column.
+    - each record is spread into per-column lists as it comes : the caller can drop the
+    parsed page right away, no list of dicts is kept until the end
+    - the columns declared in `schema` are converted to their type by pyarrow (numeric
+    strings included), the others are inferred, mixed types are stored as strings
+    - a field missing from a record is null, a field first seen late is null before
+    - `to_pandas` builds the DataFrame from Arrow arrays (no object inference per cell)
+    :param schema: Types of the known fields (pa.Schema).
+    :param columns: Only these fields are kept (None : every field).
+    """
+    def __init__(self, schema: Optional[pa.Schema] = None, columns: Optional[Iterable[str]] = None):
+        self.schema = schema if schema is not None else pa.schema([])
+        self.columns = None if columns is None else set(columns)
+        self.n_rows = 0
+        self._values = {}
+
+    def append(self, record: dict):
+        n = self.n_rows
+        for k, v in record.items():
+            if self.columns is not None and k not in self.columns:
+                continue
+            col = self._values.get(k)
+            if col is None:
+                col = self._values[k] = []
+            if len(col) < n:
+                col.extend([None] * (n - len(col)))
+            col.append(v)
+        self.n_rows += 1
+        return self
+
+    def extend(self, records: Iterable[dict]):
+        for record in records:
+            self.append(record)
+        return self
+
+    def __len__(self):
+        return self.n_rows
+
+    def _array(self, name: str, values: list) -> pa.Array:
+        idx = self.schema.get_field_index(name)
+        typ = self.schema.field(idx).type if idx >= 0 else None
+        if typ is not None:
+            try:
+                return pa.array(values, type=typ)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                try: # valeurs numeriques en texte (ou l'inverse) : conversion par pyarrow
+                    return self._inferred(values).cast(typ)
+                except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                    logger.warning(f"ColumnarBuilder : column {name} does not match {typ}, kept as inferred.")
+        return self._inferred(values)
+
+    @staticmethod
+    def _inferred(values: list) -> pa.Array:
+        try:
+            return pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError): # types mélangés : texte
+            return pa.array([None if v is None else v if isinstance(v, str) else json.dumps(v) if isinstance(v, (dict, list)) else str(v) for v in values], type=pa.string())
+
+    def to_arrow(self) -> pa.Table:
+        """The accumulated records as an Arrow table (the builder is emptied)."""
+        arrays, names = [], []
+        for name in list(self._values):
+            values = self._values.pop(name)
+            values.extend([None] * (self.n_rows - len(values)))
+            arrays.append(self._array(name, values))
+            names.append(name)
+            del values
+        self.n_rows = 0
+        return pa.Table.from_arrays(arrays, names=names)
+
+    def to_pandas(self) -> pd.DataFrame:
+        """The accumulated records as a DataFrame (the builder is emptied)."""
+        return self.to_arrow().to_pandas()
@@ -1,9 +1,14 @@
 import os
 import time
 import httpx
-import requests
+import tempfile
 import functools 
 import threading
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from urllib.parse import quote
 import numpy as np 
 import pandas as pd
 from concurrent.futures import ThreadPoolExecutor
@@ -21,11 +26,23 @@ from prefect.cache_policies import NO_CACHE
 
 try:
     from ..scripts.filestorage_helper import FileStorageConnexion
+    from ..scripts.api_helper import AsyncApiRequester
+    from ..scripts.http_client import HttpClientRegistry
+    from ..scripts.checkpoint import CheckpointStore
+    from ..scripts.pipeline import StagePipeline
+    from ..scripts.join_engine import hash_join
+    from ..scripts.projection import SourceProjection
+    from ..scripts.decoder import ColumnarBuilder, BAN_SCHEMA, ADEME_SCHEMA, ARROW_TYPES, loads, schema_from_dtypes
+    from ..scripts.rate_limiter import RateLimiter, make_backend
+    from ..scripts.geocode_cache import GeocodeCache
+    from ..scripts.ademe_mirror import AdemeDepartmentMirror
     from ..utils import logger, decorator_logger
     from ..utils.fonctions import (
         get_env_var,
         get_today_date, 
-        normalize_df_colnames
+        normalize_df_colnames,
+        format_code_departement,
+        load_json
     )
 except ImportError:
     import sys
@@ -34,42 +51,55 @@ except ImportError:
     parent_dir = current_dir.parent
     sys.path.append(str(parent_dir))
     from scripts.filestorage_helper import FileStorageConnexion
+    from scripts.api_helper import AsyncApiRequester
+    from scripts.http_client import HttpClientRegistry
+    from scripts.checkpoint import CheckpointStore
+    from scripts.pipeline import StagePipeline
+    from scripts.join_engine import hash_join
+    from scripts.projection import SourceProjection
+    from scripts.decoder import ColumnarBuilder, BAN_SCHEMA, ADEME_SCHEMA, ARROW_TYPES, loads, schema_from_dtypes
+    from scripts.rate_limiter import RateLimiter, make_backend
+    from scripts.geocode_cache import GeocodeCache
+    from scripts.ademe_mirror import AdemeDepartmentMirror
     from utils import logger, decorator_logger
     from utils.fonctions import (
         get_env_var,
         get_today_date, 
-        normalize_df_colnames
+        normalize_df_colnames,
+        format_code_departement,
+        load_json
     )
 
-class RateLimiter:
-    """Thread-safe rate limiter"""
-    def __init__(self, rate_limit: int):
-        self.rate_limit = rate_limit
-        self.requests_made = 0
-        self.last_reset = time.time()
-        self.lock = threading.Lock()
-    
-    def acquire(self):
-        """Acquire permission to make a request, blocking if rate limit exceeded"""
-        with self.lock:
-            current_time = time.time()
-            
-            # Reset counter if more than 1 second has passed
-            if current_time - self.last_reset >= 1.0:
-                self.requests_made = 0
-                self.last_reset = current_time
-            
-            # If we've hit the rate limit, wait until next second
-            if self.requests_made >= self.rate_limit:
-                sleep_time = 1.0 - (current_time - self.last_reset)
-                if sleep_time > 0:
-                    time.sleep(sleep_time + 1)
-                # Reset after waiting
-                self.requests_made = 0
-                self.last_reset = time.time()
-            
-            self.requests_made += 1
-
+# types fixes des colonnes enedis (export et records) : pas d'inférence, codes gardés en texte
+ENEDIS_DTYPES = {
+    "annee": "string",
+    "code_iris": "string",
+    "nom_iris": "string",
+    "numero_de_voie": "string",
+    "indice_de_repetition": "string",
+    "type_de_voie": "string",
+    "libelle_de_voie": "string",
+    "code_commune": "string",
+    "nom_commune": "string",
+    "segment_de_client": "string",
+    "nombre_de_logements": "Int64",
+    "consommation_annuelle_totale_de_l_adresse_mwh": "float64",
+    "consommation_annuelle_moyenne_par_site_de_l_adresse_mwh": "float64",
+    "consommation_annuelle_moyenne_de_la_commune_mwh": "float64",
+    "adresse": "string",
+    "code_epci": "string",
+    "code_departement": "string",
+    "code_region": "string",
+    "tri_des_adresses": "Int64",
+}
+# entetes du csv input (fichier enedis telechargé depuis le site) -> noms de l'api
+ENEDIS_INPUT_RENAME = {
+    'Adresse': 'adresse',
+    'Nom Commune': 'nom_commune',
+    'Code Commune': 'code_commune',
+    'Code IRIS': 'code_iris',
+    'Code Département': 'code_departement'
+}
 
 class DataEnedisAdemeExtractor(FileStorageConnexion):
     """
@@ -86,34 +116,137 @@ class DataEnedisAdemeExtractor(FileStorageConnexion):
     - while export endpoint has no limitations of rows
     - maybe more efficient ot query in batch
     """
-    def __init__(self, debug=False):
+    def __init__(self, debug=False, use_geocode_cache=True):
         super().__init__()
         self.input = pd.DataFrame()
         self.output = pd.DataFrame()
+        self.output_parts = [] # parts silver du mode streaming (extract par chunks)
         self.ban_data = pd.DataFrame()
         self.ademe_data = pd.DataFrame()
+        self.enedis_with_ban = None # handoff en memoire (pa.Table) entre les deux merges
+        self.enedis_with_ban_spilled = False
+        # au dela de ce budget (Mo), le handoff enedis+ban est écrit en bronze au lieu de rester en memoire
+        self.handoff_memory_budget_mb = get_env_var('HANDOFF_MEMORY_BUDGET_MB', default_value=1024, compulsory=True, cast_to_type=float)
         self.PATH_FILE_INPUT_ENEDIS_CSV = get_env_var('PATH_FILE_INPUT_ENEDIS_CSV', compulsory=True)
         # --- objet debugger ---
         self.debug = debug
         if self.debug: self.debugger = {} 
         # --- fonctions urls ---
+        self.enedis_base_url = "https://data.enedis.fr"
         # generer une url pour requeter l'api enedis avec restriction sur l'année et le nombre de lignes
-        self.get_url_enedis_year_rows = lambda annee, rows: f"https://data.enedis.fr/api/explore/v2.1/catalog/datasets/consommation-annuelle-residentielle-par-adresse/records?where=annee%20%3D%20date'{annee}'&limit={rows}"
-        self.get_url_enedis=lambda annee,  code_departement, limit, offset: f"https://data.enedis.fr/api/explore/v2.1/catalog/datasets/consommation-annuelle-residentielle-par-adresse/records?where=annee%3Ddate%27{annee}%27%20and%20code_departement%3D%27{code_departement}%27&order_by=tri_des_adresses&limit={limit}&offset={offset}"
+        self.get_url_enedis_year_rows = lambda annee, rows: f"{self.enedis_base_url}/api/explore/v2.1/catalog/datasets/consommation-annuelle-residentielle-par-adresse/records?where=annee%20%3D%20date'{annee}'&limit={rows}"
+        # generer une url d'export complet (pas de limite de lignes) pour une année et un département
+        self.get_url_enedis_export = lambda annee, code_departement, fmt: "{}/api/explore/v2.1/catalog/datasets/consommation-annuelle-residentielle-par-adresse/exports/{}?where={}".format(
+            self.enedis_base_url, fmt, quote(f"annee=date'{annee}' and code_departement='{format_code_departement(code_departement)}'"))
+        # generer des urls sur l'endpoint records à partir d'une clause where (pagination / comptages par groupe)
+        self.get_url_enedis_records = lambda where, limit, offset: "{}/api/explore/v2.1/catalog/datasets/consommation-annuelle-residentielle-par-adresse/records?where={}&order_by=tri_des_adresses&limit={}&offset={}".format(
+            self.enedis_base_url, quote(where), limit, offset)
+        self.get_url_enedis_counts = lambda where, group_by: "{}/api/explore/v2.1/catalog/datasets/consommation-annuelle-residentielle-par-adresse/records?select={}&where={}&group_by={}&limit=-1".format(
+            self.enedis_base_url, quote(f"{group_by}, count(*) as n"), quote(where), group_by)
         # generer une url pour requeter l'api de la ban à partir d'une adresse
         self.get_url_ademe_filter_on_ban = lambda key: f"https://data.ademe.fr/data-fair/api/v1/datasets/dpe-v2-logements-existants/lines?size=1000&format=json&qs=Identifiant__BAN%3A{key}"
-        self.get_url_ademe_filter_on_ban = lambda key: f"https://data.ademe.fr/data-fair/api/v1/datasets/dpe03existant/lines?q_fields=identifiant_ban&q={key}" # update 19 juillet 2025
+        self.ademe_base_url = "https://data.ademe.fr"
+        self.get_url_ademe_filter_on_ban = lambda key: f"{self.ademe_base_url}/data-fair/api/v1/datasets/dpe03existant/lines?q_fields=identifiant_ban&q={key}" # update 19 juillet 2025
+        # generer une url pour requeter l'api ademe sur un lot d'id_ban (filtre OR, pagination via le lien 'next')
+        self.get_url_ademe_filter_on_ban_batch = lambda keys, size: "{}/data-fair/api/v1/datasets/dpe03existant/lines?size={}&qs={}".format(
+            self.ademe_base_url, size, quote("identifiant_ban:(" + " OR ".join(f'"{k}"' for k in keys) + ")"))
         # generer une url pour requeter l'api de la ban à partir d'une adresse
         self.get_url_ban_filter_on_adresse = lambda key: f"https://api-adresse.data.gouv.fr/search/?q={key}&limit=1"
-        self.get_url_ban_filter_on_adresse = lambda addr: f"https://data.geopf.fr/geocodage/search?q={addr}&limit=1" # adresse est complete car obtenue par concat dans enedis (update 23 juillet 2025)
+        self.ban_base_url = "https://data.geopf.fr"
+        self.get_url_ban_filter_on_adresse = lambda addr: f"{self.ban_base_url}/geocodage/search?q={addr}&limit=1" # adresse est complete car obtenue par concat dans enedis (update 23 juillet 2025)
         self.meta = "" # suffix files 
+        # --- limites des fournisseurs ---
+        self.enedis_rate_limit = 10 # req/s
+        self.enedis_offset_cap = 10_000 # endpoint records : offset + limit <= 10_000
+        self.enedis_page_size = 100 # endpoint records : limit <= 100
+        self.ban_rate_limit = 50 # req/s, cf. doc geoplateforme (50 appels/sec/IP)
+        self.ademe_rate_limit = 10 # req/s, data-fair ademe : 600 appels/min/IP
+        self.ademe_batch_size = 50 # id_ban par requete en mode batch
+        self.ademe_max_url_length = 2000 # les lots sont coupés avant de dépasser cette longueur d'url
+        self.ademe_page_size = 1000 # lignes par page (max data-fair : 10_000)
+        self.max_in_flight = 1000 # requetes simultanees max pour les moteurs async
+        # colonnes identifiant une ligne silver (dedup du merge final) : 1 logement ademe x 1 ligne enedis
+        self.merge_dedup_keys = ["_id_ademe", "full_adress_enedis", "annee_enedis", "segment_de_client_enedis"]
+        # quota partagé entre workers : "local" (process), "file:<dir>" (hote) ou "redis://..." (cluster)
+        self.rate_limit_backend = get_env_var('RATE_LIMIT_BACKEND', default_value="local", compulsory=True)
+        self._rate_limit_backends = {}
+        # clients http poolés par hote (keep-alive), politique de retry commune à tous les appels
+        self.http = HttpClientRegistry(
+            timeout=60,
+            http2=get_env_var('HTTP2_ENABLED', default_value="false", compulsory=True).lower() in ("1", "true", "yes"),
+            host_timeouts={
+                HttpClientRegistry.host_of(self.enedis_base_url): httpx.Timeout(60, read=600), # exports volumineux
+                HttpClientRegistry.host_of(self.ban_base_url): 30,
+                HttpClientRegistry.host_of(self.ademe_base_url): 90,
+            }
+        )
+        # --- caches locaux (toujours sur disque local, meme en env NOLOCAL) ---
+        default_cache_dir = self.PATH_DATA_BRONZE if self.env == "LOCAL" \
+            else os.path.join(os.path.expanduser("~"), ".cache", "dpe_enedis_ademe_etl_engine")
+        self.cache_dir = default_cache_dir
+        # cache persistant du geocodage (sqlite)
+        self.geocode_cache = None
+        if use_geocode_cache:
+            self.geocode_cache = GeocodeCache(
+                fpath=get_env_var('PATH_GEOCODE_CACHE', default_value=os.path.join(default_cache_dir, "cache", "geocode_cache.sqlite"), compulsory=True),
+                ttl_seconds=get_env_var('GEOCODE_CACHE_TTL_DAYS', default_value=30, compulsory=True, cast_to_type=float) * 24 * 3600,
+                max_entries=get_env_var('GEOCODE_CACHE_MAX_ENTRIES', default_value=1_000_000, compulsory=True, cast_to_type=int)
+            )
+        # miroir local des lignes ademe par departement (runs departement complet)
+        self.ademe_mirror = AdemeDepartmentMirror(
+            base_url=f"{self.ademe_base_url}/data-fair/api/v1/datasets/dpe03existant/lines",
+            root_dir=get_env_var('PATH_ADEME_MIRROR_DIR', default_value=os.path.join(default_cache_dir, "ademe_mirror"), compulsory=True)
+        )
+        self.ademe_mirror_synced = set()
+        # projection des champs sources (select data-fair ademe, proprietes BAN) deduite du schema golden
+        self.projection = SourceProjection()
+        if get_env_var('SOURCE_PROJECTION', default_value="golden", compulsory=True).lower() == "golden":
+            self.projection = SourceProjection.from_golden_schema(
+                get_env_var('SCHEMA_GOLDEN_DATA_FILEPATH', default_value=os.path.join("config", "schema_golden_data.json"), compulsory=True),
+                extra_columns=self.merge_dedup_keys
+            )
+        self.ademe_mirror.select = self.projection.ademe_fields
+        # schemas typés du decodeur colonnaire (types golden prioritaires pour ademe)
+        self.ademe_schema = schema_from_dtypes(self.projection.ademe_types, base=ADEME_SCHEMA)
+        self.enedis_schema = schema_from_dtypes(ENEDIS_DTYPES)
+        self.ademe_mirror.schema = self.ademe_schema
+        self.code_departement = -1
+        # journaux de reprise (par batch_id), actives par extract(checkpoint=True)
+        self.checkpoints = None
+
+    def get_async_engine(self, provider):
+        """
+        Async engine of a provider ("enedis", "ban", "ademe") : its rate limit and shared token bucket,
+        the shared retry policy, a pooled client configured by the http registry and the adaptive
+        concurrency controller of the host (shared with the sync calls of the registry).
+        """
+        base_url = getattr(self, f"{provider}_base_url")
+        return AsyncApiRequester(
+            rate_limit=getattr(self, f"{provider}_rate_limit"),
+            max_in_flight=self.max_in_flight,
+            backend=self.get_rate_limit_backend(provider),
+            retry_policy=self.http.retry_policy,
+            client_factory=lambda: self.http.new_async_client(base_url),
+            controller=self.http.controller(base_url),
+            debug=self.debug
+        )
+
+    def get_checkpoint_journal(self, stage):
+        """Checkpoint journal of a stage ("ban", "ademe") or None if checkpointing is disabled."""
+        return None if self.checkpoints is None else self.checkpoints.journal(stage)
+
+    def get_rate_limit_backend(self, provider):
+        """Token bucket backend of a provider ("enedis", "ban", "ademe"), shared by all its engines."""
+        if provider not in self._rate_limit_backends:
+            self._rate_limit_backends[provider] = make_backend(self.rate_limit_backend, name=provider)
+        return self._rate_limit_backends[provider]
 
     @decorator_logger
     @task(name="extract-input-df-from-PATH_FILE_INPUT_ENEDIS_CSV", retries=3, retry_delay_seconds=10, cache_policy=NO_CACHE)
-    def load_batch_input(self):
+    def load_batch_input(self, code_departement=None):
         """
         Load csv data from conso input file. 
-        Only input format allowed is csv.
+        Only input format allowed is csv (read by blocks, see `read_enedis_csv`).
         If the environment is LOCAL, it will load from a local CSV file.
         If the environment is not LOCAL, it will load from an S3 bucket.
         The input CSV file must contain the following columns:
@@ -123,16 +256,20 @@ class DataEnedisAdemeExtractor(FileStorageConnexion):
         - Code Département (optional, used for filtering)
         If the input CSV file is not valid or does not contain the required columns,
         it will raise an AssertionError.
+        :param code_departement: If set, only the rows of this department are kept (filtered while reading).
         """
         logger = get_run_logger()
 
         def load_enedis_input_from_local_csv():
-            self.input = pd.read_csv(self.PATH_FILE_INPUT_ENEDIS_CSV, sep=';')
+            self.input = self.read_enedis_csv(self.PATH_FILE_INPUT_ENEDIS_CSV, code_departement)
                      
         def load_enedis_input_from_s3_csv():
-            self.input = pd.read_csv(
-                self.client.get_object(self.BUCKET_NAME, self.PATH_FILE_INPUT_ENEDIS_CSV), sep=';'            
-                )
+            res = self.client.get_object(self.BUCKET_NAME, self.PATH_FILE_INPUT_ENEDIS_CSV)
+            try: # lu par blocs depuis le flux http, jamais chargé en entier
+                self.input = self.read_enedis_csv(res, code_departement)
+            finally:
+                res.close()
+                res.release_conn()
         
         try:
             if self.env=='LOCAL':
@@ -143,58 +280,271 @@ class DataEnedisAdemeExtractor(FileStorageConnexion):
             logger.critical(f"Erreur dans le chargement du fichier CSV input : {self.PATH_FILE_INPUT_ENEDIS_CSV}")
             raise
 
+    def read_enedis_csv(self, source, code_departement=None, block_size_mb=None):
+        """
+        Read an Enedis csv (';' separated) with the pyarrow streaming reader, block by block.
+        - explicit types (ENEDIS_DTYPES, also for the headers of the downloaded file, cf. ENEDIS_INPUT_RENAME) :
+        codes stay text (leading zeros kept), no type inference
+        - only the columns of the input schema (`schema-enedis` -> `all-cols` of SCHEMA_INPUT_DATA_FILEPATH)
+        are kept, every column if the schema is not found
+        - `code_departement` : the rows of the other departments are dropped block by block
+        (on the code_iris prefix), a national file never goes fully in memory
+        :param source: Path or binary file-like object (e.g. the S3 response stream).
+        :param block_size_mb: Size of the blocks read (default ENEDIS_CSV_BLOCK_SIZE_MB, 16).
+        :return: The DataFrame (original headers, renamed by `add_enedis_columns`).
+        """
+        block_size_mb = block_size_mb or get_env_var('ENEDIS_CSV_BLOCK_SIZE_MB', default_value=16, compulsory=True, cast_to_type=float)
+        inverse_rename = {v: k for k, v in ENEDIS_INPUT_RENAME.items()}
+        column_types = {}
+        for c, t in ENEDIS_DTYPES.items():
+            column_types[c] = ARROW_TYPES[t]
+            if c in inverse_rename: column_types[inverse_rename[c]] = ARROW_TYPES[t]
+        schema_cols = load_json(get_env_var(
+            'SCHEMA_INPUT_DATA_FILEPATH', default_value=os.path.join("config", "schema_input_data.json"), compulsory=True
+        ), default_value={}).get("schema-enedis", {}).get("all-cols")
+        reader = pacsv.open_csv(
+            source,
+            read_options=pacsv.ReadOptions(block_size=int(block_size_mb * 2**20)),
+            parse_options=pacsv.ParseOptions(delimiter=';'),
+            convert_options=pacsv.ConvertOptions(column_types=column_types, strings_can_be_null=True)
+        )
+        names = reader.schema.names
+        keep = [c for c in names if schema_cols is None or ENEDIS_INPUT_RENAME.get(c, c) in schema_cols]
+        iris_col = next((c for c in names if ENEDIS_INPUT_RENAME.get(c, c) == "code_iris"), None)
+        prefix = None if code_departement is None or iris_col is None else format_code_departement(code_departement)
+        batches, n_read = [], 0
+        for batch in reader:
+            n_read += batch.num_rows
+            if prefix is not None:
+                batch = batch.filter(pc.equal(pc.utf8_slice_codeunits(batch.column(iris_col), 0, 2), prefix))
+            batches.append(batch.select(keep))
+        table = pa.Table.from_batches(batches, schema=pa.schema([reader.schema.field(c) for c in keep]))
+        logger.info(f"Enedis csv read : {n_read} rows, {table.num_rows} kept, {len(keep)}/{len(names)} columns.")
+        return table.to_pandas()
+
     @decorator_logger
     def get_dataframe_from_url(self, url):
         """Extract pandas dataframe from any valid url."""
         logger.info(f"Fetching data from : {url}")
-        res = requests.get(url)
+        res = self.http.get(url)
         if res.status_code != 200:
             logger.critical(f"Error fetching data from {url} - Status code: {res.status_code} - Status message: {res.text}")
             raise ValueError(f"Error fetching data from {url} - Status code: {res.status_code} - Status message: {res.text}")
-        res = res.json().get('results')
-        return pd.DataFrame(res)
+        res = loads(res.content).get('results')
+        return ColumnarBuilder(self.enedis_schema).extend(res or []).to_pandas()
+
+    def parse_ban_response(self, j, addr):
+        """
+        Parse a BAN geocoding response (geojson).
+        :param j: The json payload returned by the BAN API.
+        :param addr: The address which was queried.
+        :return: A dictionary with the first result properties, lon, lat and full_adress or None.
+        """
+        features = j.get('features') or []
+        if len(features) == 0:
+            return None
+        first_result = features[0]
+        lon, lat = first_result.get('geometry').get('coordinates')
+        properties = self.projection.prune_ban_properties(first_result.get('properties'))
+        return { **properties, **{"lon": lon, "lat": lat}, **{'full_adress': addr}}
 
-    @functools.lru_cache(maxsize=128)
     def call_ban_api_individually(self, addr):
         """ 
         Call the BAN API individually for a given address.
         :param addr: The address to query the BAN API.
         :return: A dictionary with the BAN data for the given address.
         """
-        res = requests.get(self.get_url_ban_filter_on_adresse(addr), timeout=60)
+        res = self.http.get(self.get_url_ban_filter_on_adresse(addr))
         if res.status_code == 200:
-            j = res.json()
-            if len(j.get('features')) > 0:
-                first_result = j.get('features')[0]
-                lon, lat = first_result.get('geometry').get('coordinates')
-                first_result_all_infos = { **first_result.get('properties'), **{"lon": lon, "lat": lat}, **{'full_adress': addr}}
-                first_result_all_infos = { **first_result_all_infos, **{"thread_name": threading.current_thread().name}}
-                time.sleep(1) # limite 50 appels/sec - stratégie : 1 thread attend 1 sec
-                return first_result_all_infos
-            else:
-                return
+            return self.parse_ban_response(loads(res.content), addr) # debit borné par le token bucket du moteur
         else:
             return
-        
-    @functools.lru_cache(maxsize=128)
+
+    async def async_call_ban_api_individually(self, client, addr):
+        """
+        Async version of `call_ban_api_individually` used by the async engine.
+        No sleep here : the rate limit is enforced by the engine token bucket.
+        :param client: The shared httpx.AsyncClient.
+        :param addr: The address to query the BAN API.
+        :return: A dictionary with the BAN data for the given address or None.
+        """
+        res = await client.get(self.get_url_ban_filter_on_adresse(addr))
+        if 400 <= res.status_code < 500 and res.status_code != 429:
+            return None # requete refusée (adresse trop courte/longue...) : définitif, traité comme non trouvée
+        res.raise_for_status() # erreur transitoire != adresse non trouvée (pas mise en cache)
+        return self.parse_ban_response(loads(res.content), addr)
+
+    def request_ban_async(self, adress_list):
+        """
+        Geocode a list of addresses with the async engine.
+        :param adress_list: The list of addresses to query the BAN API.
+        :return: A list of BAN results (same order as adress_list, None if not found).
+        """
+        journal = self.get_checkpoint_journal("ban")
+        on_result = (lambda i, r: journal.append(adress_list[i], r)) if journal is not None else None
+        engine = self.get_async_engine("ban")
+        res = engine.run(self.async_call_ban_api_individually, adress_list, on_result)
+        if journal is not None: journal.flush()
+        self.ban_failed_adresses = {adress_list[i] for i, _ in engine.errors}
+        return res
+
+    def geocode_adresses(self, adress_list, n_threads, engine="async"):
+        """
+        Geocode addresses, only the ones missing from the geocode cache are sent to the BAN.
+        :param adress_list: The list of addresses to geocode.
+        :param n_threads: Number of threads (threads engine only).
+        :param engine: "async" or "threads".
+        :return: A list of BAN results (same order as adress_list, None if not found).
+        """
+        cached = self.geocode_cache.get_many(adress_list) if self.geocode_cache is not None else {}
+        # reprise : les adresses déjà geocodées par une tentative precedente du batch ne sont pas renvoyées
+        journal = self.get_checkpoint_journal("ban")
+        done = journal.load() if journal is not None else {}
+        if done:
+            done = {a: done[a] for a in adress_list if a in done and a not in cached}
+            logger.info(f"BAN checkpoint : {len(done)} addresses reused from the journal.")
+        to_query = [a for a in adress_list if a not in cached and a not in done]
+        self.ban_failed_adresses = set()
+        if engine == "async":
+            queried = self.request_ban_async(to_query)
+        elif engine == "threads":
+            queried = self.multithreaded_api_request(
+                num_threads=n_threads,
+                api_call_func=self.call_ban_api_individually,
+                obj_list=to_query,
+                rate_limit=self.ban_rate_limit,
+                backend=self.get_rate_limit_backend("ban")
+            )
+            # pas de distinction erreur/non trouvée : on ne met en cache que les adresses trouvées
+            self.ban_failed_adresses = {a for a, r in zip(to_query, queried) if r is None}
+        else:
+            raise ValueError(f"Unknown BAN engine : {engine} (choose between 'async' and 'threads')")
+        queried = dict(zip(to_query, queried))
+        queried.update(done)
+        if self.geocode_cache is not None:
+            self.geocode_cache.set_many({
+                a: r for a, r in queried.items() if a not in self.ban_failed_adresses
+            })
+            self.geocode_cache.log_stats()
+        return [cached[a] if a in cached else queried[a] for a in adress_list]
+
+    def with_ademe_select(self, url):
+        """Add the projected Ademe fields to a data-fair url (`select` parameter), unchanged without projection."""
+        select = self.projection.ademe_select()
+        return url if select is None else f"{url}&select={quote(select, safe=',')}"
+
     def call_ademe_api_individually(self, id_ban):
         """
         Call the Ademe API individually for a given id_ban.
         :param id_ban: The id_ban to query the Ademe API.
-        :return: A dictionary with the Ademe data for the given id_ban.
+        :return: A list with the Ademe lines (logements) for the given id_ban.
         """
-        res = requests.get(self.get_url_ademe_filter_on_ban(id_ban), timeout=90)
+        res = self.http.get(self.with_ademe_select(self.get_url_ademe_filter_on_ban(id_ban)))
         if res.status_code == 200:
-            j = res.json()
+            j = loads(res.content)
             if j.get('results'):
-                return j.get('results')[0]
+                return j.get('results')
             else:
                 logger.warning(f"No results found for id_ban: {id_ban}")
                 return None
         else:
             logger.error(f"Error fetching data for id_ban: {id_ban}. Status code: {res.status_code}")
             return None
-    
+
+    async def async_call_ademe_api_individually(self, client, id_ban):
+        """
+        Async version of `call_ademe_api_individually` used by the async engine.
+        Raises on http errors so that the engine retries the id_ban.
+        :param client: The shared httpx.AsyncClient.
+        :param id_ban: The id_ban to query the Ademe API.
+        :return: A list with the Ademe lines for the given id_ban or None.
+        """
+        res = await client.get(self.with_ademe_select(self.get_url_ademe_filter_on_ban(id_ban)))
+        res.raise_for_status()
+        return loads(res.content).get('results') or None
+
+    def request_ademe_async(self, id_ban_list):
+        """
+        Fetch the Ademe lines of a list of id_ban with the async engine.
+        :param id_ban_list: The list of (unique) id_ban to query the Ademe API.
+        :return: A list of Ademe results (same order as id_ban_list, None if not found).
+        """
+        journal = self.get_checkpoint_journal("ademe")
+        on_result = (lambda i, r: journal.append(id_ban_list[i], r or [])) if journal is not None else None
+        engine = self.get_async_engine("ademe")
+        res = engine.run(self.async_call_ademe_api_individually, id_ban_list, on_result)
+        if journal is not None: journal.flush()
+        if engine.errors:
+            logger.warning(f"Ademe data extraction : {len(engine.errors)} id_ban in error after retries.")
+        return res
+
+    def iter_id_ban_batches(self, id_ban_list, batch_size=None, max_url_length=None):
+        """
+        Split a list of id_ban in batches for the batched Ademe queries.
+        A batch holds at most `batch_size` id_ban and its url never exceeds
+        `max_url_length` characters (an id_ban alone is always a valid batch).
+        :param id_ban_list: The list of (unique) id_ban.
+        :param batch_size: Max number of id_ban per batch (default self.ademe_batch_size).
+        :param max_url_length: Max url length (default self.ademe_max_url_length).
+        :return: A generator of lists of id_ban.
+        """
+        batch_size = batch_size or self.ademe_batch_size
+        max_url_length = max_url_length or self.ademe_max_url_length
+        batch = []
+        for _id in id_ban_list:
+            if batch and (
+                len(batch) >= batch_size or
+                len(self.get_url_ademe_filter_on_ban_batch(batch + [_id], self.ademe_page_size)) > max_url_length
+            ):
+                yield batch
+                batch = []
+            batch.append(_id)
+        if batch:
+            yield batch
+
+    async def async_call_ademe_api_batch(self, client, id_ban_batch):
+        """
+        Fetch the Ademe lines of a batch of id_ban in one (paginated) query.
+        The pages are followed through the 'next' link of the data-fair response.
+        :param client: The shared httpx.AsyncClient.
+        :param id_ban_batch: The list of id_ban of the batch.
+        :return: A dict {id_ban: [lines]} with every id_ban of the batch (empty list if not found).
+        """
+        lines_per_id = {_id: [] for _id in id_ban_batch}
+        url = self.with_ademe_select(self.get_url_ademe_filter_on_ban_batch(id_ban_batch, self.ademe_page_size))
+        while url: # le lien 'next' de data-fair garde le select
+            res = await client.get(url)
+            res.raise_for_status()
+            j = loads(res.content)
+            for line in j.get('results', []):
+                lines_per_id.setdefault(line.get('identifiant_ban'), []).append(line)
+            url = j.get('next') if j.get('results') else None
+        return lines_per_id
+
+    def request_ademe_batched(self, id_ban_list, batch_size=None):
+        """
+        Fetch the Ademe lines of a list of id_ban with batched queries (async engine).
+        :param id_ban_list: The list of (unique) id_ban to query the Ademe API.
+        :param batch_size: Max number of id_ban per query.
+        :return: A list of Ademe results (same order as id_ban_list, None if not found).
+        """
+        batches = list(self.iter_id_ban_batches(id_ban_list, batch_size))
+        logger.info(f"Ademe batched queries : {len(id_ban_list)} id_ban in {len(batches)} batches.")
+        journal = self.get_checkpoint_journal("ademe")
+        def on_result(i, lines_per_batch_id):
+            for _id, lines in lines_per_batch_id.items():
+                journal.append(_id, lines)
+        engine = self.get_async_engine("ademe")
+        res = engine.run(self.async_call_ademe_api_batch, batches, on_result if journal is not None else None)
+        if journal is not None: journal.flush()
+        if engine.errors:
+            logger.warning(f"Ademe batched queries : {len(engine.errors)} batches in error after retries.")
+        lines_per_id = {}
+        for r in res:
+            if r is not None:
+                lines_per_id.update(r)
+        return [lines_per_id.get(_id) or None for _id in id_ban_list]
+
     def request_ban_from_adress_list(self, adress_list, n_threads):
         workers = ThreadPoolExecutor(max_workers=n_threads)
         res = workers.map(self.call_ban_api_individually, adress_list)
@@ -225,16 +575,20 @@ class DataEnedisAdemeExtractor(FileStorageConnexion):
         api_call_func: Callable[[Any], Any],
         obj_list: List[Any],
         rate_limit: int,
-        timeout: Optional[float] = None
+        timeout: Optional[float] = None,
+        backend=None
     ) -> List[Any]:
         """
         Make multithreaded API requests with rate limiting.
+        The calls made through `self.http` also follow the adaptive concurrency limit
+        of their host (AIMD + circuit breaker) : `num_threads` is only an upper bound.
         Args:
-            num_threads: Number of threads to use
+            num_threads: Max number of threads to use
             api_call_func: Function that takes an object from obj_list and returns API response
             obj_list: List of objects to process
             rate_limit: Maximum number of requests per second
             timeout: Optional timeout for each request in seconds
+            backend: Optional token bucket backend shared with other workers (see `get_rate_limit_backend`)
         
         Returns:
             List of results from API calls (same order as input list)
@@ -256,7 +610,7 @@ class DataEnedisAdemeExtractor(FileStorageConnexion):
             return []
         
         # Initialize rate limiter and results storage
-        rate_limiter = RateLimiter(rate_limit)
+        rate_limiter = RateLimiter(rate_limit, backend=backend)
         results = [None] * len(obj_list)
         errors = []
         
@@ -266,23 +620,19 @@ class DataEnedisAdemeExtractor(FileStorageConnexion):
                 # Acquire rate limit permission
                 rate_limiter.acquire()
                 # Make the API call
-                if timeout:
-                    # You might want to implement timeout handling in your api_call_func
-                    result = api_call_func(obj)
-                else:
-                    result = api_call_func(obj)    
+                start = time.perf_counter()
+                try:
+                    if timeout:
+                        # You might want to implement timeout handling in your api_call_func
+                        result = api_call_func(obj)
+                    else:
+                        result = api_call_func(obj)    
+                finally:
+                    rate_limiter.metrics.record_call(time.perf_counter() - start)
                 return index, result, None
             except Exception as e:
-                if "Max retries exceeded" in str(e):
-                    time.sleep(30) # nombre de secondes bloquées non communiquées
-                    try:
-                        rate_limiter.acquire()
-                        result = api_call_func(obj)
-                        return index, result, None
-                    except Exception as e:
-                        return index, None, e
-                else:
-                    return index, result, None
+                # les erreurs transitoires sont deja retentées (politique de retry + circuit breaker du client http)
+                return index, None, e
 
         
         # Use ThreadPoolExecutor for better thread management
@@ -304,6 +654,8 @@ class DataEnedisAdemeExtractor(FileStorageConnexion):
         # Print summary
         successful = len([r for r in results if r is not None])
         if self.debug: print(f"Completed {successful}/{len(obj_list)} requests successfully")
+        logger.info(f"Rate limiter wait metrics : {rate_limiter.metrics.snapshot()}")
+        logger.info(f"Adaptive concurrency : {self.http.controller_stats()}")
         
         if errors and self.debug:
             print(f"Encountered {len(errors)} errors")
@@ -334,35 +686,154 @@ class DataEnedisAdemeExtractor(FileStorageConnexion):
     @decorator_logger
     @task(name="compute-adress-columns-and-format", retries=3, retry_delay_seconds=10, cache_policy=NO_CACHE)
     def add_enedis_columns(self):
-        self.input = self.input.rename(
-                        columns={
-                            'Adresse': 'adresse', 
-                            'Nom Commune': 'nom_commune', 
-                            'Code Commune': 'code_commune',
-                            'Code IRIS': 'code_iris',
-                            'Code Département': 'code_departement'
-                        })
+        self.input = self.input.rename(columns=ENEDIS_INPUT_RENAME)
         # validate schama with input required cols
         #assert all(col in self.input.columns for col in ['adresse', 'nom_commune', 'code_commune']),\
         #       f"Erreur dans le chargement du fichier CSV input : {self.PATH_FILE_INPUT_ENEDIS_CSV} - "
-        self.input['code_departement'] = self.input['code_iris'].apply(lambda r: int(r[:2]))
+        # colonnes dérivées vectorisées (pas de lambda par ligne) : 2 premiers caracteres du code iris
+        self.input['code_departement'] = pd.to_numeric(
+            self.input['code_iris'].astype('string').str[:2], errors='coerce'
+        ).astype('Int64') # corse (2A/2B) : NA
         self.input['code_commune'] = self.input['code_commune'].astype('str')
         self.input['nom_commune'] = self.input['nom_commune'].astype('str')
         self.input['full_adress'] = self.input['adresse'] + ' ' + self.input['code_commune'] + ' ' + self.input['nom_commune']
 
-    def call_enedis_api_single_thread(self, annee, code_departement, limit, offset):
-        u = self.get_url_enedis(annee, code_departement, limit, offset)
-        resp = requests.get(u)
-        if resp.status_code == 200:
-            return resp.json().get('results', [])
-        return []
-
-    def call_enedis_api_mutlithreads(self, annee, code_departement):
-        params = [{"annee":annee, "code_departement":code_departement, "limit":100, "offset":i*100} for i in range(100)]
-        results = []
-        for p in params:
-            results.extend(self.call_enedis_api_single_thread(**p))
-        return results
+    def get_enedis_counts(self, where, group_by):
+        """
+        Count the Enedis records per value of `group_by` for a where clause.
+        :return: A list of (value, count).
+        """
+        res = self.http.get(self.get_url_enedis_counts(where, group_by))
+        res.raise_for_status()
+        return [(r.get(group_by), int(r.get('n', 0))) for r in loads(res.content).get('results', [])]
+
+    def plan_enedis_partitions(self, annee, code_departement):
+        """
+        Split a department/year in sub-queries which fit under the records offset cap.
+        The department is split per code_commune, and the communes above the cap per code_iris.
+        :return: A list of (where clause, number of records).
+        """
+        def clause(col, value): # les clés nulles du group_by ne matchent pas col='None'
+            return f"{col} is null" if value is None else f"{col}='{value}'"
+
+        base_where = f"annee=date'{annee}' and code_departement='{format_code_departement(code_departement)}'"
+        partitions = []
+        for code_commune, n in self.get_enedis_counts(base_where, "code_commune"):
+            where = f"{base_where} and {clause('code_commune', code_commune)}"
+            if n <= self.enedis_offset_cap:
+                partitions.append((where, n))
+                continue
+            for code_iris, n_iris in self.get_enedis_counts(where, "code_iris"):
+                if n_iris > self.enedis_offset_cap:
+                    logger.warning(f"Enedis partition code_iris={code_iris} has {n_iris} records, truncated to {self.enedis_offset_cap}.")
+                partitions.append((f"{where} and {clause('code_iris', code_iris)}", min(n_iris, self.enedis_offset_cap)))
+        return partitions
+
+    async def async_call_enedis_records_page(self, client, page):
+        """
+        Fetch one page of Enedis records.
+        :param client: The shared httpx.AsyncClient.
+        :param page: A tuple (where clause, limit, offset).
+        :return: The list of records of the page.
+        """
+        res = await client.get(self.get_url_enedis_records(*page))
+        res.raise_for_status()
+        return loads(res.content).get('results', [])
+
+    def get_enedis_records_partitioned(self, annee, code_departement):
+        """
+        Fetch every Enedis record of a department/year through the records endpoint,
+        beyond the 10_000 offset ceiling : the work is split in partitions (commune, iris)
+        which fit under the cap, their pages are fetched concurrently then merged
+        and deduplicated on adresse/code_iris.
+        :return: The typed Enedis DataFrame.
+        """
+        partitions = self.plan_enedis_partitions(annee, code_departement)
+        pages = [
+            (where, self.enedis_page_size, offset)
+            for where, n in partitions
+            for offset in range(0, n, self.enedis_page_size)
+        ]
+        logger.info(f"Enedis partitioned fetch : {len(partitions)} partitions, {len(pages)} pages.")
+        engine = self.get_async_engine("enedis")
+        res = engine.run(self.async_call_enedis_records_page, pages)
+        if engine.errors:
+            raise ValueError(f"Enedis partitioned fetch : {len(engine.errors)} pages in error after retries.")
+        builder = ColumnarBuilder(self.enedis_schema)
+        for i, page in enumerate(res):
+            builder.extend(page or [])
+            res[i] = None # page liberée des qu'elle est en colonnes
+        df = builder.to_pandas()
+        n_expected = sum(n for _, n in partitions)
+        if len(df) != n_expected:
+            raise ValueError(f"Enedis partitioned fetch : {len(df)} records fetched, {n_expected} counted.")
+        df = self.type_enedis_df(df)
+        if not df.empty:
+            df = df.drop_duplicates(subset=[c for c in ("adresse", "code_iris") if c in df.columns])
+        return df.reset_index(drop=True)
+
+    def download_enedis_export(self, annee, code_departement, fmt="parquet", chunk_size=1 << 20):
+        """
+        Stream the Enedis export of a department/year to a local temporary file.
+        The response is written by chunks, it is never held in memory as a whole.
+        :param annee: Year to filter the data.
+        :param code_departement: Code of the department to filter the data.
+        :param fmt: Export format, "parquet", "csv" or "jsonl".
+        :param chunk_size: Size of the chunks written to disk (bytes).
+        :return: Path of the downloaded file.
+        """
+        url = self.get_url_enedis_export(annee, code_departement, fmt)
+        tmp_dir = os.path.join(self.PATH_DATA_BRONZE, "tmp") if self.env == "LOCAL" else None
+        if tmp_dir: os.makedirs(tmp_dir, exist_ok=True)
+        fd, fpath = tempfile.mkstemp(prefix=f"enedis_export_{annee}_{code_departement}_", suffix=f".{fmt}", dir=tmp_dir)
+        logger.info(f"Streaming enedis export : {url}")
+        try:
+            with os.fdopen(fd, "wb") as f, self.http.stream(url) as res:
+                for chunk in res.iter_bytes(chunk_size):
+                    f.write(chunk)
+        except Exception:
+            os.remove(fpath)
+            raise
+        logger.info(f"Enedis export downloaded : {os.path.getsize(fpath)} bytes in {fpath}")
+        return fpath
+
+    def read_enedis_export(self, fpath, fmt="parquet"):
+        """
+        Read a downloaded Enedis export into a DataFrame typed with ENEDIS_DTYPES.
+        :param fpath: Path of the export file.
+        :param fmt: Export format, "parquet", "csv" or "jsonl".
+        :return: The typed DataFrame.
+        """
+        if fmt == "parquet":
+            df = pq.read_table(fpath).to_pandas()
+        elif fmt == "csv":
+            df = pd.read_csv(fpath, sep=';', dtype={c: t for c, t in ENEDIS_DTYPES.items() if t == "string"})
+        elif fmt == "jsonl":
+            df = pd.read_json(fpath, lines=True, dtype=False)
+        else:
+            raise ValueError(f"Unknown Enedis export format : {fmt} (choose between 'parquet', 'csv' and 'jsonl')")
+        return self.type_enedis_df(df)
+
+    def type_enedis_df(self, df):
+        """Cast the Enedis columns with the fixed ENEDIS_DTYPES map."""
+        dtypes = {c: t for c, t in ENEDIS_DTYPES.items() if c in df.columns}
+        for c, t in dtypes.items():
+            if t == "string":
+                df[c] = df[c].astype("string")
+            else:
+                df[c] = pd.to_numeric(df[c], errors="coerce").astype(t)
+        return df
+
+    def get_enedis_export(self, annee, code_departement, fmt="parquet"):
+        """
+        One request per department/year : stream the export to disk then read it (no record cap).
+        :return: The typed Enedis DataFrame.
+        """
+        fpath = self.download_enedis_export(annee, code_departement, fmt)
+        try:
+            return self.read_enedis_export(fpath, fmt)
+        finally:
+            os.remove(fpath)
 
     # TACHE EXTRACTION 1
     @decorator_logger
@@ -372,7 +843,9 @@ class DataEnedisAdemeExtractor(FileStorageConnexion):
         from_input:bool=False, 
         code_departement:int=-1, 
         annee:int=2023, 
-        rows:int=10
+        rows:int=10,
+        enedis_source:Optional[str]=None,
+        export_format:str="parquet"
     ):
         """
         Extraire le dataframe enedis soit à partir d'un fichier csv 
@@ -381,18 +854,39 @@ class DataEnedisAdemeExtractor(FileStorageConnexion):
         :param code_departement: Code of the department to filter the data.
         :param annee: Year to filter the data.
         :param rows: Number of rows to extract from the Enedis API.
+        :param enedis_source: "export" (exports endpoint, streamed, no record cap) or "records" (paginated records endpoint).
+        Default is "export" for full-department runs (rows=-1), "records" otherwise. With rows=-1, if the
+        export fails, the records are fetched by partitions (see `get_enedis_records_partitioned`).
+        :param export_format: Format of the export, "parquet" (default), "csv" or "jsonl".
         :return: self, with self.input containing the Enedis data.
         """
         logger = get_run_logger()
+        self.code_departement = code_departement
 
         if self.debug: print("-> get_enedis_data")
         if from_input:
-            self.load_batch_input()
+            self.load_batch_input(code_departement if code_departement > 0 else None)
             if self.debug: self.debugger.update({'source_enedis': "input csv"})
         else:
-            if rows == -1:
-                self.input = pd.DataFrame(self.call_enedis_api_mutlithreads(annee=annee, code_departement=code_departement)).drop_duplicates().reset_index(drop=True)
-            else:
+            if enedis_source is None:
+                enedis_source = "export" if rows == -1 else "records"
+            if enedis_source not in ("export", "records"):
+                raise ValueError(f"Unknown Enedis source : {enedis_source} (choose between 'export' and 'records')")
+            if enedis_source == "export":
+                if code_departement <= 0:
+                    raise ValueError("Enedis export requires a code_departement.")
+                try:
+                    self.input = self.get_enedis_export(annee, code_departement, export_format)
+                    if rows > 0: self.input = self.input.head(rows)
+                    if self.debug: self.debugger.update({'source_enedis': self.get_url_enedis_export(annee, code_departement, export_format)})
+                except Exception as e:
+                    if rows != -1: raise
+                    logger.warning(f"Enedis export failed ({e}), falling back on the partitioned records fetch.")
+                    enedis_source = "records"
+            if enedis_source == "records" and rows == -1:
+                self.input = self.get_enedis_records_partitioned(annee, code_departement)
+                if self.debug: self.debugger.update({'source_enedis': "records (partitioned)"})
+            elif enedis_source == "records":
                 requete_url_enedis = self.get_url_enedis_year_rows(annee, rows)
                 if code_departement>0: # filter sur le code département dans l'url
                     # requete_url_enedis += f"&where=code_departement%20%3D%20{code_departement}"
@@ -418,10 +912,11 @@ class DataEnedisAdemeExtractor(FileStorageConnexion):
     # TACHE EXTRACTION 2
     @decorator_logger
     @task(name="extract-data-from-ban-api", retries=3, retry_delay_seconds=10, cache_policy=NO_CACHE)
-    def get_ban_data(self, n_threads):    
+    def get_ban_data(self, n_threads, engine="async"):    
         """
         Extraire le dataframe de la BAN à partir d'une liste d'adresses.
-        :param n_threads: Number of threads to use for querying the BAN API.
+        :param n_threads: Number of threads to use for querying the BAN API (threads engine only).
+        :param engine: "async" (asyncio/httpx, token bucket) or "threads" (legacy thread pool).
         :return: self, with self.ban_data containing the BAN data.
         :raises ValueError: If the input dataframe is empty.
         """
@@ -435,37 +930,34 @@ class DataEnedisAdemeExtractor(FileStorageConnexion):
         enedis_adresses_list = list(set(self.input.full_adress.values.tolist()))
         if self.debug: print(f"-> get_ban_data : {len(enedis_adresses_list)}")
 
-        # tache 3 - requeter l'api de la BAN sur les adresses enedis avec n_threads
-        # self.ban_data = self.request_api_multithreaded(
-        #         api_call_func=self.call_ban_api_individually,
-        #         obj_list=enedis_adresses_list,
-        #         n_threads=n_threads
-        #     )
-        self.ban_data = self.multithreaded_api_request(
-            num_threads=n_threads,
-            api_call_func=self.call_ban_api_individually,
-            obj_list=enedis_adresses_list,
-            rate_limit=30 # 50 en vrai d'après la doc
-        )
-        # tache 4 - filtrer les adresses valides
-        self.ban_data = list(filter(lambda x: x is not None, self.ban_data))
-        if not self.ban_data:
+        # tache 3 - requeter l'api de la BAN sur les adresses enedis (hors cache), garder les adresses valides
+        self.ban_data = self.get_ban_dataframe(enedis_adresses_list, n_threads, engine)
+        if self.ban_data.empty:
             logger.critical("Erreur dans le chargement des données BAN : pas de données")
             raise ValueError("Pas de données dans le dataframe BAN")
-        # tache 5 - convertir en dataframe pandas
-        self.ban_data = pd.DataFrame(self.ban_data)
-
-        vectorized_upper = np.vectorize(str.upper, cache=True) # est une optimisation
-        self.ban_data['label'] = vectorized_upper(self.ban_data['label'].values) 
-        # on remet en upper car on en a besoin pour le merge avec enedis
         if self.debug: self.debugger.update({'sample_ban_data': self.ban_data.tail(5)})
         logger.info(f"Valid data BAN : {len(self.ban_data)} addresses founded over {len(enedis_adresses_list)} requested.")
         return self
 
+    def get_ban_dataframe(self, adress_list, n_threads, engine="async"):
+        """
+        Geocode addresses and keep the found ones as a dataframe.
+        :param adress_list: The list of (unique) addresses.
+        :return: The BAN dataframe (empty if no address is found).
+        """
+        ban_data = ColumnarBuilder(BAN_SCHEMA, columns=self.projection.ban_properties)\
+            .extend(r for r in self.geocode_adresses(adress_list, n_threads, engine) if r is not None)\
+            .to_pandas() # columns : resultats mis en cache avant la projection
+        if not ban_data.empty:
+            vectorized_upper = np.vectorize(str.upper, cache=True) # est une optimisation
+            ban_data['label'] = vectorized_upper(ban_data['label'].values) 
+            # on remet en upper car on en a besoin pour le merge avec enedis
+        return ban_data
+
     # TACHE EXTRACTION 3
     @decorator_logger
     @task(name="extract-data-from-ademe-api", retries=3, retry_delay_seconds=10, cache_policy=NO_CACHE)
-    def get_ademe_data(self, n_threads):
+    def get_ademe_data(self, n_threads, engine="batch", batch_size=None):
         """
         Extraire la data de l'ademe au complet en utilisant 
         la liste des id_ban.
@@ -473,38 +965,66 @@ class DataEnedisAdemeExtractor(FileStorageConnexion):
         - recup le df ademe data sur la base des id_ban
         - sur la base des Identifiants BAN de enedis, aller chercher les logements mappés sur ces codes BAN
         - 1 id_ban = * adresses (entre 10 et 1_000) - en effet, les données enedis sont agrégées
+        - les id_ban sont dédupliqués avant requête (la liste vient du merge enedis+ban)
+        :param n_threads: Number of threads to use for querying the Ademe API (threads engine only).
+        :param engine: "batch" (async engine, N id_ban per query), "async" (one query per id_ban,
+        token bucket, retries per id_ban), "threads" or "mirror" (local department mirror,
+        synced incrementally, no per id_ban API call).
+        :param batch_size: Max number of id_ban per query for the batch engine (default self.ademe_batch_size).
         """
         logger = get_run_logger()
         if self.debug: print("-> get_ademe_data")
-        ademe_data = []
-        # ? multithreading -> limite les requetes en parallele - renvoie 0 resultats si trop de requetes en parallele
-        ademe_data_res = []
-        k = 0
-        for _id in self.id_BAN_list:
-            try:
-                resp = requests.get(self.get_url_ademe_filter_on_ban(_id), timeout=60)
-                if resp.status_code==200:
-                    ademe_data_res.append(resp.json().get('results'))
-            except:
-                pass
-            time.sleep(1) # 600 req/secondes = 0,001s pour 1 req => on y va 2000 fois plus lentement que le rate limiteur
-            k+=1
-            if k % 100 == 0:
-                logger.info(f"Ademe data extraction progress : {k}/{len(self.id_BAN_list)}")
-                time.sleep(10) # on attend 60 secondes toutes les 100 requetes pour ne pas dépasser le rate limit
-        ademe_data_res = list(filter(lambda x: x is not None, ademe_data_res))
-        if not ademe_data_res:
+        ademe_data = self.get_ademe_dataframe(self.id_BAN_list, n_threads, engine, batch_size)
+        if ademe_data.empty:
             logger.critical("Erreur dans le chargement des données Ademe : pas de données")
             raise ValueError("Pas de données dans le dataframe Ademe")
+        return self.set_ademe_data(ademe_data)
+
+    def get_ademe_dataframe(self, id_ban_list, n_threads, engine="batch", batch_size=None):
+        """
+        Fetch the raw Ademe lines of a list of id_ban (deduplicated here) with one of the engines.
+        :return: The Ademe dataframe (empty if no line is found).
+        """
+        n_id_ban = len(id_ban_list)
+        id_ban_list = list(dict.fromkeys(_id for _id in id_ban_list if pd.notna(_id)))
+        logger.info(f"Ademe data extraction : {len(id_ban_list)} unique id_ban over {n_id_ban}.")
+        if engine == "mirror":
+            return self.get_ademe_data_from_mirror(id_ban_list)
+        # reprise : les id_ban deja recuperés par une tentative precedente du batch ne sont pas redemandés
+        journal = self.get_checkpoint_journal("ademe")
+        done = journal.load() if journal is not None else {}
+        if done:
+            logger.info(f"Ademe checkpoint : {len([_id for _id in id_ban_list if _id in done])} id_ban reused from the journal.")
+        to_query = [_id for _id in id_ban_list if _id not in done]
+        if engine == "batch":
+            ademe_data_res = self.request_ademe_batched(to_query, batch_size)
+        elif engine == "async":
+            ademe_data_res = self.request_ademe_async(to_query)
+        elif engine == "threads":
+            ademe_data_res = self.multithreaded_api_request(
+                num_threads=n_threads,
+                api_call_func=self.call_ademe_api_individually,
+                obj_list=to_query,
+                rate_limit=self.ademe_rate_limit,
+                backend=self.get_rate_limit_backend("ademe")
+            )
+        else:
+            raise ValueError(f"Unknown Ademe engine : {engine} (choose between 'batch', 'async', 'threads' and 'mirror')")
+        ademe_data_res += [done[_id] or None for _id in id_ban_list if _id in done]
         # on a une liste de listes, chaque liste correspond à un id_ban
         # on obtient une liste à 2 niveaux pour chaque Id_BAN 
-        # on a plusieurs lignes ademe  
-        for _ in ademe_data_res:
-            ademe_data.extend(_)
+        # on a plusieurs lignes ademe : mises en colonnes typées au fil de l'eau
+        builder = ColumnarBuilder(self.ademe_schema)
+        for i, lines in enumerate(ademe_data_res):
+            if lines is not None:
+                builder.extend(lines)
+                ademe_data_res[i] = None
         del ademe_data_res
-        ademe_data = pd.DataFrame(ademe_data)
+        return builder.to_pandas()
+
+    def set_ademe_data(self, ademe_data):
+        """Suffix the raw Ademe lines, backup them in the bronze zone and keep them for the merge."""
         ademe_data = ademe_data.add_suffix('_ademe')
-        
         self.save_parquet_file(
             df=ademe_data,
             dir=self.PATH_DATA_BRONZE,
@@ -514,6 +1034,21 @@ class DataEnedisAdemeExtractor(FileStorageConnexion):
         del ademe_data
         return self
 
+    def get_ademe_data_from_mirror(self, id_ban_list):
+        """
+        Get the Ademe lines from the local department mirror (synced first, incrementally).
+        :param id_ban_list: The list of (unique) id_ban.
+        :return: The Ademe dataframe (empty if no line is found).
+        """
+        if self.code_departement is None or str(self.code_departement) in ("", "-1"):
+            raise ValueError("Ademe mirror engine requires a code_departement.")
+        if str(self.code_departement) not in self.ademe_mirror_synced: # une sync par run (mode par chunks)
+            self.ademe_mirror.sync(self.code_departement, client=self.http.client(self.ademe_mirror.base_url))
+            self.ademe_mirror_synced.add(str(self.code_departement))
+        ademe_data = self.ademe_mirror.lookup(self.code_departement, id_ban_list)
+        logger.info(f"Ademe data from mirror : {len(ademe_data)} lines for {len(id_ban_list)} id_ban.")
+        return ademe_data
+
     # TACHE MERGE 1 
     @decorator_logger
     @task(name="join-enedis-data-with-ban-data", retries=3, retry_delay_seconds=10, cache_policy=NO_CACHE)
@@ -524,27 +1059,66 @@ class DataEnedisAdemeExtractor(FileStorageConnexion):
         # ? - free memory
         logger = get_run_logger()
         if self.debug: print("-> merge_and_save_enedis_with_ban_as_output")
+        self.output = self.merge_enedis_with_ban(self.input, self.ban_data)
         self.input = self.input.add_suffix('_enedis')
-        self.ban_data = self.ban_data.add_suffix('_ban')
-        self.output = pd.merge(
-                        self.input, 
-                        self.ban_data, 
-                        how='inner', 
-                        left_on='full_adress_enedis', 
-                        right_on='full_adress_ban')\
-                        .rename(columns={'id_ban': 'id_BAN'})
         self.id_BAN_list = self.output.id_BAN.values.tolist()
         if self.debug: self.debugger.update({'sample_output_enedis_with_ban_tmp': self.output.tail(5)})
         if self.debug: self.debugger.update({'id_BAN_list': self.id_BAN_list})
-        self.save_parquet_file(
-            df=self.output,
-            dir=self.PATH_DATA_BRONZE,
-            fname=f"enedis_with_ban_data_tmp_{get_today_date()}.parquet"
-        )
+        self.hand_off_enedis_with_ban(self.output)
         self.output = pd.DataFrame() # free memory
         self.ban_data = pd.DataFrame() # free memory
         return self
 
+    def hand_off_enedis_with_ban(self, enedis_with_ban_data):
+        """
+        Keep the Enedis+BAN rows for the final merge as an in-memory Arrow table.
+        They are spilled to the bronze zone (parquet) only when they exceed
+        `handoff_memory_budget_mb` or when checkpointing is enabled (a restarted run reloads them).
+        """
+        size_mb = enedis_with_ban_data.memory_usage(deep=True).sum() / 2**20
+        over_budget = size_mb > self.handoff_memory_budget_mb
+        self.enedis_with_ban_spilled = over_budget or self.checkpoints is not None
+        if self.enedis_with_ban_spilled:
+            self.save_parquet_file(
+                df=enedis_with_ban_data,
+                dir=self.PATH_DATA_BRONZE,
+                fname=f"enedis_with_ban_data_tmp_{get_today_date()}.parquet"
+            )
+        # sous le budget la table reste en memoire, meme spillée : le merge final ne relit pas le disque
+        self.enedis_with_ban = None if over_budget else pa.Table.from_pandas(enedis_with_ban_data, preserve_index=False)
+        logger.info(f"Enedis with BAN handoff : {size_mb:.0f} MB, "
+                    f"{'spilled to bronze' if self.enedis_with_ban_spilled else 'in memory'}"
+                    f"{'' if self.enedis_with_ban is None else ' (kept in memory)'}.")
+
+    def take_enedis_with_ban(self, id_ban=None):
+        """
+        Enedis+BAN rows handed off by `hand_off_enedis_with_ban` (memory first, bronze spill otherwise).
+        :param id_ban: Only the rows of these id_BAN are materialized (None : all the rows).
+        """
+        if self.enedis_with_ban is not None:
+            table = self.enedis_with_ban
+            if id_ban is not None:
+                table = table.filter(pc.is_in(table['id_BAN'], value_set=pa.array(id_ban, type=table.schema.field('id_BAN').type)))
+            return table.to_pandas()
+        # fichier du batch dans le catalogue (date du spill, pas forcement celle du jour)
+        dir, fname = self.locate_file(self.PATH_DATA_BRONZE, f"enedis_with_ban_data_tmp_{get_today_date()}.parquet")
+        return self.load_parquet_file(
+            dir=dir,
+            fname=fname,
+            filters=None if id_ban is None else [('id_BAN', 'in', id_ban)]
+        )
+
+    @staticmethod
+    def merge_enedis_with_ban(enedis_data, ban_data):
+        """Inner join of the Enedis rows with the BAN results on the full address (suffixed columns)."""
+        return pd.merge(
+                enedis_data.add_suffix('_enedis'), 
+                ban_data.add_suffix('_ban'), 
+                how='inner', 
+                left_on='full_adress_enedis', 
+                right_on='full_adress_ban')\
+                .rename(columns={'id_ban': 'id_BAN'})
+
     # TACHE MERGE 2 (final)
     @decorator_logger
     @task(name="join-all-and-backup", retries=3, retry_delay_seconds=10, cache_policy=NO_CACHE)
@@ -554,35 +1128,176 @@ class DataEnedisAdemeExtractor(FileStorageConnexion):
         """
         logger = get_run_logger()
         if self.debug: print("-> get_ademe_data")
-        # reconstituer le dataframe complet
-        enedis_with_ban_data = self.load_parquet_file(
-            dir=self.PATH_DATA_BRONZE,
-            fname=f"enedis_with_ban_data_tmp_{get_today_date()}.parquet"
-        )
+        # reconstituer le dataframe complet : seules les lignes des id_ban des lignes ademe servent au left join
+        id_ban = self.ademe_data['identifiant_ban_ademe'].dropna().astype(str).unique().tolist()
+        enedis_with_ban_data = self.take_enedis_with_ban(id_ban)
         # enedis_with_ban_data = enedis_with_ban_data.add_suffix('_enedis_with_ban')
         logger.info(f"Enedis with BAN data loaded : {enedis_with_ban_data.shape[0]} rows, {enedis_with_ban_data.shape[1]} columns.")
         logger.info(f"Ademe data loaded : {self.ademe_data.shape[0]} rows, {self.ademe_data.shape[1]} columns.")
-        assert 'identifiant_ban_ademe' in self.ademe_data.columns, \
+        self.output = self.merge_ademe_with_enedis(self.ademe_data, enedis_with_ban_data)
+        self.save_output()
+        self.enedis_with_ban = None # free memory (gardée jusqu'ici pour les retries de la tache)
+        if self.debug: self.debugger.update({'sample_output': self.output.tail(5)})
+
+    def save_output(self, part=None):
+        """
+        Save the silver output : `extraction_<date>_<meta>.parquet`, or with the hive layout
+        the partitions annee / code_departement (Enedis columns) / batch_id of the `extraction` dataset.
+        :param part: Number of the chunk in the streaming mode (hive layout only).
+        """
+        if self.lake_layout == "hive":
+            self.save_dataset(
+                self.output,
+                dir=self.PATH_DATA_SILVER,
+                name="extraction",
+                partition_columns={"annee": "annee_enedis", "code_departement": "code_departement_enedis"},
+                part=part
+            )
+        else:
+            self.save_parquet_file(
+                df=self.output,
+                dir=self.PATH_DATA_SILVER,
+                fname=f"extraction_{get_today_date()}_{self.meta}.parquet"
+            )
+
+    def iter_enedis_chunks(self, enedis_data, chunk_size):
+        """
+        Split the Enedis rows in chunks of about `chunk_size` rows.
+        The rows are sorted on the full address and the rows of one address are never split
+        between two chunks (an address is geocoded and merged once).
+        :return: A generator of dataframes.
+        """
+        enedis_data = enedis_data.sort_values('full_adress', kind='stable').reset_index(drop=True)
+        adresses = enedis_data['full_adress'].to_numpy()
+        start, n_rows = 0, len(enedis_data)
+        while start < n_rows:
+            stop = min(start + chunk_size, n_rows)
+            while stop < n_rows and adresses[stop] == adresses[stop - 1]:
+                stop += 1
+            yield enedis_data.iloc[start:stop]
+            start = stop
+
+    def geocode_chunk(self, chunk, n_threads, ban_engine="async"):
+        """
+        Stage 1 of the streaming mode : geocode the addresses of a chunk of Enedis rows.
+        :return: The chunk merged with its BAN results, None if no address is found.
+        """
+        ban_data = self.get_ban_dataframe(chunk['full_adress'].unique().tolist(), n_threads, ban_engine)
+        if ban_data.empty:
+            logger.warning(f"No BAN data for a chunk of {len(chunk)} Enedis rows, skipped.")
+            return None
+        return self.merge_enedis_with_ban(chunk, ban_data)
+
+    def fetch_ademe_chunk(self, enedis_with_ban_data, n_threads, ademe_engine="batch", ademe_batch_size=None):
+        """
+        Stage 2 of the streaming mode : fetch the Ademe lines of the id_ban of a geocoded chunk and merge.
+        :return: The silver dataframe of the chunk, None if no Ademe line is found.
+        """
+        ademe_data = self.get_ademe_dataframe(enedis_with_ban_data['id_BAN'].tolist(), n_threads, ademe_engine, ademe_batch_size)
+        if ademe_data.empty:
+            logger.warning(f"No Ademe data for a chunk of {len(enedis_with_ban_data)} Enedis+BAN rows, skipped.")
+            return None
+        return self.merge_ademe_with_enedis(ademe_data.add_suffix('_ademe'), enedis_with_ban_data)
+
+    # TACHE EXTRACTION + MERGE (mode streaming)
+    @decorator_logger
+    @task(name="extract-and-merge-by-chunks", retries=3, retry_delay_seconds=10, cache_policy=NO_CACHE)
+    def extract_by_chunks(
+        self,
+        chunk_size,
+        n_threads,
+        ban_engine="async",
+        ademe_engine="batch",
+        ademe_batch_size=None,
+        pipelined=True,
+        queue_size=2
+    ):
+        """
+        Streaming mode of the extraction : the Enedis rows go through BAN -> Ademe -> merge
+        by chunks (see `iter_enedis_chunks`) and each chunk is written as its own silver parquet part
+        `<silver>/extraction_<date>_<meta>/part-<n>.parquet` (hive layout : added to the partitions of
+        the `extraction` dataset, see `save_output`).
+        Peak memory depends on the chunk size, not on the department size
+        (no bronze backup of the intermediate dataframes in this mode).
+        :param chunk_size: Number of Enedis rows per chunk.
+        :param pipelined: If True, the BAN stage, the Ademe stage and the silver writer run concurrently,
+        connected by bounded queues (`StagePipeline`) : the chunk n+1 is geocoded while the Ademe lines
+        of the chunk n are fetched. If False, the chunks go through the stages one after the other.
+        :param queue_size: Max number of chunks waiting between two stages (pipelined mode).
+        :return: self, with self.output_parts the written parts and self.output the last one.
+        """
+        logger = get_run_logger()
+        if self.input.empty:
+            logger.critical("Erreur dans le chargement des données Enedis : pas de données")
+            raise ValueError("Pas de données dans le dataframe")
+        enedis_data, self.input = self.input, pd.DataFrame() # free memory
+        parts_dir = os.path.join(self.PATH_DATA_SILVER, f"extraction_{get_today_date()}_{self.meta}", "")
+        stages = [
+            ("ban", lambda chunk: self.geocode_chunk(chunk, n_threads, ban_engine)),
+            ("ademe", lambda data: self.fetch_ademe_chunk(data, n_threads, ademe_engine, ademe_batch_size)),
+        ]
+
+        def run_sequentially(chunks):
+            for data in chunks:
+                for _, func in stages:
+                    data = func(data)
+                    if data is None:
+                        break
+                if data is not None:
+                    yield data
+
+        chunks = self.iter_enedis_chunks(enedis_data, chunk_size)
+        if pipelined:
+            outputs = StagePipeline(stages, queue_size=queue_size).run(chunks)
+        else:
+            outputs = run_sequentially(chunks)
+        self.output_parts = []
+        n_rows = 0
+        output = None
+        for output in outputs: # etage 3 : ecriture des parts silver
+            fname = f"part-{len(self.output_parts):05d}.parquet"
+            if self.lake_layout == "hive":
+                self.output = output
+                self.save_output(part=len(self.output_parts))
+                fname = f"*/*/*/part-{self.batch_id}-{len(self.output_parts):05d}-*.parquet"
+                self.output_parts.append(f"{self.dataset_path(self.PATH_DATA_SILVER, 'extraction')}/{fname}")
+            else:
+                self.save_parquet_file(df=output, dir=parts_dir, fname=fname, table="extraction")
+                self.output_parts.append(os.path.join(parts_dir, fname))
+            n_rows += len(output)
+            logger.info(f"Silver part {fname} : {len(output)} rows.")
+        if not self.output_parts:
+            logger.critical("Erreur dans l'extraction par chunks : pas de données")
+            raise ValueError("Pas de données dans le dataframe de sortie")
+        self.output = output
+        logger.info(f"Extraction by chunks : {n_rows} rows in {len(self.output_parts)} parts ({parts_dir}).")
+        return self
+
+    def merge_ademe_with_enedis(self, ademe_data, enedis_with_ban_data):
+        """
+        Final merge : Ademe lines (suffixed) left join Enedis+BAN rows on the id_ban.
+        Hashed join (`join_engine.hash_join`) : integer key codes joined with pyarrow, then the
+        duplicates are dropped on a 64-bit hash of `merge_dedup_keys` (every column if `_id_ademe` is missing).
+        :return: The silver dataframe (normalized column names, batch_id column).
+        """
+        assert 'identifiant_ban_ademe' in ademe_data.columns, \
             "identifiant_ban_ademe column not found in Ademe data. Check the schema or the data extraction process. (Identifiant__BAN or identifiant_ban)"
         assert 'id_BAN' in enedis_with_ban_data.columns, \
             "id_BAN column not found in Enedis with BAN data. Check the schema or the data extraction process."
         # merge enedis with ban data and ademe data
-        self.ademe_data['identifiant_ban_ademe'] = self.ademe_data['identifiant_ban_ademe'].astype('string')
+        ademe_data['identifiant_ban_ademe'] = ademe_data['identifiant_ban_ademe'].astype('string')
         enedis_with_ban_data['id_BAN'] = enedis_with_ban_data['id_BAN'].astype('string')
-        self.output = pd.merge(self.ademe_data,
-                            enedis_with_ban_data,
-                            how='left',
-                            left_on='identifiant_ban_ademe',
-                            right_on='id_BAN').drop_duplicates().reset_index(drop=True)
+        columns = set(ademe_data.columns) | set(enedis_with_ban_data.columns)
+        dedup_keys = [c for c in self.merge_dedup_keys if c in columns] if '_id_ademe' in columns else []
+        output = hash_join(ademe_data,
+                        enedis_with_ban_data,
+                        left_on='identifiant_ban_ademe',
+                        right_on='id_BAN',
+                        how='left',
+                        dedup_subset=dedup_keys)
         # normaliser les noms de colonnes et trier les colonnes
-        self.output = normalize_df_colnames(self.output)
-        self.output = self.output.assign(batch_id=self.batch_id)
-        self.save_parquet_file(
-            df=self.output,
-            dir=self.PATH_DATA_SILVER,
-            fname=f"extraction_{get_today_date()}_{self.meta}.parquet"
-        )
-        if self.debug: self.debugger.update({'sample_output': self.output.tail(5)})
+        output = normalize_df_colnames(output)
+        return output.assign(batch_id=self.batch_id)
 
     @decorator_logger
     @flow(name="ETL data extraction pipeline", 
@@ -594,7 +1309,14 @@ class DataEnedisAdemeExtractor(FileStorageConnexion):
         annee:int=2023, 
         rows:int=10, 
         n_threads_for_querying:int=10,
-        save_schema:bool=True
+        save_schema:bool=True,
+        ban_engine:str="async",
+        ademe_engine:Optional[str]=None,
+        ademe_batch_size:int=50,
+        enedis_source:Optional[str]=None,
+        checkpoint:bool=True,
+        chunk_size:Optional[int]=None,
+        pipelined:bool=True
         )-> None:
         """
         Run the extraction process.
@@ -612,6 +1334,17 @@ class DataEnedisAdemeExtractor(FileStorageConnexion):
         :param rows: Number of rows to extract from the Enedis API.
         :param n_threads_for_querying: Number of threads to use for querying the BAN API.
         :param save_schema: If True, save the schema of the output dataframe.
+        :param ban_engine: Engine used to geocode addresses, "async" (default) or "threads".
+        :param ademe_engine: Engine used to fetch Ademe lines, "batch", "async", "threads" or "mirror".
+        Default is "mirror" for full-department runs (rows=-1 with a code_departement), "batch" otherwise.
+        :param ademe_batch_size: Max number of id_ban per Ademe query (batch engine).
+        :param enedis_source: "export" or "records", default is "export" for full-department runs (rows=-1).
+        :param checkpoint: If True, the BAN and Ademe results are journaled by batch_id : a retried or
+        restarted extract with the same batch_id only requests the missing items. Journals are cleared on success.
+        :param chunk_size: If set, streaming mode : the Enedis rows are processed by chunks of `chunk_size` rows,
+        each chunk is written as a silver parquet part (self.output then only holds the last part, see self.output_parts).
+        :param pipelined: With chunk_size, run the BAN geocoding, the Ademe fetching and the silver writer
+        as concurrent stages connected by bounded queues.
         
         :return: None
         """
@@ -622,12 +1355,22 @@ class DataEnedisAdemeExtractor(FileStorageConnexion):
                 compulsory=True
             )
         self.meta = f"from_input_{str(from_input)}_dept_{str(code_departement)}_year_{str(annee)}_{self.batch_id}"
-        self.get_enedis_data(from_input, code_departement, annee, rows)\
-            .get_ban_data(n_threads_for_querying)\
-            .merge_and_save_enedis_with_ban_as_output()\
-            .get_ademe_data(n_threads_for_querying)\
-            .merge_all_as_output()
-        logger.info(f"Extraction results : {self.output.shape[0]} rows, {self.output.shape[1]} columns.")
+        if ademe_engine is None:
+            ademe_engine = "mirror" if (rows == -1 and code_departement > 0) else "batch"
+        if checkpoint:
+            self.checkpoints = CheckpointStore(os.path.join(self.cache_dir, "checkpoints"), self.batch_id)
+        self.get_enedis_data(from_input, code_departement, annee, rows, enedis_source)
+        if chunk_size:
+            self.extract_by_chunks(chunk_size, n_threads_for_querying, ban_engine, ademe_engine, ademe_batch_size, pipelined)
+        else:
+            self.get_ban_data(n_threads_for_querying, ban_engine)\
+                .merge_and_save_enedis_with_ban_as_output()\
+                .get_ademe_data(n_threads_for_querying, ademe_engine, ademe_batch_size)\
+                .merge_all_as_output()
+            logger.info(f"Extraction results : {self.output.shape[0]} rows, {self.output.shape[1]} columns.")
+        if self.checkpoints is not None:
+            self.checkpoints.clear()
+            self.checkpoints = None
         # save schema
         if save_schema:
             fpath = get_env_var('SCHEMA_SILVER_DATA_FILEPATH', compulsory=True)
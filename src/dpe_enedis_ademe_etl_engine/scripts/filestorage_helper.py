@@ -1,15 +1,27 @@
 import os
+import re
 import json
+import shutil
+import threading
 import requests
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
 
 # use s3fs with boto3 client later
 from minio import Minio 
-from pyarrow import Table, parquet as pq
+from minio.error import S3Error
+from minio.deleteobjects import DeleteObject
+from pyarrow import Table, parquet as pq, json as pa_json
 
 try:
     from ..scripts import Paths
+    from ..scripts.catalog import LakeCatalog
+    from ..scripts.write_profiles import ZONE_DEFAULT_PROFILES, load_zone_profiles, parquet_write_options
     from ..utils import logger, decorator_logger
     from ..utils.fonctions import (
         get_env_var,
@@ -22,6 +34,8 @@ except ImportError:
     parent_dir = current_dir.parent
     sys.path.append(str(parent_dir))
     from scripts import Paths
+    from scripts.catalog import LakeCatalog
+    from scripts.write_profiles import ZONE_DEFAULT_PROFILES, load_zone_profiles, parquet_write_options
     from utils import logger, decorator_logger
     from utils.fonctions import (
         get_env_var,
@@ -29,6 +43,36 @@ except ImportError:
     )
 
 
+# partitions hive des datasets du lake : <zone>/<dataset>/annee=/code_departement=/batch_id=/
+LAKE_PARTITIONING = pa.schema([
+    ("annee", pa.int32()),
+    ("code_departement", pa.string()), # texte : "06", "2A"
+    ("batch_id", pa.string()),
+])
+# fichiers écrits par la compaction dans un dataset : ignorés à la lecture tant que le catalogue ne les a pas enregistrés
+COMPACTED_PREFIX = "compacted-"
+
+
+class _UploadStream:
+    """
+    Read end of the pipe fed by the parquet writer, read part by part by `put_object`.
+    Fails the read once the writer is flagged as aborted : the truncated data is never
+    completed as an object (minio aborts the multipart upload on error).
+    """
+    def __init__(self, fd):
+        self._file = os.fdopen(fd, "rb")
+        self.aborted = False
+
+    def read(self, size=-1):
+        chunk = self._file.read(size)
+        if self.aborted:
+            raise IOError("Parquet writer failed, upload aborted.")
+        return chunk
+
+    def close(self):
+        self._file.close()
+
+
 class FileStorageConnexion(Paths):
     """
     Class to manage S3 connections and operations or Local filestorage.
@@ -40,6 +84,24 @@ class FileStorageConnexion(Paths):
         self.__set_client()
         self.get_today_date = get_today_date
         self.batch_id = get_env_var('BATCH_CORRELATION_ID', compulsory=True, cast_to_type=str)
+        # "flat" : un fichier par run (nom daté), "hive" : datasets partitionnés (save_dataset / load_dataset)
+        self.lake_layout = get_env_var('LAKE_LAYOUT', default_value="flat", compulsory=True)
+        # profils d'écriture parquet par zone (codec, row groups, dictionnaires, statistiques), voir write_profiles
+        self.write_profiles = load_zone_profiles(
+            get_env_var('PATH_LAKE_WRITE_PROFILES', compulsory=False),
+            {zone: get_env_var(f'LAKE_WRITE_PROFILE_{zone.upper()}', compulsory=False) for zone in ZONE_DEFAULT_PROFILES}
+        )
+        # codec imposé aux datasets (sinon celui du profil de la zone)
+        self.lake_compression = get_env_var('LAKE_PARQUET_COMPRESSION', compulsory=False)
+        self._arrow_fs = None
+        # catalogue des fichiers écrits (sqlite, disque local meme en env NOLOCAL)
+        self.catalog = None
+        if get_env_var('LAKE_CATALOG_ENABLED', default_value="true", compulsory=True).lower() in ("1", "true", "yes"):
+            default_dir = os.path.join(self.PATH_DATA_BRONZE, "catalog") if self.env == "LOCAL" \
+                else os.path.join(os.path.expanduser("~"), ".cache", "dpe_enedis_ademe_etl_engine")
+            self.catalog = LakeCatalog(
+                get_env_var('PATH_LAKE_CATALOG', default_value=os.path.join(default_dir, "lake_catalog.sqlite"), compulsory=True)
+            )
 
     def __set_client(self):
         try:
@@ -55,6 +117,14 @@ class FileStorageConnexion(Paths):
                     secure=False # set to True if using https
                 )
                 self.BUCKET_NAME = get_env_var('S3_BUCKET_NAME', compulsory=True)
+                # parquet sur s3 : codec, taille des parts multipart (5 MiB min. pour S3), GETs par plages
+                # codec et row groups imposés aux objets (sinon ceux du profil de la zone)
+                self.s3_parquet_compression = get_env_var('S3_PARQUET_COMPRESSION', compulsory=False)
+                self.s3_part_size_mb = max(5, get_env_var('S3_MULTIPART_PART_SIZE_MB', default_value=16, compulsory=True, cast_to_type=int))
+                self.s3_range_get_size_mb = get_env_var('S3_RANGE_GET_SIZE_MB', default_value=8, compulsory=True, cast_to_type=int)
+                self.s3_max_workers = get_env_var('S3_MAX_WORKERS', default_value=4, compulsory=True, cast_to_type=int)
+                self.s3_row_group_size = get_env_var('S3_PARQUET_ROW_GROUP_SIZE', compulsory=False)
+                self.s3_row_group_size = int(self.s3_row_group_size) if self.s3_row_group_size else None
                 if not self.client.bucket_exists(self.BUCKET_NAME):
                     self.client.make_bucket(self.BUCKET_NAME)
         except Exception as e:
@@ -65,30 +135,40 @@ class FileStorageConnexion(Paths):
         """
         Purge the archive directory.
         Depending on the environment, it will either 
-        remove the local directory or delete objects 
-        from the S3 bucket.
+        empty the local directory (recreated empty) or delete
+        every object under the archive prefix of the S3 bucket.
+        The archived files are removed from the catalog.
+        :raises Exception: If an object could not be deleted.
         """
         def purge_local_archive_dir():
-            os.rmdir(self.PATH_ARCHIVE_DIR)
-            os.makedirs(self.PATH_ARCHIVE_DIR, exist_ok=False)
+            shutil.rmtree(self.PATH_ARCHIVE_DIR, ignore_errors=True)
+            os.makedirs(self.PATH_ARCHIVE_DIR, exist_ok=True)
         
         def purge_s3_archive_dir():
-            self.client.remove_objects(self.BUCKET_NAME, prefix=self.PATH_ARCHIVE_DIR)    
+            objects = self.client.list_objects(self.BUCKET_NAME, prefix=self.PATH_ARCHIVE_DIR, recursive=True)
+            # remove_objects est paresseux : les suppressions sont envoyées en itérant ses erreurs
+            errors = list(self.client.remove_objects(self.BUCKET_NAME, (DeleteObject(o.object_name) for o in objects)))
+            if errors:
+                raise IOError(f"Purge of {self.PATH_ARCHIVE_DIR} : {len(errors)} objects not deleted ({errors[0]}).")
  
         if self.env == "LOCAL":
             purge_local_archive_dir()
         else:
             purge_s3_archive_dir()
+        if self.catalog is not None:
+            self.catalog.remove(e["path"] for e in self.catalog.files("archive"))
 
     @decorator_logger
-    def save_parquet_file(self, df, dir, fname):
+    def save_parquet_file(self, df, dir, fname, table=None):
         """
-        Save a DataFrame to a parquet file.
+        Save a DataFrame to a parquet file, written with the write profile of the zone of `dir`.
         Depending on the environment, it will either
         save the file locally or upload it to an S3 bucket.
+        The file is then registered in the lake catalog.
         :param df: DataFrame to save.
         :param dir: Directory where the file will be saved.
         :param fname: Name of the file to save.
+        :param table: Table of the file in the catalog (default : fname without the date suffix).
         :return: None
         :raises Exception: If there is an error during the save operation.
         """
@@ -96,66 +176,358 @@ class FileStorageConnexion(Paths):
         def save_parquet_file_to_local():
             if not os.path.exists(dir):
                 os.makedirs(dir)
-            df.to_parquet(f"{os.path.join(dir, fname)}", compression="gzip")
+            fpath = os.path.join(dir, fname)
+            table = Table.from_pandas(df)
+            row_group_size, options = self.write_options(dir, table)
+            pq.write_table(table, fpath, row_group_size=row_group_size, **options)
+            return fpath, pq.read_metadata(fpath), os.path.getsize(fpath)
 
         def save_parquet_file_to_s3():
-            # push data parquet to s3
-            # path_to_s3_object = f"s3://{bucket_name}/{dir}{fname}"
-            # pq.write_to_dataset(
-            #     Table.from_pandas(df),
-            #     path_to_s3_object,
-            #     filesystem=self.s3fs,
-            #     use_dictionary=True,
-            #     compression="snappy",
-            #     version="2.6",
-            # )
-
-            # JSON instead of parquet
-            json_data = df.to_json(orient="records", lines=True)
-            json_bytes = BytesIO(json_data.encode("utf-8"))
-            self.client.put_object(
-                self.BUCKET_NAME,
-                f"{dir}{fname.replace('.parquet', '.json')}",
-                data=json_bytes,
-                length=len(json_data),
-                content_type="application/json"
-            )
-            logger.info(f"Uploaded {fname} to bucket {self.BUCKET_NAME}.")
+            metadata = self.upload_parquet_to_s3(df, f"{dir}{fname}")
+            return f"{dir}{fname}", metadata, self.client.stat_object(self.BUCKET_NAME, f"{dir}{fname}").size
 
         if self.env=="LOCAL":
-            save_parquet_file_to_local()
+            path, metadata, n_bytes = save_parquet_file_to_local()
         else:
-            save_parquet_file_to_s3()
+            path, metadata, n_bytes = save_parquet_file_to_s3()
+        if self.catalog is not None:
+            self.catalog.register(path, dir, fname, self.zone_of(dir), table or self.table_of(fname), self.batch_id, metadata, n_bytes)
+
+    def write_options(self, dir, table, compression=None, row_group_size=None):
+        """
+        (row group size, parquet writer options) of the write profile of the zone of `dir` for `table`.
+        :param compression: Codec forcing the one of the profile (its level is then the codec default).
+        :param row_group_size: Row group size forcing the one of the profile.
+        """
+        profile = self.write_profiles.get(self.zone_of(dir), self.write_profiles["other"])
+        options = parquet_write_options(profile, table)
+        if compression:
+            options.update(compression=compression, compression_level=None)
+        return row_group_size or profile["row_group_size"], options
+
+    def zone_of(self, dir):
+        """Zone of a directory : bronze, silver, gold, archive, or other."""
+        path = os.path.normpath(dir) if dir else ""
+        for zone, root in [
+            ("bronze", self.PATH_DATA_BRONZE),
+            ("silver", self.PATH_DATA_SILVER),
+            ("gold", self.PATH_DATA_GOLD),
+            ("archive", self.PATH_ARCHIVE_DIR)
+        ]:
+            root = os.path.normpath(root)
+            if path == root or path.startswith(root + os.sep):
+                return zone
+        return "other"
+
+    @staticmethod
+    def table_of(fname):
+        """Table of a file name : `<table>_<YYYY_MM_DD>[_<suffix>].parquet` -> `<table>`."""
+        return re.sub(r"(_\d{4}_\d{2}_\d{2}.*)?\.parquet$", "", os.path.basename(fname))
+
+    def locate_file(self, dir, fname, table=None):
+        """
+        (dir, fname) of the last file of the current batch registered for this table in the zone of `dir`
+        (the date of its name may not be today's), the given (dir, fname) if the catalog does not know it.
+        """
+        if self.catalog is not None:
+            entry = self.catalog.latest(self.zone_of(dir), table or self.table_of(fname), self.batch_id)
+            if entry is not None:
+                return entry["dir"], entry["fname"]
+        return dir, fname
+
+    def read_catalog_table(self, zone, table, columns=None, filters=None, batch_id=None):
+        """
+        Read the files of a table registered in the catalog, skipping the files whose
+        min/max statistics exclude the `filters` (then applied to the rows of the files read).
+        :param filters: Row filters (column, op, value), ops ==, !=, <, <=, >, >=, in.
+        :param batch_id: Only the files of this batch (None : every batch), files compacted
+        from several batches included (their rows filtered on their `batch_id` column).
+        :return: pa.Table (empty if no file matches)
+        """
+        entries = self.catalog.files(zone, table, batch_id=batch_id, filters=filters)
+        tables = [self.read_parquet_table(e["dir"], e["fname"], columns=columns, filters=filters) for e in entries]
+        if batch_id is not None:
+            batch_filters = (filters or []) + [("batch_id", "==", batch_id)]
+            tables += [
+                self.read_parquet_table(e["dir"], e["fname"], columns=columns, filters=batch_filters)
+                for e in self.catalog.files(zone, table, filters=batch_filters) if e["batch_id"] is None
+            ]
+        if not tables:
+            return pa.table({})
+        return pa.concat_tables(tables, promote_options="default")
 
     @decorator_logger
-    def load_parquet_file(self, dir, fname):
+    def load_parquet_file(self, dir, fname, columns=None, filters=None, dtype_backend=None):
         """
-        Load a parquet file into a DataFrame.
+        Load a parquet file into a DataFrame (see `read_parquet_table`).
+        :param columns: Columns to read (None : all), the ones missing from the file are ignored.
+        :param filters: Row filters in the pyarrow DNF format, e.g. [("id_BAN", "in", ids)].
+        :param dtype_backend: "pyarrow" for Arrow-backed dtypes (no conversion), None for the numpy ones.
         """
-        def load_parquet_file_from_local():
-            return pd.read_parquet(os.path.join(dir, fname))
-        
-        def load_parquet_file_from_s3():
-            # path_to_s3_object = f"s3://{bucket_name}/{dir}{fname}"
-            # with self.s3fs.open(path_to_s3_object, 'rb') as f:
-            #     return pd.read_parquet(f)
+        table = self.read_parquet_table(dir, fname, columns=columns, filters=filters)
+        if dtype_backend == "pyarrow":
+            return table.to_pandas(types_mapper=pd.ArrowDtype)
+        return table.to_pandas()
+
+    def read_parquet_table(self, dir, fname, columns=None, filters=None):
+        """
+        Read a parquet file as a pyarrow Table, built straight from one buffer :
+        memory-mapped local file, or the S3 object fetched by ranged GETs into a single buffer.
+        Only the projected columns are decoded, and the row groups whose statistics exclude
+        the `filters` are skipped.
+        :param columns: Columns to read (None : all), the ones missing from the file are ignored.
+        :param filters: Row filters in the pyarrow DNF format, e.g. [("id_BAN", "in", ids)].
+        :return: pa.Table
+        """
+        def read_table_from_local():
+            fpath = os.path.join(dir, fname)
+            schema = pq.read_schema(fpath, memory_map=True)
+            return pq.read_table(fpath, columns=self._projected_columns(schema, columns, fname), filters=filters, memory_map=True)
+
+        def read_table_from_s3():
+            try:
+                return self.download_parquet_from_s3(f"{dir}{fname}", columns=columns, filters=filters)
+            except S3Error as e:
+                if e.code != "NoSuchKey":
+                    raise
+            # fichiers json lines écrits par les versions précédentes
+            logger.warning(f"{fname} not found as parquet in bucket {self.BUCKET_NAME}, loading the legacy json.")
             json_object = self.client.get_object(
                 self.BUCKET_NAME, 
                 f"{dir}{fname.replace('.parquet', '.json')}"
             )
-            json_data = json_object.read().decode("utf-8")
-            return pd.read_json(
-                BytesIO(json_data.encode("utf-8")), 
-                orient="records", 
-                lines=True
-            )
-         
+            try:
+                table = pa_json.read_json(pa.BufferReader(json_object.read()))
+            finally:
+                json_object.close()
+                json_object.release_conn()
+            if filters is not None:
+                table = table.filter(pq.filters_to_expression(filters))
+            return table.select(self._projected_columns(table.schema, columns, fname) or table.column_names)
+
         if self.env=="LOCAL":
-            return load_parquet_file_from_local()
+            return read_table_from_local()
         else:
-            return load_parquet_file_from_s3()
+            return read_table_from_s3()
+
+    @staticmethod
+    def _projected_columns(schema, columns, fname):
+        """Requested columns present in the schema (None : all)."""
+        if columns is None:
+            return None
+        missing = [c for c in columns if c not in schema.names]
+        if missing:
+            logger.warning(f"{fname} : columns {missing} not found, not read.")
+        return [c for c in columns if c in schema.names]
+
+    def upload_parquet_to_s3(self, data, object_name, row_group_size=None):
+        """
+        Write a DataFrame (or Arrow table) as parquet straight into a multipart upload :
+        the pyarrow writer feeds a pipe, `put_object` (unknown length) reads it part by part
+        in a background thread, so no full copy of the file is held in memory.
+        :param data: DataFrame or pa.Table to save.
+        :param object_name: Key of the object in the bucket.
+        :param row_group_size: Rows per row group (default : `S3_PARQUET_ROW_GROUP_SIZE`, or the one of the write profile).
+        :return: The parquet FileMetaData of the object (row count, schema, statistics).
+        :raises Exception: The upload error, or the writer error (the upload is then aborted).
+        """
+        table = data if isinstance(data, Table) else Table.from_pandas(data)
+        row_group_size, options = self.write_options(
+            os.path.dirname(object_name), table, compression=self.s3_parquet_compression,
+            row_group_size=row_group_size or self.s3_row_group_size
+        )
+        read_fd, write_fd = os.pipe()
+        stream, sink = _UploadStream(read_fd), os.fdopen(write_fd, "wb")
+        upload = {}
+
+        def put_object():
+            try:
+                self.client.put_object(
+                    self.BUCKET_NAME,
+                    object_name,
+                    data=stream,
+                    length=-1,
+                    part_size=self.s3_part_size_mb * 2**20,
+                    content_type="application/vnd.apache.parquet"
+                )
+            except Exception as e:
+                upload["error"] = e
+            finally:
+                stream.close() # debloque le writer si l'upload s'arrete en route
+
+        thread = threading.Thread(target=put_object, name=f"s3-upload-{object_name}", daemon=True)
+        thread.start()
+        writer_error = None
+        try:
+            with pq.ParquetWriter(sink, table.schema, **options) as writer:
+                writer.write_table(table, row_group_size=row_group_size)
+            metadata = writer.writer.metadata
+        except Exception as e:
+            stream.aborted = True
+            writer_error = e
+        finally:
+            try:
+                sink.close()
+            except OSError: # pipe deja fermé par l'upload
+                pass
+            thread.join()
+        # pipe cassé : l'erreur d'origine est celle de l'upload
+        if writer_error is not None and not isinstance(writer_error, OSError):
+            raise writer_error
+        if "error" in upload:
+            raise upload["error"]
+        if writer_error is not None:
+            raise writer_error
+        logger.info(f"Uploaded {object_name} to bucket {self.BUCKET_NAME} ({options['compression']} parquet).")
+        return metadata
+
+    def download_parquet_from_s3(self, object_name, columns=None, filters=None):
+        """
+        Read a parquet object with ranged GETs run in parallel (`S3_RANGE_GET_SIZE_MB` each,
+        `S3_MAX_WORKERS` at a time), written in place into one buffer read by pyarrow without copy.
+        :param object_name: Key of the object in the bucket.
+        :param columns: Columns to read (None : all), the ones missing from the object are ignored.
+        :param filters: Row filters in the pyarrow DNF format.
+        :return: pa.Table
+        """
+        size = self.client.stat_object(self.BUCKET_NAME, object_name).size
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        chunk = self.s3_range_get_size_mb * 2**20
+
+        def get_range(offset):
+            length = min(chunk, size - offset)
+            res = self.client.get_object(self.BUCKET_NAME, object_name, offset=offset, length=length)
+            try:
+                read = 0
+                while read < length:
+                    n = res.readinto(view[offset + read:offset + length])
+                    if not n:
+                        raise IOError(f"{object_name} : range {offset}-{offset + length} truncated.")
+                    read += n
+            finally:
+                res.close()
+                res.release_conn()
+
+        with ThreadPoolExecutor(max_workers=self.s3_max_workers) as executor:
+            list(executor.map(get_range, range(0, size, chunk)))
+        buffer = pa.py_buffer(buffer)
+        schema = pq.read_schema(pa.BufferReader(buffer))
+        return pq.read_table(buffer, columns=self._projected_columns(schema, columns, object_name), filters=filters)
+
+    def arrow_filesystem(self):
+        """pyarrow filesystem of the zones : local disk, or the S3 bucket (same endpoint and credentials as the minio client)."""
+        if self._arrow_fs is None:
+            if self.env == "LOCAL":
+                self._arrow_fs = pafs.LocalFileSystem()
+            else:
+                self._arrow_fs = pafs.S3FileSystem(
+                    access_key=get_env_var('S3_ACCESS_KEY', compulsory=True),
+                    secret_key=get_env_var('S3_SECRET_KEY', compulsory=True),
+                    endpoint_override=get_env_var('S3_ENDPOINT_URL', compulsory=True),
+                    region=get_env_var('S3_REGION', compulsory=True),
+                    scheme="http" # set to https if using https
+                )
+        return self._arrow_fs
+
+    def dataset_path(self, dir, name):
+        """Root of the dataset `name` in the zone `dir` for `arrow_filesystem`."""
+        if self.env == "LOCAL":
+            return os.path.join(dir, name)
+        return f"{self.BUCKET_NAME}/{dir}{name}"
+
+    def save_dataset(self, data, dir, name, partition_columns=None, partition_values=None, part=None):
+        """
+        Write a DataFrame (or Arrow table) into the hive-partitioned dataset `<dir>/<name>`
+        (`annee=/code_departement=/batch_id=/part-<batch_id>-<i>.parquet`, see LAKE_PARTITIONING).
+        The partitions written are replaced (a retried batch does not duplicate its rows),
+        the other partitions of the dataset are left as they are.
+        :param part: Number of a part of the batch written in several calls (streaming mode) :
+        its files `part-<batch_id>-<part>-<i>.parquet` are added to the partitions instead of replacing them.
+        :param partition_columns: {partition key: column of data holding its value}, default : the key itself.
+        :param partition_values: {partition key: constant value for every row}, e.g. {"batch_id": self.batch_id}.
+        :raises ValueError: If the value of a partition key is not found.
+        """
+        table = data if isinstance(data, Table) else Table.from_pandas(data, preserve_index=False)
+        partition_columns = partition_columns or {}
+        partition_values = partition_values or {}
+        for field in LAKE_PARTITIONING:
+            if field.name in partition_values:
+                values = pa.array([partition_values[field.name]] * table.num_rows)
+            elif partition_columns.get(field.name, field.name) in table.column_names:
+                values = table[partition_columns.get(field.name, field.name)]
+            else:
+                raise ValueError(f"save_dataset {name} : no value for the partition key {field.name}.")
+            if field.name == "code_departement" and pa.types.is_integer(values.type):
+                values = pc.utf8_lpad(pc.cast(values, pa.string()), 2, "0")
+            values = pc.cast(values, field.type)
+            idx = table.schema.get_field_index(field.name)
+            table = table.set_column(idx, field.name, values) if idx >= 0 else table.append_column(field.name, values)
+        zone = self.zone_of(dir)
+        row_group_size, options = self.write_options(dir, table, compression=self.lake_compression)
+        if self.catalog is not None and part is None: # partitions remplacées (repertoires vidés par delete_matching)
+            keys = table.select([f.name for f in LAKE_PARTITIONING]).group_by([f.name for f in LAKE_PARTITIONING]).aggregate([])
+            for row in keys.to_pylist():
+                self.catalog.remove_prefix("/".join([self.dataset_path(dir, name)] + [f"{k}={v}" for k, v in row.items()]) + "/")
+
+        def register(written_file):
+            if self.catalog is None:
+                return
+            path = written_file.path
+            key = path if self.env == "LOCAL" else path[len(self.BUCKET_NAME) + 1:]
+            file_dir, _, fname = key.rpartition("/")
+            batch_id = re.search(r"batch_id=([^/]+)", path)
+            self.catalog.register(
+                path, file_dir + "/", fname, zone, name, batch_id.group(1) if batch_id else None,
+                written_file.metadata, written_file.size
+            )
+
+        ds.write_dataset(
+            table,
+            self.dataset_path(dir, name),
+            format="parquet",
+            partitioning=ds.partitioning(LAKE_PARTITIONING, flavor="hive"),
+            filesystem=self.arrow_filesystem(),
+            basename_template=f"part-{self.batch_id}-{{i}}.parquet" if part is None else f"part-{self.batch_id}-{part:05d}-{{i}}.parquet",
+            existing_data_behavior="delete_matching" if part is None else "overwrite_or_ignore",
+            file_options=ds.ParquetFileFormat().make_write_options(**options),
+            max_rows_per_group=row_group_size,
+            file_visitor=register,
+        )
+        logger.info(f"Dataset {name} : {table.num_rows} rows written in {self.dataset_path(dir, name)}.")
+
+    def load_dataset(self, dir, name, columns=None, filters=None):
+        """
+        Read the hive-partitioned dataset `<dir>/<name>` as a pyarrow Table.
+        The filters on the partition keys (annee, code_departement, batch_id) prune the directories
+        before any file is opened, the others skip the row groups excluded by their statistics.
+        :param columns: Columns to read (None : all), the ones missing from the dataset are ignored.
+        :param filters: Row filters in the pyarrow DNF format, e.g. [("code_departement", "==", "69"), ("annee", "in", [2022, 2023])].
+        :return: pa.Table
+        With the catalog, the files replaced by a compaction (tombstones) and the compacted files
+        not yet registered are skipped : a read running during a compaction sees its rows once.
+        """
+        root = self.dataset_path(dir, name)
+        partitioning = ds.partitioning(LAKE_PARTITIONING, flavor="hive")
+        # etat du catalogue lu avant le listing : un fichier listé ensuite est jugé sur cet etat
+        visible = self.catalog.visible_paths(root + "/") if self.catalog is not None else None
+        dataset = ds.dataset(root, format="parquet", partitioning=partitioning, filesystem=self.arrow_filesystem())
+        if visible is not None:
+            registered, tombstoned = visible
+            files = [
+                f for f in dataset.files
+                if f in registered or (f not in tombstoned and not os.path.basename(f).startswith(COMPACTED_PREFIX))
+            ]
+            if len(files) < len(dataset.files):
+                dataset = ds.dataset(
+                    files, schema=dataset.schema, format="parquet", partitioning=partitioning,
+                    partition_base_dir=root, filesystem=self.arrow_filesystem()
+                )
+        return dataset.to_table(
+            columns=self._projected_columns(dataset.schema, columns, name),
+            filter=None if filters is None else pq.filters_to_expression(filters)
+        )
 
-    
     def _save_df_schema(self, df, fpath):
         """Save the schema of a DataFrame to a JSON file."""        
         try:
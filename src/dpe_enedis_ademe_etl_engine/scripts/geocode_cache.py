@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional
+
+try:
+    from ..utils import logger
+    from ..utils.fonctions import normalize_adress
+except ImportError:
+    import sys
+    from pathlib import Path
+    current_dir = Path(__file__).resolve().parent
+    parent_dir = current_dir.parent
+    sys.path.append(str(parent_dir))
+    from utils import logger
+    from utils.fonctions import normalize_adress
+
+
+class GeocodeCache:
+    """
+    Persistent geocoding cache (SQLite) keyed by the normalized full_adress.
+    - entries older than `ttl_seconds` are ignored then purged
+    - size bounded to `max_entries` with LRU eviction (on last access)
+    - WAL journal + busy timeout : concurrent readers and writers,
+    threads and processes (one connection per thread)
+    - negative results (address not found by the BAN) are cached as well
+    - hits/misses counters for the current instance
+    """
+    SQLITE_MAX_VARIABLES = 500
+
+    def __init__(self, fpath: str, ttl_seconds: float = 30 * 24 * 3600, max_entries: int = 1_000_000):
+        self.fpath = fpath
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._counters_lock = threading.Lock()
+        if os.path.dirname(fpath):
+            os.makedirs(os.path.dirname(fpath), exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                " key TEXT PRIMARY KEY,"
+                " payload TEXT,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_geocode_last_access ON geocode(last_access)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.fpath, timeout=30)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _chunks(self, keys):
+        keys = list(keys)
+        for i in range(0, len(keys), self.SQLITE_MAX_VARIABLES):
+            yield keys[i:i + self.SQLITE_MAX_VARIABLES]
+
+    def get_many(self, adresses: Iterable[str]) -> Dict[str, Optional[dict]]:
+        """
+        Look up addresses in the cache.
+        :param adresses: Addresses (full_adress) to look up.
+        :return: Dict {adresse: result} for the cached addresses only,
+        result is None when the address is cached as not found by the BAN.
+        """
+        adresses = list(dict.fromkeys(adresses))
+        by_key = {}
+        for a in adresses:
+            by_key.setdefault(normalize_adress(a), []).append(a)
+        now = time.time()
+        found = {}
+        conn = self._conn()
+        for chunk in self._chunks(by_key):
+            rows = conn.execute(
+                f"SELECT key, payload FROM geocode WHERE created_at >= ? AND key IN ({','.join('?' * len(chunk))})",
+                [now - self.ttl_seconds, *chunk]
+            ).fetchall()
+            for key, payload in rows:
+                found[key] = None if payload is None else json.loads(payload)
+        if found:
+            with conn:
+                conn.executemany("UPDATE geocode SET last_access = ? WHERE key = ?", [(now, k) for k in found])
+        res = {}
+        for key, adrs in by_key.items():
+            if key in found:
+                for a in adrs:
+                    res[a] = None if found[key] is None else {**found[key], 'full_adress': a}
+        with self._counters_lock:
+            self.hits += len(res)
+            self.misses += len(adresses) - len(res)
+        return res
+
+    def get(self, adresse: str) -> Optional[dict]:
+        return self.get_many([adresse]).get(adresse)
+
+    def set_many(self, results: Dict[str, Optional[dict]]):
+        """
+        Store geocoding results.
+        :param results: Dict {adresse: BAN result or None if not found}.
+        """
+        if not results:
+            return
+        now = time.time()
+        rows = []
+        for adresse, result in results.items():
+            payload = None
+            if result is not None:
+                payload = json.dumps({k: v for k, v in result.items() if k != 'full_adress'}, ensure_ascii=False)
+            rows.append((normalize_adress(adresse), payload, now, now))
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO geocode (key, payload, created_at, last_access) VALUES (?, ?, ?, ?)",
+                rows
+            )
+        self.evict()
+
+    def set(self, adresse: str, result: Optional[dict]):
+        self.set_many({adresse: result})
+
+    def evict(self):
+        """Purge expired entries then the least recently used ones above max_entries."""
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM geocode WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            n = conn.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+            if n > self.max_entries:
+                conn.execute(
+                    "DELETE FROM geocode WHERE key IN (SELECT key FROM geocode ORDER BY last_access ASC LIMIT ?)",
+                    (n - self.max_entries,)
+                )
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "size": len(self),
+        }
+
+    def log_stats(self):
+        logger.info(f"Geocode cache {self.fpath} : {self.stats()}")
@@ -0,0 +1,218 @@
+import os
+import re
+import time
+import uuid
+import shutil
+import posixpath
+import pyarrow as pa
+from pyarrow import parquet as pq
+from collections import defaultdict
+
+from minio.commonconfig import CopySource
+from prefect import flow, task
+from prefect.cache_policies import NO_CACHE
+
+try:
+    from ..utils import logger, decorator_logger
+    from ..scripts.filestorage_helper import FileStorageConnexion, COMPACTED_PREFIX
+    from ..utils.fonctions import get_env_var, get_today_date
+except ImportError:
+    import sys
+    from pathlib import Path
+    current_dir = Path(__file__).resolve().parent
+    parent_dir = current_dir.parent
+    sys.path.append(str(parent_dir))
+    from scripts.filestorage_helper import FileStorageConnexion, COMPACTED_PREFIX
+    from utils import logger, decorator_logger
+    from utils.fonctions import get_env_var, get_today_date
+
+
+class LakeHousekeeper(FileStorageConnexion):
+    """
+    Housekeeping of the lake zones, driven by the catalog (LakeCatalog) :
+    - `compact` merges the small files of a partition (leaf directory of a hive dataset, or
+    directory of a flat table) into files of about `COMPACTION_TARGET_FILE_MB`, written with the
+    write profile of the zone
+    - `apply_retention` expires the old files of bronze and archive, and moves the old files
+    of silver and gold to the archive directory (`RETENTION_DAYS_<ZONE>`, -1 : kept)
+    - `vacuum` deletes the replaced files once `COMPACTION_GRACE_MINUTES` have passed
+    Readers can run meanwhile : a new file is written completely (temporary name then rename,
+    or multipart upload) before the catalog swaps it with the old ones in one transaction, and
+    the old files stay on disk for the readers which listed them before the swap.
+    Only the files registered in the catalog are handled.
+    """
+    RETENTION_DEFAULT_DAYS = {"bronze": 7, "silver": 90, "gold": -1, "archive": 365}
+
+    def __init__(self):
+        super().__init__()
+        if self.catalog is None:
+            raise ValueError("LakeHousekeeper needs the lake catalog, set LAKE_CATALOG_ENABLED to true.")
+        self.compaction_zones = get_env_var('COMPACTION_ZONES', default_value="silver,gold", compulsory=True).split(",")
+        self.target_file_bytes = get_env_var('COMPACTION_TARGET_FILE_MB', default_value=128, compulsory=True, cast_to_type=int) * 2**20
+        # row groups imposés aux fichiers compactés (sinon ceux du profil de la zone)
+        self.row_group_size = get_env_var('COMPACTION_ROW_GROUP_SIZE', compulsory=False)
+        self.row_group_size = int(self.row_group_size) if self.row_group_size else None
+        # fichiers en cours d'écriture par un batch : pas compactés
+        self.min_age_seconds = get_env_var('COMPACTION_MIN_AGE_MINUTES', default_value=60, compulsory=True, cast_to_type=float) * 60
+        self.grace_seconds = get_env_var('COMPACTION_GRACE_MINUTES', default_value=30, compulsory=True, cast_to_type=float) * 60
+        self.retention_days = {
+            zone: get_env_var(f'RETENTION_DAYS_{zone.upper()}', default_value=days, compulsory=True, cast_to_type=float)
+            for zone, days in self.RETENTION_DEFAULT_DAYS.items()
+        }
+
+    def _bins(self, entries):
+        """Consecutive files grouped until their size reaches the target (one output file per group)."""
+        bins, current, size = [], [], 0
+        for e in entries:
+            current.append(e)
+            size += e["n_bytes"]
+            if size >= self.target_file_bytes:
+                bins.append(current)
+                current, size = [], 0
+        if current:
+            bins.append(current)
+        return [b for b in bins if len(b) > 1]
+
+    def _delete(self, entry):
+        """Delete the file of a catalog entry (or tombstone), missing files ignored."""
+        if self.env == "LOCAL":
+            try:
+                os.remove(entry["path"])
+            except FileNotFoundError:
+                pass
+        else:
+            self.client.remove_object(self.BUCKET_NAME, f"{entry['dir']}{entry['fname']}")
+
+    def _write(self, table, dir, path, fname):
+        """Write a compacted file, visible under its final name only once complete. :return: (metadata, n_bytes)"""
+        if self.env == "LOCAL":
+            tmp = os.path.join(dir, f"_compacting-{uuid.uuid4().hex}.parquet") # ignoré par la lecture des datasets
+            row_group_size, options = self.write_options(dir, table, compression=self.lake_compression, row_group_size=self.row_group_size)
+            try:
+                pq.write_table(table, tmp, row_group_size=row_group_size, **options)
+                os.replace(tmp, path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            return pq.read_metadata(path), os.path.getsize(path)
+        metadata = self.upload_parquet_to_s3(table, f"{dir}{fname}", row_group_size=self.row_group_size)
+        return metadata, self.client.stat_object(self.BUCKET_NAME, f"{dir}{fname}").size
+
+    def _merge(self, zone, table_name, entries):
+        """Merge files of one directory into one file, swapped in the catalog. :return: True if swapped."""
+        dir = entries[0]["dir"]
+        hive = re.search(r"batch_id=[^/]+/?$", dir) is not None
+        tables = []
+        for e in entries:
+            t = self.read_parquet_table(e["dir"], e["fname"])
+            # table plate : batch d'origine gardé en colonne (les fichiers d'un dataset l'ont en partition)
+            if not hive and "batch_id" not in t.column_names:
+                t = t.append_column("batch_id", pa.array([e["batch_id"]] * t.num_rows, pa.string()))
+            tables.append(t)
+        merged = pa.concat_tables(tables)
+        fname = f"{COMPACTED_PREFIX}{uuid.uuid4().hex}.parquet" if hive \
+            else f"{table_name}_{get_today_date()}_{COMPACTED_PREFIX}{uuid.uuid4().hex[:8]}.parquet"
+        path = entries[0]["path"][:-len(entries[0]["fname"])] + fname
+        metadata, n_bytes = self._write(merged, dir, path, fname)
+        batch_ids = {e["batch_id"] for e in entries}
+        new_file = dict(
+            path=path, dir=dir, fname=fname, zone=zone, table=table_name,
+            batch_id=batch_ids.pop() if len(batch_ids) == 1 else None,
+            metadata=metadata, n_bytes=n_bytes,
+            created_at=max(e["created_at"] for e in entries) # rétention : date du fichier le plus récent
+        )
+        if not self.catalog.replace_files(entries, [new_file], grace_seconds=self.grace_seconds):
+            logger.warning(f"Compaction {zone}/{table_name} : files of {dir} replaced meanwhile, compacted file dropped.")
+            self._delete(new_file)
+            return False
+        logger.info(f"Compaction {zone}/{table_name} : {len(entries)} files ({merged.num_rows} rows) merged into {path}.")
+        return True
+
+    @decorator_logger
+    @task(name="lake-compact-table", retries=3, retry_delay_seconds=10, cache_policy=NO_CACHE)
+    def compact(self, zone, table_name):
+        """
+        Merge the small files of a table, partition by partition (files of the same directory
+        and schema, older than `COMPACTION_MIN_AGE_MINUTES`).
+        :return: Number of files replaced.
+        """
+        groups = defaultdict(list)
+        for e in self.catalog.files(zone, table_name, created_before=time.time() - self.min_age_seconds):
+            if e["n_bytes"] is not None and e["n_bytes"] < self.target_file_bytes:
+                groups[(e["dir"], e["schema_hash"])].append(e)
+        n_files = 0
+        for entries in groups.values():
+            for files in self._bins(sorted(entries, key=lambda e: e["created_at"])):
+                if self._merge(zone, table_name, files):
+                    n_files += len(files)
+        return n_files
+
+    def _archive(self, zone, entry):
+        """Copy a file under `<PATH_ARCHIVE_DIR>/<zone>/` (same relative directory), the original becomes a tombstone."""
+        root = {"silver": self.PATH_DATA_SILVER, "gold": self.PATH_DATA_GOLD}[zone]
+        rel = os.path.relpath(os.path.normpath(entry["dir"]), os.path.normpath(root))
+        if self.env == "LOCAL":
+            new_dir = os.path.normpath(os.path.join(self.PATH_ARCHIVE_DIR, zone, rel))
+            new_path = os.path.join(new_dir, entry["fname"])
+            os.makedirs(new_dir, exist_ok=True)
+            tmp = os.path.join(new_dir, f"_archiving-{uuid.uuid4().hex}")
+            shutil.copyfile(entry["path"], tmp)
+            os.replace(tmp, new_path)
+        else:
+            new_dir = posixpath.normpath(posixpath.join(self.PATH_ARCHIVE_DIR, zone, rel)) + "/"
+            new_path = f"{new_dir}{entry['fname']}"
+            self.client.copy_object(self.BUCKET_NAME, new_path, CopySource(self.BUCKET_NAME, f"{entry['dir']}{entry['fname']}"))
+        if not self.catalog.relocate(entry, new_path, new_dir, "archive", grace_seconds=self.grace_seconds):
+            self._delete({"path": new_path, "dir": new_dir, "fname": entry["fname"]})
+            return False
+        return True
+
+    @decorator_logger
+    @task(name="lake-apply-retention", retries=3, retry_delay_seconds=10, cache_policy=NO_CACHE)
+    def apply_retention(self):
+        """
+        Retention policy by zone (`RETENTION_DAYS_<ZONE>`, age of the file in the catalog) :
+        bronze and archive files expire, silver and gold files are archived.
+        The replaced files are deleted by `vacuum` after the grace delay.
+        :return: {zone: number of files expired or archived}
+        """
+        now = time.time()
+        counts = {}
+        for zone, days in self.retention_days.items():
+            if days < 0:
+                continue
+            entries = self.catalog.files(zone, created_before=now - days * 86400)
+            if zone in ("bronze", "archive"):
+                counts[zone] = len(entries) if self.catalog.replace_files(entries, [], grace_seconds=self.grace_seconds) else 0
+            else:
+                counts[zone] = sum(self._archive(zone, e) for e in entries)
+            logger.info(f"Retention {zone} ({days} days) : {counts[zone]} files {'expired' if zone in ('bronze', 'archive') else 'archived'}.")
+        return counts
+
+    @decorator_logger
+    @task(name="lake-vacuum", retries=3, retry_delay_seconds=10, cache_policy=NO_CACHE)
+    def vacuum(self):
+        """
+        Delete the files replaced by a compaction, expired or archived, once their grace delay is over.
+        :return: Number of files deleted.
+        """
+        expired = self.catalog.expired_tombstones()
+        for t in expired:
+            self._delete(t)
+        self.catalog.forget_tombstones(t["path"] for t in expired)
+        logger.info(f"Vacuum : {len(expired)} replaced files deleted.")
+        return len(expired)
+
+    @decorator_logger
+    @flow(name="Lake housekeeping pipeline",
+      description="Compaction, rétention et nettoyage des zones du lake")
+    def run(self):
+        """
+        Compacte les tables des zones `COMPACTION_ZONES`, applique la rétention
+        puis supprime les fichiers remplacés dont le délai de grace est passé.
+        """
+        for zone in self.compaction_zones:
+            for table_name in self.catalog.tables(zone):
+                self.compact(zone, table_name)
+        self.apply_retention()
+        self.vacuum()
@@ -0,0 +1,235 @@
+import time
+import datetime
+import threading
+import httpx
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+try:
+    from ..scripts.concurrency import AdaptiveConcurrencyController
+    from ..utils import logger
+except ImportError:
+    import sys
+    from pathlib import Path
+    current_dir = Path(__file__).resolve().parent
+    parent_dir = current_dir.parent
+    sys.path.append(str(parent_dir))
+    from scripts.concurrency import AdaptiveConcurrencyController
+    from utils import logger
+
+
+class RetryPolicy:
+    """
+    Retry policy shared by every fetch path of the extractor.
+    - only transient errors are retried : transport errors (connection, timeout)
+    and the `retry_statuses` answers (429, 5xx), other 4xx are permanent
+    - exponential backoff from `backoff` seconds, capped at `max_backoff`
+    - a `Retry-After` header (seconds or http date) overrides the backoff
+    """
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        max_backoff: float = 120,
+        retry_statuses: tuple = (429, 500, 502, 503, 504)
+    ):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = set(retry_statuses)
+
+    def is_retryable_status(self, status_code: int) -> bool:
+        return status_code in self.retry_statuses
+
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, httpx.HTTPStatusError):
+            return self.is_retryable_status(error.response.status_code)
+        return isinstance(error, httpx.TransportError)
+
+    @staticmethod
+    def retry_after(response: httpx.Response):
+        """Seconds asked by the `Retry-After` header of a response (None if absent or invalid)."""
+        value = response.headers.get("Retry-After") if response is not None else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            date = parsedate_to_datetime(value)
+            return max(0.0, (date - datetime.datetime.now(date.tzinfo)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    def delay(self, attempt: int, response: httpx.Response = None) -> float:
+        """Seconds to wait before the retry number `attempt + 1`."""
+        wait = self.retry_after(response)
+        if wait is None:
+            wait = self.backoff * 2 ** attempt
+        return min(wait, self.max_backoff)
+
+
+class HttpClientRegistry:
+    """
+    Per-host pooled HTTP clients owned by the extractor.
+    - one keep-alive `httpx.Client` per host, reused by every sync call
+    (no TCP+TLS handshake per request)
+    - async engines get a client configured the same way (`new_async_client`),
+    pooled for their whole run
+    - optional HTTP/2 (needs the `h2` package, disabled with a warning otherwise)
+    - per-host timeouts, default `timeout` for the others
+    - `get` / `stream` apply the shared `RetryPolicy`
+    - per-host adaptive concurrency (AIMD + circuit breaker, see `AdaptiveConcurrencyController`)
+    applied to `get` and shared with the async engines (`controller`)
+    :param host_timeouts: Dict {host: httpx.Timeout or seconds}.
+    :param adaptive: If False, no adaptive concurrency limit (the callers' thread / in flight counts only).
+    :param controller_kwargs: Dict {host: kwargs of AdaptiveConcurrencyController}, default limits for the others.
+    """
+    def __init__(
+        self,
+        timeout: float = 60,
+        max_connections: int = 100,
+        http2: bool = False,
+        retry_policy: RetryPolicy = None,
+        host_timeouts: dict = None,
+        adaptive: bool = True,
+        controller_kwargs: dict = None
+    ):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.http2 = http2 and self._h2_available()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.host_timeouts = dict(host_timeouts or {})
+        self.adaptive = adaptive
+        self.controller_kwargs = dict(controller_kwargs or {})
+        self._controllers = {}
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _h2_available() -> bool:
+        try:
+            import h2 # noqa: F401
+            return True
+        except ImportError:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed, using HTTP/1.1.")
+            return False
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        """Host (netloc) of an url, an already bare host is returned as is."""
+        return urlparse(url).netloc or url
+
+    def timeout_for(self, host: str) -> httpx.Timeout:
+        timeout = self.host_timeouts.get(host, self.timeout)
+        return timeout if isinstance(timeout, httpx.Timeout) else httpx.Timeout(timeout)
+
+    def _client_kwargs(self, host: str) -> dict:
+        return dict(
+            timeout=self.timeout_for(host),
+            limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            http2=self.http2,
+            follow_redirects=True
+        )
+
+    def client(self, url: str) -> httpx.Client:
+        """The shared sync client of the host of `url`."""
+        host = self.host_of(url)
+        with self._lock:
+            if host not in self._clients:
+                self._clients[host] = httpx.Client(**self._client_kwargs(host))
+            return self._clients[host]
+
+    def controller(self, url: str) -> AdaptiveConcurrencyController:
+        """The adaptive concurrency controller of the host of `url` (None if adaptive is disabled)."""
+        if not self.adaptive:
+            return None
+        host = self.host_of(url)
+        with self._lock:
+            if host not in self._controllers:
+                kwargs = {"max_limit": self.max_connections, **self.controller_kwargs.get(host, {})}
+                self._controllers[host] = AdaptiveConcurrencyController(name=host, **kwargs)
+            return self._controllers[host]
+
+    def controller_stats(self) -> dict:
+        with self._lock:
+            controllers = dict(self._controllers)
+        return {host: c.snapshot() for host, c in controllers.items()}
+
+    def _send(self, url: str, **kwargs) -> httpx.Response:
+        """One GET attempt, under the adaptive concurrency limit of the host."""
+        controller = self.controller(url)
+        if controller is None:
+            return self.client(url).get(url, **kwargs)
+        controller.acquire()
+        start = time.perf_counter()
+        overloaded = True
+        try:
+            res = self.client(url).get(url, **kwargs)
+            overloaded = self.retry_policy.is_retryable_status(res.status_code)
+            return res
+        finally:
+            controller.release(time.perf_counter() - start, overloaded)
+
+    def new_async_client(self, url: str) -> httpx.AsyncClient:
+        """A new async client for the host of `url` (bound to the running loop, closed by the caller)."""
+        return httpx.AsyncClient(**self._client_kwargs(self.host_of(url)))
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        """
+        GET with the shared retry policy.
+        :return: The last response (the caller checks its status), transport errors are raised after the retries.
+        """
+        policy = self.retry_policy
+        for attempt in range(policy.max_retries + 1):
+            try:
+                res = self._send(url, **kwargs)
+            except httpx.TransportError as e:
+                if attempt == policy.max_retries:
+                    raise
+                logger.warning(f"GET {url} : {type(e).__name__}, retry {attempt + 1}/{policy.max_retries}.")
+                time.sleep(policy.delay(attempt))
+                continue
+            if not policy.is_retryable_status(res.status_code) or attempt == policy.max_retries:
+                return res
+            logger.warning(f"GET {url} : status {res.status_code}, retry {attempt + 1}/{policy.max_retries}.")
+            time.sleep(policy.delay(attempt, res))
+
+    @contextmanager
+    def stream(self, url: str, **kwargs):
+        """
+        Streamed GET (large downloads), the opening of the response is retried
+        with the shared policy, the body is not (the caller restarts the download).
+        """
+        policy = self.retry_policy
+        opened = False
+        for attempt in range(policy.max_retries + 1):
+            try:
+                with self.client(url).stream("GET", url, **kwargs) as res:
+                    if policy.is_retryable_status(res.status_code) and attempt < policy.max_retries:
+                        delay = policy.delay(attempt, res)
+                    else:
+                        res.raise_for_status()
+                        opened = True
+                        yield res
+                        return
+            except httpx.TransportError:
+                if opened or attempt == policy.max_retries: # erreur pendant la lecture du body : pas de retry ici
+                    raise
+                delay = policy.delay(attempt)
+            logger.warning(f"GET (stream) {url} : retry {attempt + 1}/{policy.max_retries}.")
+            time.sleep(delay)
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from typing import List, Tuple
+
+try:
+    from ..utils import logger
+except ImportError:
+    import sys
+    from pathlib import Path
+    current_dir = Path(__file__).resolve().parent
+    parent_dir = current_dir.parent
+    sys.path.append(str(parent_dir))
+    from utils import logger
+
+
+def encode_keys(left_key: pd.Series, right_key: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encode the join keys of both sides once, as integer codes of a shared dictionary.
+    Null keys get the code -1 (they never match, as in SQL).
+    :return: (left codes, right codes), int64 arrays.
+    """
+    left_key = left_key.astype("string").to_numpy(dtype=object, na_value=None)
+    right_key = right_key.astype("string").to_numpy(dtype=object, na_value=None)
+    codes, _ = pd.factorize(np.concatenate([left_key, right_key]), use_na_sentinel=True)
+    codes = codes.astype(np.int64)
+    return codes[:len(left_key)], codes[len(left_key):]
+
+
+def join_indices(left_codes: np.ndarray, right_codes: np.ndarray, how: str = "left") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hash join of two integer key arrays with pyarrow (no pandas object column involved).
+    :param how: "left" or "inner".
+    :return: (left row positions, right row positions), -1 for the unmatched right rows of a left join.
+    The pairs are sorted as `pd.merge` does : left order, then right order.
+    """
+    if how not in ("left", "inner"):
+        raise ValueError(f"Unknown join type : {how} (choose between 'left' and 'inner')")
+    left = pa.table({"k": left_codes, "l": np.arange(len(left_codes), dtype=np.int64)})
+    right_valid = right_codes >= 0
+    right = pa.table({
+        "k": right_codes[right_valid],
+        "r": np.arange(len(right_codes), dtype=np.int64)[right_valid]
+    })
+    joined = left.join(right, keys="k", join_type="left outer" if how == "left" else "inner", use_threads=True)
+    joined = joined.take(pc.sort_indices(joined, sort_keys=[("l", "ascending"), ("r", "ascending")]))
+    return joined["l"].to_numpy(), joined["r"].fill_null(-1).to_numpy()
+
+
+def row_hash(df: pd.DataFrame, subset: List[str] = None) -> np.ndarray:
+    """64-bit hash of each row over `subset` (all the columns if None)."""
+    cols = list(subset) if subset else list(df.columns)
+    return pd.util.hash_pandas_object(df[cols], index=False).to_numpy()
+
+
+def drop_duplicates_hashed(df: pd.DataFrame, subset: List[str] = None) -> pd.DataFrame:
+    """
+    `drop_duplicates` on a 64-bit row hash of the `subset` columns (first occurrence kept) :
+    only the key columns are hashed instead of comparing every column of a wide frame.
+    """
+    if df.empty:
+        return df
+    _, first = np.unique(row_hash(df, subset), return_index=True)
+    if len(first) == len(df):
+        return df
+    return df.iloc[np.sort(first)]
+
+
+def hash_join(
+    left: pd.DataFrame,
+    right: pd.DataFrame,
+    left_on: str,
+    right_on: str,
+    how: str = "left",
+    dedup_subset: List[str] = None
+) -> pd.DataFrame:
+    """
+    Join two dataframes on one key column each :
+    - keys encoded once as integer codes (`encode_keys`)
+    - matching done by a pyarrow hash join on the codes (`join_indices`)
+    - the (wide) columns are gathered by position, never converted
+    - optional dedup on a 64-bit hash of the `dedup_subset` columns
+    Same rows as `pd.merge(left, right, how, left_on, right_on)` (null keys excepted).
+    :param dedup_subset: Columns identifying a row of the result, None to skip the dedup.
+    :return: The joined dataframe, with a fresh RangeIndex.
+    """
+    left_codes, right_codes = encode_keys(left[left_on], right[right_on])
+    left_idx, right_idx = join_indices(left_codes, right_codes, how)
+    overlap = set(left.columns) & set(right.columns)
+    if overlap:
+        raise ValueError(f"hash_join : columns on both sides {sorted(overlap)}, suffix them first.")
+    left_part = left.iloc[left_idx].reset_index(drop=True)
+    if (right_idx >= 0).all():
+        right_part = right.iloc[right_idx].reset_index(drop=True)
+    else: # lignes de droite absentes : NaN (comme pd.merge)
+        right_part = right.reset_index(drop=True).reindex(right_idx).reset_index(drop=True)
+    joined = pd.concat([left_part, right_part], axis=1)
+    if dedup_subset is not None:
+        n_rows = len(joined)
+        joined = drop_duplicates_hashed(joined, dedup_subset).reset_index(drop=True)
+        if len(joined) < n_rows:
+            logger.info(f"hash_join : {n_rows - len(joined)} duplicated rows dropped.")
+    return joined
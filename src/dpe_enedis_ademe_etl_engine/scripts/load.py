@@ -13,7 +13,7 @@ from prefect.cache_policies import NO_CACHE
 try:
     from ..utils import decorator_logger, logger
     from ..scripts.filestorage_helper import FileStorageConnexion
-    from ..utils.fonctions import get_env_var
+    from ..utils.fonctions import get_env_var, load_json
 except ImportError:
     import sys
     from pathlib import Path
@@ -22,7 +22,7 @@ except ImportError:
     sys.path.append(str(parent_dir))
     from scripts.filestorage_helper import FileStorageConnexion
     from utils import decorator_logger, logger
-    from utils.fonctions import get_env_var
+    from utils.fonctions import get_env_var, load_json
 
 class DataEnedisAdemeLoader(FileStorageConnexion):
     """
@@ -50,30 +50,14 @@ class DataEnedisAdemeLoader(FileStorageConnexion):
             "donnees_climatiques": ["id_ban"],
             "tests_statistiques_dpe": ["batch_id", "etiquette_dpe_ademe"]
         }
-        self.df_adresses = self.load_parquet_file(
-            dir=get_env_var('PATH_DATA_GOLD', compulsory=True),
-            fname=f"adresses_{self.get_today_date()}_{self.batch_id}.parquet"
-        )
-        self.df_logements = self.load_parquet_file(
-            dir=get_env_var('PATH_DATA_GOLD', compulsory=True),
-            fname=f"logements_{self.get_today_date()}_{self.batch_id}.parquet"
-        )
-        self.df_villes = self.load_parquet_file(
-            dir=get_env_var('PATH_DATA_GOLD', compulsory=True),
-            fname=f"villes_{self.get_today_date()}_{self.batch_id}.parquet"
-        )
-        self.df_donnees_geocodage = self.load_parquet_file(
-            dir=get_env_var('PATH_DATA_GOLD', compulsory=True),
-            fname=f"donnees_geocodage_{self.get_today_date()}_{self.batch_id}.parquet"
-        )
-        self.df_donnees_climatiques = self.load_parquet_file(
-            dir=get_env_var('PATH_DATA_GOLD', compulsory=True),
-            fname=f"donnees_climatiques_{self.get_today_date()}_{self.batch_id}.parquet"
-        )
-        self.df_tests_statistiques_dpe = self.load_parquet_file(
-            dir=get_env_var('PATH_DATA_GOLD', compulsory=True),
-            fname=f"tests_statistiques_dpe_{self.get_today_date()}_{self.batch_id}.parquet"
-        )
+        # colonnes des tables de la bdd (schema golden) : seules colonnes lues dans les fichiers gold
+        self.gold_columns = self.get_gold_columns()
+        self.df_adresses = self.load_gold_table("adresses")
+        self.df_logements = self.load_gold_table("logements")
+        self.df_villes = self.load_gold_table("villes")
+        self.df_donnees_geocodage = self.load_gold_table("donnees_geocodage")
+        self.df_donnees_climatiques = self.load_gold_table("donnees_climatiques")
+        self.df_tests_statistiques_dpe = self.load_gold_table("tests_statistiques_dpe")
         if self.df_adresses.empty: raise ValueError("Le DataFrame des adresses est vide. Vérifiez le fichier dans la gold zone.")
         if self.df_logements.empty: raise ValueError("Le DataFrame des logements est vide. Vérifiez le fichier dans la gold zone.")
         if self.df_villes.empty: raise ValueError("Le DataFrame des villes est vide. Vérifiez le fichier dans la gold zone.")
@@ -82,6 +66,44 @@ class DataEnedisAdemeLoader(FileStorageConnexion):
         if self.df_tests_statistiques_dpe.empty: raise ValueError("Le DataFrame des tests statistiques est vide. Vérifiez le fichier dans la gold zone.")
         
 
+    def get_gold_columns(self):
+        """
+        Columns of each table in the golden schema : {table name: [columns]}.
+        Empty if the schema is not found (every column of the gold files is then read).
+        """
+        fpath = get_env_var('SCHEMA_GOLDEN_DATA_FILEPATH', default_value=os.path.join("config", "schema_golden_data.json"), compulsory=True)
+        if not os.path.exists(fpath):
+            logger.warning(f"Golden schema not found ({fpath}) : gold files read without projection.")
+            return {}
+        return {
+            name.replace("schema-", "", 1): list(schema.get("cols", {}))
+            for name, schema in load_json(fpath, default_value={}).items()
+        }
+
+    def load_gold_table(self, table_name):
+        """
+        Gold file of a table of the current batch (looked up in the lake catalog), only its golden
+        schema columns are materialized. With the hive layout, the batch partition of the table dataset.
+        """
+        if self.lake_layout == "hive":
+            return self.load_dataset(
+                dir=get_env_var('PATH_DATA_GOLD', compulsory=True),
+                name=table_name,
+                columns=self.gold_columns.get(table_name) or None,
+                filters=[("batch_id", "==", self.batch_id)]
+            ).to_pandas()
+        # fichier du batch dans le catalogue (écrit par le transformer, eventuellement la veille)
+        dir, fname = self.locate_file(
+            get_env_var('PATH_DATA_GOLD', compulsory=True),
+            f"{table_name}_{self.get_today_date()}_{self.batch_id}.parquet",
+            table=table_name
+        )
+        return self.load_parquet_file(
+            dir=dir,
+            fname=fname,
+            columns=self.gold_columns.get(table_name) or None
+        )
+
     @decorator_logger
     @task(name="load-save-tables-to-db", retries=3, retry_delay_seconds=10, cache_policy=NO_CACHE)
     def save_one_table(self, df, table_name=""):
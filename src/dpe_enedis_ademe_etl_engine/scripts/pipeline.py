@@ -0,0 +1,123 @@
+import time
+import queue
+import threading
+from typing import Any, Callable, Iterable, List, Tuple
+
+try:
+    from ..utils import logger
+except ImportError:
+    import sys
+    from pathlib import Path
+    current_dir = Path(__file__).resolve().parent
+    parent_dir = current_dir.parent
+    sys.path.append(str(parent_dir))
+    from utils import logger
+
+
+class _StageError:
+    """Exception raised by a stage, forwarded downstream to the consumer."""
+    def __init__(self, stage: str, error: BaseException):
+        self.stage = stage
+        self.error = error
+
+
+class StagePipeline:
+    """
+    Producer/consumer stages connected by bounded queues, one thread per stage.
+    - the items of the source flow through the stages in order (FIFO)
+    - a stage returning None drops the item
+    - backpressure : a full queue blocks the upstream stage (and the source
+    iterator), at most `queue_size` items wait between two stages
+    - the consumer iterates `run(source)` in the calling thread (e.g. the writer)
+    - an exception in a stage stops the pipeline and is raised in the consumer
+    - busy / idle time per stage kept in `stats` (overlap diagnostics)
+    :param stages: List of (name, function item -> item or None).
+    :param queue_size: Max number of items waiting between two stages.
+    """
+    _DONE = object()
+
+    def __init__(self, stages: List[Tuple[str, Callable[[Any], Any]]], queue_size: int = 2):
+        if not stages:
+            raise ValueError("StagePipeline requires at least one stage.")
+        self.stages = list(stages)
+        self.queue_size = max(1, queue_size)
+        self.stats = {}
+
+    def _put(self, q: queue.Queue, item, stop: threading.Event) -> bool:
+        """Blocking put which gives up when the pipeline is stopped."""
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _feed(self, source: Iterable, out_q: queue.Queue, stop: threading.Event):
+        try:
+            for item in source:
+                if not self._put(out_q, item, stop):
+                    return
+        except BaseException as e:
+            self._put(out_q, _StageError("source", e), stop)
+            return
+        self._put(out_q, self._DONE, stop)
+
+    def _work(self, name: str, func: Callable, in_q: queue.Queue, out_q: queue.Queue, stop: threading.Event):
+        stats = self.stats[name]
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                item = in_q.get(timeout=0.1)
+            except queue.Empty:
+                stats["idle_s"] += time.perf_counter() - t0
+                continue
+            stats["idle_s"] += time.perf_counter() - t0
+            if item is self._DONE or isinstance(item, _StageError):
+                self._put(out_q, item, stop)
+                return
+            t0 = time.perf_counter()
+            try:
+                res = func(item)
+            except BaseException as e:
+                self._put(out_q, _StageError(name, e), stop)
+                return
+            finally:
+                stats["busy_s"] += time.perf_counter() - t0
+            stats["items"] += 1
+            if res is not None and not self._put(out_q, res, stop):
+                return
+
+    def run(self, source: Iterable):
+        """
+        Run the stages on the items of `source`.
+        :return: A generator of the outputs of the last stage.
+        """
+        stop = threading.Event()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        self.stats = {name: {"items": 0, "busy_s": 0.0, "idle_s": 0.0} for name, _ in self.stages}
+        threads = [threading.Thread(target=self._feed, args=(source, queues[0], stop), name="pipeline-source", daemon=True)]
+        for i, (name, func) in enumerate(self.stages):
+            threads.append(threading.Thread(
+                target=self._work, args=(name, func, queues[i], queues[i + 1], stop), name=f"pipeline-{name}", daemon=True
+            ))
+        for t in threads:
+            t.start()
+        try:
+            while True:
+                item = queues[-1].get()
+                if item is self._DONE:
+                    break
+                if isinstance(item, _StageError):
+                    logger.error(f"Pipeline stage '{item.stage}' failed : {item.error}")
+                    raise item.error
+                yield item
+        finally:
+            stop.set() # libere les etages bloqués sur une queue pleine (consommateur arreté ou en erreur)
+            for t in threads:
+                t.join()
+            self.log_stats()
+
+    def log_stats(self):
+        for name, s in self.stats.items():
+            logger.info(f"Pipeline stage '{name}' : {s['items']} items, busy {s['busy_s']:.2f}s, idle {s['idle_s']:.2f}s.")
@@ -0,0 +1,87 @@
+import os
+from typing import Iterable, List, Optional
+
+try:
+    from ..utils import logger
+    from ..utils.fonctions import load_json
+except ImportError:
+    import sys
+    from pathlib import Path
+    current_dir = Path(__file__).resolve().parent
+    parent_dir = current_dir.parent
+    sys.path.append(str(parent_dir))
+    from utils import logger
+    from utils.fonctions import load_json
+
+
+class SourceProjection:
+    """
+    Source fields actually used downstream of the extraction, derived from the golden schema.
+    - Ademe : the golden columns suffixed `_ademe` (raw name = column without the suffix),
+    the inputs of the transformer derived columns and the join / dedup / mirror keys.
+    They are requested through the data-fair `select` parameter (hundreds of fields otherwise).
+    - BAN : the golden columns suffixed `_ban`, the other geojson properties are dropped
+    (the geocoding API has no projection parameter).
+    A None field list means no projection (every field is kept).
+    """
+    ADEME_SUFFIX = "_ademe"
+    BAN_SUFFIX = "_ban"
+    # colonnes lues par le transformer pour ses colonnes dérivées (conso_kwh_m2, diffs, tests stats)
+    TRANSFORM_INPUTS = [
+        "conso_5_usages_par_m2_ep_ademe",
+        "conso_5_usages_par_m2_ef_ademe",
+        "surface_habitable_logement_ademe",
+        "etiquette_dpe_ademe",
+    ]
+    # clés de l'extracteur : jointure sur l'id_ban, dedup sur _id, partition et sync incrementale du miroir
+    ADEME_KEYS = ["_id", "identifiant_ban", "code_departement_ban", "date_derniere_modification_dpe"]
+    # id -> id_BAN (jointure ademe), label (remis en upper), lon/lat/full_adress ajoutés par le parser
+    BAN_KEYS = ["id", "label", "lon", "lat", "full_adress"]
+
+    def __init__(self, ademe_fields: Optional[Iterable[str]] = None, ban_properties: Optional[Iterable[str]] = None):
+        self.ademe_fields = None if ademe_fields is None else sorted(set(ademe_fields) | set(self.ADEME_KEYS))
+        self.ban_properties = None if ban_properties is None else sorted(set(ban_properties) | set(self.BAN_KEYS))
+        self.ademe_types = {} # {champ ademe: dtype du schema golden}, pour le decodeur
+
+    @classmethod
+    def from_golden_schema(cls, fpath: str, extra_columns: Iterable[str] = ()) -> "SourceProjection":
+        """
+        Projection of the columns listed in a golden schema (`schema-*` -> `cols`).
+        :param fpath: Path to the golden schema json (no projection if it does not exist).
+        :param extra_columns: Other suffixed columns needed downstream.
+        """
+        if not fpath or not os.path.exists(fpath):
+            logger.warning(f"Golden schema not found ({fpath}) : no projection of the source fields.")
+            return cls()
+        columns = set(extra_columns) | set(cls.TRANSFORM_INPUTS)
+        types = {}
+        for schema in load_json(fpath, default_value={}).values():
+            columns |= set(schema.get("cols", {}))
+            types.update({c: spec.get("type") for c, spec in schema.get("cols", {}).items()})
+        ademe_fields = [c[:-len(cls.ADEME_SUFFIX)] for c in columns if c.endswith(cls.ADEME_SUFFIX)]
+        ban_properties = [c[:-len(cls.BAN_SUFFIX)] for c in columns if c.endswith(cls.BAN_SUFFIX)]
+        projection = cls(ademe_fields, ban_properties)
+        projection.ademe_types = {
+            c[:-len(cls.ADEME_SUFFIX)]: t for c, t in types.items() if c.endswith(cls.ADEME_SUFFIX) and t
+        }
+        logger.info(f"Source projection from {fpath} : {len(projection.ademe_fields)} Ademe fields, "
+                    f"{len(projection.ban_properties)} BAN properties.")
+        return projection
+
+    @property
+    def enabled(self) -> bool:
+        return self.ademe_fields is not None or self.ban_properties is not None
+
+    def ademe_select(self) -> Optional[str]:
+        """Value of the data-fair `select` parameter (None : every field)."""
+        return None if self.ademe_fields is None else ",".join(self.ademe_fields)
+
+    def prune_ban_properties(self, properties: dict) -> dict:
+        """Keep only the projected properties of a BAN result."""
+        if self.ban_properties is None:
+            return properties
+        return {k: v for k, v in properties.items() if k in self.ban_properties}
+
+    def ban_columns(self, columns: Iterable[str]) -> List[str]:
+        """Projected columns of a BAN dataframe (results cached before the projection may hold more)."""
+        return list(columns) if self.ban_properties is None else [c for c in columns if c in self.ban_properties]
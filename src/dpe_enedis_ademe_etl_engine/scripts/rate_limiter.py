@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import asyncio
+import threading
+
+try:
+    import fcntl
+except ImportError: # windows : pas de backend fichier
+    fcntl = None
+
+
+class RateLimitMetrics:
+    """
+    Wait-time metrics of a rate limiter (thread-safe).
+    A high `wait_share` (time spent waiting for tokens / time spent in the calls)
+    means the run is rate-bound, a low one that it is latency-bound.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.acquired = 0
+        self.waited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_call_time = 0.0
+
+    def record_wait(self, wait: float):
+        with self._lock:
+            self.acquired += 1
+            if wait > 0:
+                self.waited += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+
+    def record_call(self, duration: float):
+        with self._lock:
+            self.total_call_time += duration
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            busy = self.total_wait + self.total_call_time
+            return {
+                "acquired": self.acquired,
+                "waited": self.waited,
+                "total_wait_s": round(self.total_wait, 4),
+                "mean_wait_s": round(self.total_wait / self.acquired, 4) if self.acquired else 0.0,
+                "max_wait_s": round(self.max_wait, 4),
+                "wait_share": round(self.total_wait / busy, 4) if busy else 0.0,
+            }
+
+
+class LocalBackend:
+    """In-process bucket state (shared by the threads / coroutines of one process)."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tokens = None
+        self.updated = None
+
+    def reserve(self, tokens: float, rate: float, capacity: float) -> float:
+        """
+        Consume `tokens` tokens, the bucket may go in debt : the caller is then
+        given the time to wait before its reservation is honoured.
+        :return: Seconds to wait before sending the request.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.tokens is None:
+                self.tokens, self.updated = capacity, now
+            self.tokens = min(capacity, self.tokens + (now - self.updated) * rate) - tokens
+            self.updated = now
+            return max(0.0, -self.tokens / rate)
+
+
+class FileLockBackend:
+    """
+    Bucket state stored in a small file, guarded by an exclusive `flock` :
+    the extract workers of one host share the same provider quota.
+    Uses the wall clock (time.time) as every process must agree on it.
+    :param fpath: Path of the state file (one per provider).
+    """
+    def __init__(self, fpath: str):
+        if fcntl is None:
+            raise RuntimeError("FileLockBackend requires fcntl (POSIX only).")
+        self.fpath = fpath
+        if os.path.dirname(fpath):
+            os.makedirs(os.path.dirname(fpath), exist_ok=True)
+
+    def reserve(self, tokens: float, rate: float, capacity: float) -> float:
+        fd = os.open(self.fpath, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            raw = os.read(fd, 4096)
+            now = time.time()
+            state = json.loads(raw) if raw else {"tokens": capacity, "updated": now}
+            available = min(capacity, state["tokens"] + max(0.0, now - state["updated"]) * rate) - tokens
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, json.dumps({"tokens": available, "updated": now}).encode("utf-8"))
+        finally:
+            os.close(fd) # libere aussi le verrou
+        return max(0.0, -available / rate)
+
+
+class RedisBackend:
+    """
+    Bucket state stored in a Redis hash, updated atomically by a Lua script
+    (Redis server clock) : workers on several hosts share the same quota.
+    :param client: A `redis.Redis` client.
+    :param key: Key of the bucket (one per provider).
+    """
+    SCRIPT = """
+    local rate, capacity, tokens = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local available, updated = tonumber(state[1]), tonumber(state[2])
+    if available == nil then available, updated = capacity, now end
+    available = math.min(capacity, available + math.max(0, now - updated) * rate) - tokens
+    redis.call('HSET', KEYS[1], 'tokens', tostring(available), 'updated', tostring(now))
+    -- la cle doit survivre a la dette du bucket, sinon il repart plein et le quota est depasse
+    redis.call('EXPIRE', KEYS[1], math.ceil((capacity - available) / rate) + 60)
+    return tostring(math.max(0, -available / rate))
+    """
+
+    def __init__(self, client, key: str):
+        self.client = client
+        self.key = key
+        self._script = client.register_script(self.SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str, key: str):
+        import redis
+        return cls(redis.Redis.from_url(url), key)
+
+    def reserve(self, tokens: float, rate: float, capacity: float) -> float:
+        return float(self._script(keys=[self.key], args=[rate, capacity, tokens]))
+
+
+def make_backend(spec: str = None, name: str = "default"):
+    """
+    Build a bucket backend from a spec string (env var RATE_LIMIT_BACKEND) :
+    - "" or "local" : in-process state
+    - "file:<directory>" : one `<name>.bucket` state file per provider in the directory
+    - "redis://host:port/db" : one `dpe_etl:ratelimit:<name>` key per provider
+    :param name: Name of the bucket (provider), e.g. "ban", "ademe".
+    """
+    if not spec or spec == "local":
+        return LocalBackend()
+    if spec.startswith("file:"):
+        return FileLockBackend(os.path.join(spec[len("file:"):], f"{name}.bucket"))
+    if spec.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend.from_url(spec, key=f"dpe_etl:ratelimit:{name}")
+    raise ValueError(f"Unknown rate limit backend : {spec} (choose between 'local', 'file:<dir>' and 'redis://...')")
+
+
+class TokenBucket:
+    """
+    Token bucket for threaded code.
+    - `rate` tokens are refilled per second (continuous refill, no 1s window)
+    - at most `burst` tokens can be accumulated
+    - no lock is held while sleeping : each caller reserves its token then sleeps
+    only the time left before it is available (callers are served in order)
+    - the state lives in a backend (in-process, file lock or Redis) so several
+    processes can share one provider quota
+    - wait times are reported in `metrics`
+    """
+    def __init__(self, rate: float, burst: float = 1, backend=None):
+        if rate <= 0:
+            raise ValueError(f"rate must be > 0, got {rate}")
+        self.rate = float(rate)
+        self.capacity = float(max(burst, 1))
+        self.backend = backend or LocalBackend()
+        self.metrics = RateLimitMetrics()
+
+    def reserve(self, tokens: float = 1) -> float:
+        return self.backend.reserve(tokens, self.rate, self.capacity)
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+        Wait until `tokens` tokens are available then consume them.
+        :return: The time waited (seconds).
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        self.metrics.record_wait(wait)
+        return wait
+
+
+class AsyncTokenBucket(TokenBucket):
+    """
+    Token bucket for asyncio code, same semantics as `TokenBucket` :
+    only the coroutine waiting for its token sleeps, never the thread.
+    The reservations on a shared backend (file lock, Redis round-trip) are
+    blocking calls, they are run in a worker thread to keep the loop free.
+    """
+    async def acquire(self, tokens: float = 1) -> float:
+        if isinstance(self.backend, LocalBackend):
+            wait = self.reserve(tokens)
+        else:
+            wait = await asyncio.to_thread(self.reserve, tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self.metrics.record_wait(wait)
+        return wait
+
+
+class RateLimiter(TokenBucket):
+    """Thread-safe rate limiter (`rate_limit` req/s), kept for the legacy thread pool path."""
+    def __init__(self, rate_limit: int, burst: float = 1, backend=None):
+        super().__init__(rate_limit, burst=burst, backend=backend)
+        self.rate_limit = rate_limit
@@ -288,6 +288,19 @@ class DataEnedisAdemeTransformer(FileStorageConnexion):
                     self.df[col] = self.df[col].astype(dtype)
         return self
     
+    def batch_partition_values(self):
+        """
+        Lake partition values of the gold tables of the batch (hive layout) : annee and code_departement
+        of the silver rows (Enedis columns), null if the batch spans several of them.
+        """
+        values = {"batch_id": self.batch_id}
+        for key, col in [("annee", "annee_enedis"), ("code_departement", "code_departement_enedis")]:
+            uniques = self.df[col].dropna().unique() if col in self.df.columns else []
+            values[key] = uniques[0] if len(uniques) == 1 else None
+        if values["code_departement"] is not None and str(values["code_departement"]).isdigit():
+            values["code_departement"] = str(values["code_departement"]).zfill(2)
+        return values
+
     @decorator_logger
     @task(name="transform-save-tables-files", retries=3, retry_delay_seconds=10, cache_policy=NO_CACHE)
     def save_all(self):
@@ -302,11 +315,15 @@ class DataEnedisAdemeTransformer(FileStorageConnexion):
             ("donnees_climatiques", self.df_donnees_climatiques),
             ("tests_statistiques_dpe", self.df_tests_statistiques_dpe) # TODO compute this separately
             ]:
-            self.save_parquet_file(
-                df=d,
-                dir=self.PATH_DATA_GOLD, # ? add le run id dans dir path
-                fname=f"{n}_{get_today_date()}_{self.batch_id}.parquet"
-            )
+            if self.lake_layout == "hive":
+                self.save_dataset(d, dir=self.PATH_DATA_GOLD, name=n, partition_values=self.batch_partition_values())
+            else:
+                self.save_parquet_file(
+                    df=d,
+                    dir=self.PATH_DATA_GOLD, # ? add le run id dans dir path
+                    fname=f"{n}_{get_today_date()}_{self.batch_id}.parquet",
+                    table=n
+                )
             logger.info(f"Saved {n} data to parquet file in gold zone.")
         logger.info("All data saved successfully in gold zone.")
 
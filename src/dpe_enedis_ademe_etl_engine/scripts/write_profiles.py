@@ -0,0 +1,103 @@
+import pyarrow as pa
+import pyarrow.compute as pc
+from typing import Dict, Optional, Union
+
+try:
+    from ..scripts.catalog import LakeCatalog
+    from ..utils.fonctions import load_json
+except ImportError:
+    import sys
+    from pathlib import Path
+    current_dir = Path(__file__).resolve().parent
+    parent_dir = current_dir.parent
+    sys.path.append(str(parent_dir))
+    from scripts.catalog import LakeCatalog
+    from utils.fonctions import load_json
+
+
+# profils d'écriture parquet : codec (+ niveau), rows par row group, colonnes encodées en dictionnaire
+# ("all", "none", "auto" : colonnes peu distinctes, ou liste) et colonnes avec statistiques ("all", "keys", ou liste)
+WRITE_PROFILES = {
+    # ancien défaut (pandas.to_parquet) : lent a écrire et a relire
+    "gzip": {"compression": "gzip", "compression_level": None, "row_group_size": 1_048_576, "dictionary": "all", "statistics": "all"},
+    "snappy": {"compression": "snappy", "compression_level": None, "row_group_size": 128_000, "dictionary": "auto", "statistics": "all"},
+    "lz4": {"compression": "lz4", "compression_level": None, "row_group_size": 128_000, "dictionary": "auto", "statistics": "all"},
+    "zstd-1": {"compression": "zstd", "compression_level": 1, "row_group_size": 128_000, "dictionary": "auto", "statistics": "all"},
+    "zstd-3": {"compression": "zstd", "compression_level": 3, "row_group_size": 128_000, "dictionary": "auto", "statistics": "all"},
+    "zstd-9": {"compression": "zstd", "compression_level": 9, "row_group_size": 256_000, "dictionary": "auto", "statistics": "keys"},
+}
+# bronze : écrit puis relu une fois, silver/gold : relus et gardés, archive : rarement relu
+ZONE_DEFAULT_PROFILES = {"bronze": "snappy", "silver": "zstd-3", "gold": "zstd-3", "archive": "zstd-9", "other": "snappy"}
+# "auto" : colonnes dont les valeurs distinctes (sur les premières lignes) sont moins de la moitié des lignes
+DICTIONARY_MAX_RATIO = 0.5
+DICTIONARY_SAMPLE_ROWS = 100_000
+
+
+def resolve_profile(profile: Union[str, dict]) -> dict:
+    """
+    Complete write profile from a profile name or a dict (missing fields : those of its
+    "base" profile, "snappy" by default), e.g. {"base": "zstd-3", "row_group_size": 500000}.
+    :raises ValueError: If the profile name or one of its fields is unknown.
+    """
+    if isinstance(profile, str):
+        if profile not in WRITE_PROFILES:
+            raise ValueError(f"Unknown write profile {profile}, expected one of {list(WRITE_PROFILES)} or a dict.")
+        return dict(WRITE_PROFILES[profile], name=profile)
+    profile = dict(profile)
+    base = profile.pop("base", "snappy")
+    unknown = set(profile) - set(WRITE_PROFILES["snappy"]) - {"name"}
+    if unknown:
+        raise ValueError(f"Unknown write profile fields {sorted(unknown)}.")
+    return {**resolve_profile(base), "name": f"{base}*", **profile}
+
+
+def load_zone_profiles(fpath: Optional[str] = None, overrides: Optional[Dict[str, Union[str, dict]]] = None) -> Dict[str, dict]:
+    """
+    Write profile of each zone : defaults (ZONE_DEFAULT_PROFILES), then the JSON file `fpath`
+    ({zone: profile name or dict}, as written by the autotuner), then `overrides`.
+    """
+    zones = dict(ZONE_DEFAULT_PROFILES)
+    if fpath:
+        zones.update(load_json(fpath, default_value={}))
+    zones.update({zone: p for zone, p in (overrides or {}).items() if p})
+    return {zone: resolve_profile(p) for zone, p in zones.items()}
+
+
+def dictionary_columns(table: pa.Table, dictionary) -> Union[bool, list]:
+    """`use_dictionary` of the parquet writer for a table and the "dictionary" field of a profile."""
+    if dictionary in ("all", True):
+        return True
+    if dictionary in ("none", False, None):
+        return False
+    if dictionary != "auto":
+        return [c for c in dictionary if c in table.column_names]
+    sample = table.slice(0, DICTIONARY_SAMPLE_ROWS)
+    columns = []
+    for field in sample.schema:
+        typ = field.type
+        if pa.types.is_nested(typ) or pa.types.is_floating(typ) or pa.types.is_null(typ): # mesures : rarement répétées
+            continue
+        if pa.types.is_dictionary(typ) or sample.num_rows == 0 \
+                or pc.count_distinct(sample[field.name]).as_py() <= DICTIONARY_MAX_RATIO * sample.num_rows:
+            columns.append(field.name)
+    return columns
+
+
+def statistics_columns(table: pa.Table, statistics) -> Union[bool, list]:
+    """`write_statistics` of the parquet writer : "keys" keeps the columns of the catalog (LakeCatalog.KEY_COLUMNS)."""
+    if statistics in ("all", True):
+        return True
+    if statistics in ("none", False, None):
+        return False
+    columns = LakeCatalog.KEY_COLUMNS if statistics == "keys" else statistics
+    return [c for c in columns if c in table.column_names]
+
+
+def parquet_write_options(profile: dict, table: pa.Table) -> dict:
+    """Keyword arguments of pq.write_table / pq.ParquetWriter / make_write_options for a profile (row group size excluded)."""
+    return {
+        "compression": profile["compression"],
+        "compression_level": profile["compression_level"],
+        "use_dictionary": dictionary_columns(table, profile["dictionary"]),
+        "write_statistics": statistics_columns(table, profile["statistics"]),
+    }
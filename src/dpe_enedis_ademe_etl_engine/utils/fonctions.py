@@ -66,6 +66,15 @@ def normalize_colnames_list(list_colnames=[]):
         return list(map(lambda c: normalize_name(unidecode(c)).lower(), list_colnames))
     return []
 
+def normalize_adress(adress):
+    """Forme normalisée d'une adresse (sans accents, majuscules, espaces simples), utilisée comme clé de cache."""
+    return re.sub(r'[\s,]+', ' ', unidecode(str(adress))).strip().upper()
+
+def format_code_departement(code_departement):
+    """Code département sur 2 caractères ('1' -> '01', '2a' -> '2A'), comme dans les données sources."""
+    code = str(code_departement).strip()
+    return f"{int(code):02d}" if code.isdigit() else code.upper()
+
 def sort_colnames(df):
     return df[sorted(df.columns)]
 
@@ -3,9 +3,13 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 import json
 import httpx
+import tempfile
 import pytest
 import pandas as pd
 
+# caches locaux (geocodage, miroir ademe) hors du repo : un dossier temporaire par session
+TEST_CACHE_DIR = tempfile.mkdtemp(prefix="dpe_etl_tests_cache_")
+
 def set_config(config_folder, data_folder):
     """util to setup config"""
     dict_config = json.load(open(os.path.join(config_folder, "config.json"), "r"))
@@ -14,6 +18,9 @@ def set_config(config_folder, data_folder):
     dict_config.update({'PATH_DATA_SILVER': os.path.join(data_folder, 'tmp', 'silver')})
     dict_config.update({'PATH_DATA_GOLD': os.path.join(data_folder, 'tmp', 'gold')})
     dict_config.update({'PATH_FILE_INPUT_ENEDIS_CSV': os.path.join(data_folder, 'example_extract_input.csv')})
+    dict_config.update({'PATH_GEOCODE_CACHE': os.path.join(TEST_CACHE_DIR, 'geocode_cache.sqlite')})
+    dict_config.update({'PATH_ADEME_MIRROR_DIR': os.path.join(TEST_CACHE_DIR, 'ademe_mirror')})
+    dict_config.update({'PATH_LAKE_CATALOG': os.path.join(TEST_CACHE_DIR, 'lake_catalog.sqlite')})
 
     for key, value in dict_config.items():
         print(f"{key}={value}")
@@ -0,0 +1,581 @@
+"""
+Local stand-in HTTP servers for the external APIs (offline tests and benchmarks).
+- `FakeEnedisServer`, `FakeBanServer`, `FakeAdemeServer` : records/exports, geocodage/search, lines
+- `FakeS3Server` : in-memory S3 (objects, multipart uploads, ranged GETs, listings) for the MinIO client
+- `StandinDataset` : coherent Enedis/BAN/Ademe seeds built from an extract output
+(tests/data/example_extract_output.parquet), optionally scaled
+- every server has configurable latency (+ jitter), capacity (429 above `max_concurrent`
+requests in flight), rate limit (429 + Retry-After above `rate_limit` req/s) and
+error injection (503 with probability `error_rate`, or `down` for an outage)
+"""
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+import collections
+import email.utils
+import xml.etree.ElementTree as ET
+import pandas as pd
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, urlencode, unquote
+
+
+def ban_feature(addr):
+    """Deterministic geojson feature for an address."""
+    h = int(hashlib.md5(addr.encode("utf-8")).hexdigest()[:8], 16)
+    citycode = "69259"
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [4.8 + (h % 1000) / 10_000, 45.7 + (h % 777) / 10_000]},
+        "properties": {
+            "label": addr,
+            "score": 0.9,
+            "housenumber": str(h % 200),
+            "id": f"{citycode}_{h % 10_000:04d}_{h % 100_000:05d}",
+            "banId": f"ban-{h}",
+            "name": addr,
+            "postcode": "69200",
+            "citycode": citycode,
+            "x": 846125.53,
+            "y": 6513323.38,
+            "city": "Vénissieux",
+            "context": "69, Rhône, Auvergne-Rhône-Alpes",
+            "type": "housenumber",
+            "importance": 0.64,
+            "street": addr,
+            "_type": "address",
+        },
+    }
+
+
+class StandinServer:
+    """
+    Threaded local HTTP server, usable as a context manager.
+    Subclasses implement `handle(path, params)` -> (status, payload dict)
+    or (status, raw bytes or payload, content type[, extra headers dict]).
+    `connections` keeps the client (host, port) seen : one per keep-alive connection.
+    :param latency: Seconds slept before answering each request.
+    :param jitter: Random extra latency, uniform in [0, jitter] seconds.
+    :param max_concurrent: Requests in flight above this capacity are answered with a 429.
+    :param rate_limit: Requests per second above which the server answers 429 with a `Retry-After`.
+    :param error_rate: Probability of answering a 503 (seeded, reproducible).
+    `down` : while True every request is answered with a 503 (outage).
+    `status_counts` : number of answers per status code.
+    """
+    def __init__(self, latency=0.0, max_concurrent=None, jitter=0.0, rate_limit=None, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.max_concurrent = max_concurrent
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.down = False
+        self.in_flight = 0
+        self.n_throttled = 0
+        self.n_requests = 0
+        self.status_counts = collections.Counter()
+        self.connections = set()
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._window = collections.deque() # instants des requetes acceptées de la derniere seconde
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with server._lock:
+                    server.n_requests += 1
+                    server.connections.add(self.client_address)
+                    server.in_flight += 1
+                    throttled = server.max_concurrent is not None and server.in_flight > server.max_concurrent
+                    rate_limited = not throttled and server._over_rate_limit()
+                    server.n_throttled += throttled or rate_limited
+                    failed = server.error_rate > 0 and server._rng.random() < server.error_rate
+                    delay = server.latency + (server._rng.uniform(0, server.jitter) if server.jitter else 0)
+                try:
+                    if delay:
+                        time.sleep(delay)
+                    url = urlparse(self.path)
+                    if server.down or failed:
+                        status, payload, *extra = 503, {"error": "service unavailable"}
+                    elif throttled:
+                        status, payload, *extra = 429, {"error": "too many requests"}
+                    elif rate_limited:
+                        status, payload, *extra = 429, {"error": "rate limit exceeded"}, "application/json", {"Retry-After": "1"}
+                    else:
+                        status, payload, *extra = server.handle(url.path, parse_qs(url.query))
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+                        server.status_counts[status if "status" in locals() else 500] += 1
+                body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", extra[0] if extra else "application/json")
+                for k, v in (extra[1] if len(extra) > 1 else {}).items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.httpd.daemon_threads = True
+
+    def _over_rate_limit(self):
+        """Sliding window of one second, called under the lock."""
+        if self.rate_limit is None:
+            return False
+        now = time.monotonic()
+        while self._window and self._window[0] <= now - 1:
+            self._window.popleft()
+        if len(self._window) >= self.rate_limit:
+            return True
+        self._window.append(now)
+        return False
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def handle(self, path, params):
+        raise NotImplementedError
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeBanServer(StandinServer):
+    """
+    Stand-in for the geoplateforme `geocodage/search` endpoint.
+    :param fail_adresses: Addresses answered with a 503 (until removed from the set).
+    """
+    def __init__(self, latency=0.0, fail_adresses=(), features=None, **kwargs):
+        """
+        :param features: Dict {address: geojson feature} (see `StandinDataset`), the other
+        addresses get a deterministic feature (`ban_feature`).
+        """
+        super().__init__(latency=latency, **kwargs)
+        self.fail_adresses = set(fail_adresses)
+        self.features = dict(features or {})
+
+    def handle(self, path, params):
+        addr = params.get("q", [""])[0]
+        if addr in self.fail_adresses:
+            return 503, {"error": "service unavailable"}
+        if len(addr.strip()) < 3:
+            return 400, {"code": 400, "message": "q must contain between 3 and 200 chars"}
+        if addr.startswith("INCONNUE"):
+            return 200, {"type": "FeatureCollection", "features": []}
+        return 200, {"type": "FeatureCollection", "features": [self.features.get(addr) or ban_feature(addr)]}
+
+    def url_for_adresse(self, addr):
+        return f"{self.url}/geocodage/search?q={addr}&limit=1"
+
+
+def ademe_lines(id_ban, n=2):
+    """Deterministic dpe03existant lines for an id_ban."""
+    return [
+        {
+            "_id": f"{id_ban}-{k}",
+            "identifiant_ban": id_ban,
+            "etiquette_dpe": "ABCDEFG"[(len(id_ban) + k) % 7],
+            "surface_habitable_logement": 40.0 + k,
+            "conso_5_usages_par_m2_ep": 150.0 + k,
+            "conso_5_usages_par_m2_ef": 120.0 + k,
+            "code_postal_ban": "69200",
+        }
+        for k in range(n)
+    ]
+
+
+class FakeAdemeServer(StandinServer):
+    """
+    Stand-in for the data-fair `dpe03existant/lines` endpoint.
+    Supports single id queries (`q`), batched ones (`qs=identifiant_ban:("a" OR "b")`)
+    and department listings (`qs=code_departement_ban:"69" AND date_derniere_modification_dpe:>=...`)
+    paginated with `size`/`after` and a `next` link. `select=a,b` keeps only these fields of each line.
+    :param lines_per_id: Number of lines returned for each id_ban.
+    :param fail_once: id_ban answered with a 503 on their first request.
+    :param department_lines: Lines served by the department listings.
+    :param fail_pages: {after offset: n} department pages answered with a 503 their first n times.
+    :param lines_by_id: Dict {id_ban: [lines]} (see `StandinDataset`), the other id_ban get `lines_per_id` deterministic lines.
+    """
+    def __init__(self, latency=0.0, lines_per_id=2, fail_once=(), department_lines=(), fail_pages=None, lines_by_id=None, **kwargs):
+        super().__init__(latency=latency, **kwargs)
+        self.lines_by_id = dict(lines_by_id or {})
+        self.lines_per_id = lines_per_id
+        self.fail_once = set(fail_once)
+        self.department_lines = list(department_lines)
+        self.fail_pages = dict(fail_pages or {})
+        self.requested_ids = []
+
+    def handle(self, path, params):
+        if "qs" in params:
+            return self.handle_batch(path, params)
+        id_ban = params.get("q", [""])[0]
+        with self._lock:
+            self.requested_ids.append(id_ban)
+            if id_ban in self.fail_once:
+                self.fail_once.discard(id_ban)
+                return 503, {"error": "service unavailable"}
+        results = self.project(self.lines_for(id_ban), params)
+        return 200, {"total": len(results), "results": results}
+
+    @staticmethod
+    def project(lines, params):
+        """data-fair `select` : only the listed fields of each line."""
+        if "select" not in params:
+            return lines
+        fields = params["select"][0].split(",")
+        return [{k: line[k] for k in fields if k in line} for line in lines]
+
+    def lines_for(self, id_ban):
+        if id_ban in self.lines_by_id:
+            return self.lines_by_id[id_ban]
+        return [] if id_ban.startswith("INCONNU") else ademe_lines(id_ban, self.lines_per_id)
+
+    def handle_batch(self, path, params):
+        qs = params["qs"][0]
+        if qs.startswith("code_departement_ban:"):
+            dept = re.findall(r'"([^"]+)"', qs)[0]
+            since = re.findall(r'>=(\S+)', qs)
+            results = [
+                line for line in self.department_lines
+                if line.get("code_departement_ban") == dept
+                and (not since or line.get("date_derniere_modification_dpe", "") >= since[0])
+            ]
+        else:
+            ids = re.findall(r'"([^"]+)"', qs)
+            with self._lock:
+                self.requested_ids.extend(ids)
+            results = [line for _id in ids for line in self.lines_for(_id)]
+        size, after = int(params.get("size", ["12"])[0]), int(params.get("after", ["0"])[0])
+        with self._lock:
+            if qs.startswith("code_departement_ban:") and self.fail_pages.get(after, 0) > 0:
+                self.fail_pages[after] -= 1
+                return 503, {"error": "service unavailable"}
+        page = self.project(results[after:after + size], params)
+        payload = {"total": len(results), "results": page}
+        if after + size < len(results):
+            query = {k: v[0] for k, v in params.items()}
+            query["after"] = after + size
+            payload["next"] = f"{self.url}{path}?{urlencode(query)}"
+        return 200, payload
+
+
+
+class FakeEnedisServer(StandinServer):
+    """
+    Stand-in for the Opendatasoft `consommation-annuelle-residentielle-par-adresse` dataset.
+    Serves `exports/{parquet,csv,jsonl}` and `records` (pages and `group_by` counts)
+    filtered on the `where` clause (annee, code_departement, code_commune, code_iris).
+    :param records: DataFrame of the Enedis records (codes as strings).
+    :param offset_cap: Max offset + limit of the records endpoint (400 beyond).
+    """
+    def __init__(self, records, latency=0.0, offset_cap=10_000, **kwargs):
+        super().__init__(latency=latency, **kwargs)
+        self.records = records
+        self.offset_cap = offset_cap
+
+    def filter_records(self, params):
+        where = params.get("where", [""])[0]
+        df = self.records
+        annee = re.findall(r"annee\s*=\s*date'(\d+)'", where)
+        if annee: df = df[df["annee"].astype(str) == annee[0]]
+        for col in ("code_departement", "code_commune", "code_iris"):
+            value = re.findall(col + r"\s*=\s*'([^']+)'", where)
+            if value: df = df[df[col].astype(str) == value[0]]
+            if re.search(col + r"\s+is\s+null", where): df = df[df[col].isna()]
+        return df
+
+    def handle(self, path, params):
+        df = self.filter_records(params)
+        if path.endswith("/records"):
+            if "group_by" in params:
+                col = params["group_by"][0]
+                counts = df.groupby(col, dropna=False).size()
+                return 200, {"results": [{col: None if pd.isna(k) else k, "n": int(v)} for k, v in counts.items()]}
+            limit, offset = int(params.get("limit", ["10"])[0]), int(params.get("offset", ["0"])[0])
+            if offset + limit > self.offset_cap:
+                return 400, {"error_code": "InvalidRESTParameterError", "message": "offset + limit > cap"}
+            page = df.sort_values("tri_des_adresses").iloc[offset:offset + limit]
+            return 200, {"total_count": len(df), "results": json.loads(page.to_json(orient="records"))}
+        if path.endswith("/exports/parquet"):
+            import io
+            buf = io.BytesIO()
+            df.to_parquet(buf, index=False)
+            return 200, buf.getvalue(), "application/octet-stream"
+        if path.endswith("/exports/csv"):
+            return 200, df.to_csv(sep=";", index=False).encode("utf-8"), "text/csv"
+        if path.endswith("/exports/jsonl"):
+            return 200, df.to_json(orient="records", lines=True).encode("utf-8"), "application/jsonl"
+        return 404, {"error": f"unknown path {path}"}
+
+
+class FakeS3Server:
+    """
+    In-memory S3 stand-in for the MinIO client (no auth check), usable as a context manager.
+    Supports buckets (HEAD/PUT), objects (PUT/GET/HEAD/DELETE, `Range` GETs, server-side copy),
+    multipart uploads (create / upload part / complete / abort), ListObjectsV2 and multi-object delete.
+    `objects` : {(bucket, key): bytes}, `ops` : number of requests per operation
+    (put, copy, create_multipart, upload_part, complete_multipart, get, get_range, head, list, delete).
+    :param latency: Seconds slept before answering each request.
+    """
+    NS = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.buckets = set()
+        self.objects = {}
+        self.mtimes = {}
+        self.uploads = {}
+        self.ops = collections.Counter()
+        self._lock = threading.Lock()
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _body(self):
+                n = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(n) if n else b""
+
+            def _send(self, status, body=b"", headers=None):
+                self.send_response(status)
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                if "Content-Length" not in (headers or {}):
+                    self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def _dispatch(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                url = urlparse(self.path)
+                bucket, _, key = unquote(url.path).lstrip("/").partition("/")
+                params = {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+                status, body, headers = server.handle(self.command, bucket, key, params, self.headers, self._body())
+                self._send(status, body, headers)
+
+            do_GET = do_PUT = do_POST = do_HEAD = do_DELETE = _dispatch
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def endpoint(self):
+        host, port = self.httpd.server_address
+        return f"{host}:{port}"
+
+    def _xml(self, tag, children):
+        root = ET.Element(tag, xmlns=self.NS)
+        def add(parent, items):
+            for k, v in items:
+                el = ET.SubElement(parent, k)
+                if isinstance(v, list):
+                    add(el, v)
+                else:
+                    el.text = str(v)
+        add(root, children)
+        return ET.tostring(root, encoding="utf-8", xml_declaration=True), {"Content-Type": "application/xml"}
+
+    def _error(self, status, code):
+        body, headers = self._xml("Error", [("Code", code), ("Message", code)])
+        return status, body, headers
+
+    def _object_headers(self, bucket, key):
+        data = self.objects[(bucket, key)]
+        return {
+            "ETag": f'"{hashlib.md5(data).hexdigest()}"',
+            "Last-Modified": email.utils.formatdate(self.mtimes[(bucket, key)], usegmt=True),
+            "Content-Type": "application/octet-stream",
+            "Accept-Ranges": "bytes",
+        }
+
+    def handle(self, method, bucket, key, params, headers, body):
+        with self._lock:
+            if not key:
+                return self.handle_bucket(method, bucket, params, body)
+            if bucket not in self.buckets:
+                return self._error(404, "NoSuchBucket")
+            if method == "POST" and "uploads" in params:
+                self.ops["create_multipart"] += 1
+                upload_id = f"upload-{len(self.uploads) + 1}"
+                self.uploads[upload_id] = {}
+                return (200, *self._xml("InitiateMultipartUploadResult", [("Bucket", bucket), ("Key", key), ("UploadId", upload_id)]))
+            if method == "PUT" and "uploadId" in params:
+                self.ops["upload_part"] += 1
+                self.uploads[params["uploadId"]][int(params["partNumber"])] = body
+                return 200, b"", {"ETag": f'"{hashlib.md5(body).hexdigest()}"'}
+            if method == "POST" and "uploadId" in params:
+                self.ops["complete_multipart"] += 1
+                parts = self.uploads.pop(params["uploadId"])
+                self.objects[(bucket, key)] = b"".join(parts[n] for n in sorted(parts))
+                self.mtimes[(bucket, key)] = time.time()
+                etag = self._object_headers(bucket, key)["ETag"]
+                return (200, *self._xml("CompleteMultipartUploadResult", [("Bucket", bucket), ("Key", key), ("ETag", etag)]))
+            if method == "DELETE" and "uploadId" in params:
+                self.uploads.pop(params["uploadId"], None)
+                return 204, b"", {}
+            if method == "PUT" and headers.get("x-amz-copy-source"):
+                self.ops["copy"] += 1
+                src_bucket, _, src_key = unquote(headers["x-amz-copy-source"]).split("?")[0].lstrip("/").partition("/")
+                if (src_bucket, src_key) not in self.objects:
+                    return self._error(404, "NoSuchKey")
+                self.objects[(bucket, key)] = self.objects[(src_bucket, src_key)]
+                self.mtimes[(bucket, key)] = time.time()
+                return (200, *self._xml("CopyObjectResult", [
+                    ("ETag", self._object_headers(bucket, key)["ETag"]),
+                    ("LastModified", time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(self.mtimes[(bucket, key)])))]))
+            if method == "PUT":
+                self.ops["put"] += 1
+                self.objects[(bucket, key)] = body
+                self.mtimes[(bucket, key)] = time.time()
+                return 200, b"", {"ETag": self._object_headers(bucket, key)["ETag"]}
+            if method == "DELETE":
+                self.ops["delete"] += 1
+                self.objects.pop((bucket, key), None)
+                return 204, b"", {}
+            if (bucket, key) not in self.objects:
+                return self._error(404, "NoSuchKey")
+            data = self.objects[(bucket, key)]
+            if method == "HEAD":
+                self.ops["head"] += 1
+                return 200, b"", {**self._object_headers(bucket, key), "Content-Length": str(len(data))}
+            rng = re.match(r"bytes=(\d+)-(\d*)", headers.get("Range") or "")
+            if rng:
+                self.ops["get_range"] += 1
+                start = int(rng.group(1))
+                end = int(rng.group(2)) if rng.group(2) else len(data) - 1
+                return 206, data[start:end + 1], {
+                    **self._object_headers(bucket, key), "Content-Range": f"bytes {start}-{end}/{len(data)}"}
+            self.ops["get"] += 1
+            return 200, data, self._object_headers(bucket, key)
+
+    def handle_bucket(self, method, bucket, params, body):
+        if method == "PUT":
+            self.buckets.add(bucket)
+            return 200, b"", {}
+        if bucket not in self.buckets:
+            return self._error(404, "NoSuchBucket")
+        if method == "HEAD":
+            return 200, b"", {}
+        if method == "POST" and "delete" in params:
+            self.ops["delete"] += 1
+            keys = [el.text for el in ET.fromstring(body).iter() if el.tag.endswith("Key")]
+            for key in keys:
+                self.objects.pop((bucket, key), None)
+            return (200, *self._xml("DeleteResult", [("Deleted", [("Key", k)]) for k in keys]))
+        if method == "GET" and params.get("list-type") == "2":
+            self.ops["list"] += 1
+            prefix = params.get("prefix", "")
+            keys = sorted(k for b, k in self.objects if b == bucket and k.startswith(prefix))
+            contents = [("Contents", [
+                ("Key", k), ("Size", len(self.objects[(bucket, k)])), ("ETag", self._object_headers(bucket, k)["ETag"]),
+                ("LastModified", time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(self.mtimes[(bucket, k)])))
+            ]) for k in keys]
+            return (200, *self._xml("ListBucketResult", [
+                ("Name", bucket), ("Prefix", prefix), ("KeyCount", len(keys)), ("IsTruncated", "false")] + contents))
+        return self._error(400, "NotImplemented")
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class StandinDataset:
+    """
+    Coherent seeds of the three stand-ins, split from an extract output
+    (columns suffixed `_enedis`, `_ban`, `_ademe`, as tests/data/example_extract_output.parquet) :
+    - `enedis` : the Enedis records (codes as strings)
+    - `ban_features` : {full address: geojson feature}
+    - `ademe_lines` : {id_ban: [lines]}
+    `scaled(k)` replicates the addresses k times (new address, id_ban and Ademe _id per copy).
+    """
+    def __init__(self, enedis, ban_features, ademe_lines):
+        self.enedis = enedis
+        self.ban_features = ban_features
+        self.ademe_lines = ademe_lines
+
+    @staticmethod
+    def _records(df):
+        """Json-like records : NaN -> None, numpy scalars -> python."""
+        return json.loads(df.to_json(orient="records", force_ascii=False))
+
+    @classmethod
+    def from_extract_output(cls, fpath):
+        output = pd.read_parquet(fpath)
+        enedis_cols = [c for c in output.columns if c.endswith("_enedis") and c != "full_adress_enedis"]
+        ban_cols = [c for c in output.columns if c.endswith("_ban") and c not in ("full_adress_ban", "thread_name_ban")]
+        ademe_cols = [c for c in output.columns if c.endswith("_ademe")]
+
+        enedis = output[enedis_cols].drop_duplicates().rename(columns=lambda c: c[:-len("_enedis")])
+        enedis = enedis.astype({c: "string" for c in enedis.columns if c.startswith("code_") or c == "annee"})
+        enedis["code_departement"] = enedis["code_departement"].str.zfill(2)
+
+        ban_features = {}
+        for row in cls._records(output[["full_adress_enedis"] + ban_cols].drop_duplicates("full_adress_enedis")):
+            addr = row.pop("full_adress_enedis")
+            properties = {c[:-len("_ban")]: v for c, v in row.items()}
+            lon, lat = properties.pop("lon"), properties.pop("lat")
+            ban_features[addr] = {"type": "Feature", "geometry": {"type": "Point", "coordinates": [lon, lat]}, "properties": properties}
+
+        ademe_lines = {}
+        lines = output[ademe_cols].drop_duplicates("_id_ademe").rename(columns=lambda c: c[:-len("_ademe")])
+        for line in cls._records(lines):
+            ademe_lines.setdefault(line["identifiant_ban"], []).append(line)
+        return cls(enedis.reset_index(drop=True), ban_features, ademe_lines)
+
+    @staticmethod
+    def full_adress(record):
+        """Same concatenation as `DataEnedisAdemeExtractor.add_enedis_columns`."""
+        return f"{record['adresse']} {record['code_commune']} {record['nom_commune']}"
+
+    def scaled(self, k):
+        """Dataset with k copies of every address (copy 0 is the original)."""
+        enedis, features, lines_by_id = [], {}, {}
+        for copy in range(k):
+            prefix = "" if copy == 0 else f"{copy}B " # nouvelle adresse, meme commune
+            records = self.enedis.assign(
+                adresse=prefix + self.enedis["adresse"],
+                tri_des_adresses=self.enedis["tri_des_adresses"] + copy * (int(self.enedis["tri_des_adresses"].max()) + 1)
+            )
+            enedis.append(records)
+            for (_, record), (_, original) in zip(records.iterrows(), self.enedis.iterrows()):
+                feature = self.ban_features.get(self.full_adress(original))
+                if feature is None:
+                    continue
+                id_ban = feature["properties"]["id"] if copy == 0 else f"{feature['properties']['id']}_{copy}"
+                features[self.full_adress(record)] = {
+                    **feature, "properties": {**feature["properties"], "id": id_ban, "label": prefix + feature["properties"]["label"]}
+                }
+                lines_by_id[id_ban] = [
+                    {**line, "identifiant_ban": id_ban, "_id": line["_id"] if copy == 0 else f"{line['_id']}_{copy}"}
+                    for line in self.ademe_lines.get(feature["properties"]["id"], [])
+                ]
+        return StandinDataset(pd.concat(enedis, ignore_index=True), features, lines_by_id)
+
+    def department_lines(self):
+        """Ademe lines for the department listings (mirror engine)."""
+        return [line for lines in self.ademe_lines.values() for line in lines]
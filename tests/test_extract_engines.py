@@ -0,0 +1,914 @@
+import time
+import numpy as np
+from conftest import *
+from standins import FakeBanServer
+
+
+@pytest.fixture(autouse=True)
+def etl_config(test_config_folder, test_data_folder):
+    set_config(test_config_folder, test_data_folder)
+
+
+def test_async_ban_engine_keeps_input_order(extraction_pip, monkeypatch):
+    """Async engine must return one result per address, in input order."""
+    adresses = [f"{i} RUE DE LA PAIX 69259 Vénissieux" for i in range(40)] + ["INCONNUE 00000"]
+    with FakeBanServer(latency=0.01) as server:
+        monkeypatch.setattr(extraction_pip, "get_url_ban_filter_on_adresse", server.url_for_adresse)
+        res = extraction_pip.request_ban_async(adresses)
+    assert len(res) == len(adresses)
+    assert res[-1] is None
+    assert [r["full_adress"] for r in res[:-1]] == adresses[:-1]
+    assert all("lon" in r and "lat" in r for r in res[:-1])
+
+
+def test_async_engine_respects_rate_limit():
+    """Token bucket : N requests at R req/s can't take less than (N-1)/R seconds."""
+    from src.dpe_enedis_ademe_etl_engine.scripts.api_helper import AsyncApiRequester
+
+    async def call(client, obj):
+        return obj
+
+    engine = AsyncApiRequester(rate_limit=50, burst=1)
+    s = time.monotonic()
+    res = engine.run(call, list(range(26)))
+    assert res == list(range(26))
+    assert time.monotonic() - s >= 25 / 50 * 0.95
+
+
+def test_token_bucket_threads_burst_and_metrics():
+    """Threaded bucket : burst served at once, then exactly `rate` req/s (no lock held while sleeping)."""
+    from concurrent.futures import ThreadPoolExecutor
+    from src.dpe_enedis_ademe_etl_engine.scripts.rate_limiter import TokenBucket
+
+    bucket = TokenBucket(rate=40, burst=10)
+    s = time.monotonic()
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        list(executor.map(lambda _: bucket.acquire(), range(50)))
+    elapsed = time.monotonic() - s
+    assert 40 / 40 * 0.95 <= elapsed < 1.5
+    metrics = bucket.metrics.snapshot()
+    assert metrics["acquired"] == 50 and metrics["waited"] == 40
+    assert metrics["max_wait_s"] <= 1.1
+
+
+def test_file_lock_backend_shares_quota_between_processes(tmp_path):
+    """Two processes on one file backend share the quota : 2 x 10 tokens at 20/s take ~1s."""
+    import sys
+    import subprocess
+    code = (
+        "import sys; sys.path.insert(0, 'src/dpe_enedis_ademe_etl_engine/scripts'); "
+        "from rate_limiter import TokenBucket, FileLockBackend; "
+        "bucket = TokenBucket(rate=20, burst=1, backend=FileLockBackend(sys.argv[1])); "
+        "[bucket.acquire() for _ in range(10)]"
+    )
+    fpath = str(tmp_path / "ban.bucket")
+    root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    s = time.monotonic()
+    procs = [subprocess.Popen([sys.executable, "-c", code, fpath], cwd=root_dir) for _ in range(2)]
+    assert all(p.wait(timeout=60) == 0 for p in procs)
+    assert time.monotonic() - s >= 19 / 20 * 0.9
+
+
+def test_redis_backend_shares_quota_and_keeps_debt():
+    """Redis backend (fakeredis stand-in, Lua script) : shared debt, key kept alive while in debt."""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    from src.dpe_enedis_ademe_etl_engine.scripts.rate_limiter import TokenBucket, RedisBackend
+
+    server = fakeredis.FakeServer()
+    workers = [TokenBucket(rate=10, burst=2, backend=RedisBackend(fakeredis.FakeRedis(server=server), "ratelimit:ban")) for _ in range(2)]
+    waits = [workers[k % 2].reserve() for k in range(1000)]
+    assert waits[:2] == [0.0, 0.0]
+    assert 998 / 10 - 5 < waits[-1] <= 998 / 10 # minus the time elapsed between the calls
+    assert fakeredis.FakeRedis(server=server).ttl("ratelimit:ban") >= waits[-1] + 60 - 1
+
+
+def test_async_bucket_does_not_block_loop_on_shared_backend(tmp_path):
+    """File lock held by another process : the reservation runs off the loop, other coroutines keep running."""
+    import asyncio
+    import fcntl
+    from src.dpe_enedis_ademe_etl_engine.scripts.rate_limiter import AsyncTokenBucket, FileLockBackend
+
+    fpath = str(tmp_path / "ademe.bucket")
+    bucket = AsyncTokenBucket(rate=10, backend=FileLockBackend(fpath))
+
+    async def main():
+        fd = os.open(fpath, os.O_RDWR | os.O_CREAT)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        ticks = 0
+        task = asyncio.create_task(bucket.acquire())
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+            ticks += 1
+        os.close(fd)
+        await task
+        return ticks
+
+    assert asyncio.run(main()) == 10
+
+
+def test_http_registry_keep_alive_and_retry_after():
+    """Sync calls of one host share a keep-alive connection, 429 + Retry-After is waited then retried."""
+    from standins import StandinServer
+    from src.dpe_enedis_ademe_etl_engine.scripts.http_client import HttpClientRegistry, RetryPolicy
+
+    class ThrottlingServer(StandinServer):
+        throttled = 0
+        def handle(self, path, params):
+            if path == "/throttled" and self.throttled == 0:
+                self.throttled += 1
+                return 429, {"error": "too many requests"}, "application/json", {"Retry-After": "1"}
+            if path == "/bad":
+                return 400, {"error": "bad request"}
+            return 200, {"ok": True}
+
+    with ThrottlingServer() as server, HttpClientRegistry(retry_policy=RetryPolicy(max_retries=2, backoff=0)) as http:
+        assert all(http.get(f"{server.url}/ok?i={i}").status_code == 200 for i in range(20))
+        assert len(server.connections) == 1
+        s = time.monotonic()
+        assert http.get(f"{server.url}/throttled").status_code == 200
+        assert time.monotonic() - s >= 0.95
+        n = server.n_requests
+        assert http.get(f"{server.url}/bad").status_code == 400 # 4xx definitif : pas de retry
+        assert server.n_requests == n + 1
+
+
+def test_adaptive_concurrency_converges_below_host_capacity():
+    """AIMD : the limit grows while the host is healthy and is cut on 429, every request finally succeeds."""
+    from concurrent.futures import ThreadPoolExecutor
+    from src.dpe_enedis_ademe_etl_engine.scripts.http_client import HttpClientRegistry, RetryPolicy
+    with FakeBanServer(latency=0.02, max_concurrent=6) as server, \
+            HttpClientRegistry(retry_policy=RetryPolicy(max_retries=5, backoff=0.01)) as http:
+        urls = [server.url_for_adresse(f"{i} RUE DU DEBIT 69259") for i in range(400)]
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            statuses = list(pool.map(lambda url: http.get(url).status_code, urls))
+        stats = http.controller(server.url).snapshot()
+    assert statuses == [200] * len(urls)
+    assert 4 < stats["max_reached"] <= 20 and stats["decreases"] > 0 # oscille autour de la capacité (6), loin des 32 threads
+    assert server.n_throttled < 0.1 * len(urls) # 32 threads fixes : ~80% de 429
+
+
+def test_circuit_breaker_opens_during_outage_and_recovers():
+    from src.dpe_enedis_ademe_etl_engine.scripts.concurrency import AdaptiveConcurrencyController, CircuitBreaker, CircuitOpenError
+    from src.dpe_enedis_ademe_etl_engine.scripts.http_client import HttpClientRegistry, RetryPolicy
+    with FakeBanServer() as server, HttpClientRegistry(retry_policy=RetryPolicy(max_retries=0)) as http:
+        controller = AdaptiveConcurrencyController(breaker=CircuitBreaker(failure_threshold=3, recovery_timeout=0.3), max_wait=5)
+        http._controllers[http.host_of(server.url)] = controller
+        url = server.url_for_adresse("1 RUE DE LA PANNE 69259")
+        server.down = True
+        assert [http.get(url).status_code for _ in range(3)] == [503] * 3
+        assert controller.breaker.state == "open"
+        n_requests = server.n_requests
+        t0 = time.perf_counter()
+        assert http.get(url).status_code == 503 # sonde half-open, echoue : circuit rouvert pour 2 x 0.3s
+        assert time.perf_counter() - t0 >= 0.25 and server.n_requests == n_requests + 1
+        server.down = False
+        t0 = time.perf_counter()
+        assert http.get(url).status_code == 200
+        assert time.perf_counter() - t0 >= 0.5 and controller.breaker.state == "closed"
+        controller.max_wait = 0.1
+        server.down = True
+        for _ in range(3):
+            http.get(url)
+        with pytest.raises(CircuitOpenError):
+            http.get(url)
+
+
+def test_geocode_cache_ttl_and_lru(tmp_path):
+    from src.dpe_enedis_ademe_etl_engine.scripts.geocode_cache import GeocodeCache
+    cache = GeocodeCache(str(tmp_path / "geocode.sqlite"), ttl_seconds=3600, max_entries=2)
+    cache.set_many({"1 Rue A 75001 Paris": {"id": "a"}, "2 rue b 75001 paris": None})
+    # clé normalisée : accents, casse et espaces ignorés
+    assert cache.get("1  RUE A 75001 PARIS") == {"id": "a", "full_adress": "1  RUE A 75001 PARIS"}
+    assert cache.get_many(["2 RUE B 75001 PARIS"]) == {"2 RUE B 75001 PARIS": None}
+    assert cache.get_many(["3 RUE C"]) == {}
+    cache.set("3 RUE C", {"id": "c"}) # evicts the least recently used entry
+    assert len(cache) == 2
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+    cache.ttl_seconds = -1
+    assert cache.get_many(["3 RUE C"]) == {}
+
+
+def test_geocode_rerun_only_queries_new_adresses(extraction_pip, monkeypatch, tmp_path):
+    from src.dpe_enedis_ademe_etl_engine.scripts.geocode_cache import GeocodeCache
+    monkeypatch.setattr(extraction_pip, "geocode_cache", GeocodeCache(str(tmp_path / "geocode.sqlite")))
+    adresses = [f"{i} RUE DU CACHE 69259 Vénissieux" for i in range(10)] + ["INCONNUE 1"]
+    with FakeBanServer() as server:
+        monkeypatch.setattr(extraction_pip, "get_url_ban_filter_on_adresse", server.url_for_adresse)
+        first = extraction_pip.geocode_adresses(adresses, n_threads=1)
+        assert server.n_requests == len(adresses)
+        second = extraction_pip.geocode_adresses(adresses + ["99 RUE NOUVELLE"], n_threads=1)
+        assert server.n_requests == len(adresses) + 1
+    assert second[:-1] == first
+
+
+def test_ban_permanent_4xx_not_retried_and_cached(extraction_pip, monkeypatch, tmp_path):
+    """A 400 answer is definitive : one request, treated as not found and cached as such."""
+    from src.dpe_enedis_ademe_etl_engine.scripts.geocode_cache import GeocodeCache
+    monkeypatch.setattr(extraction_pip, "geocode_cache", GeocodeCache(str(tmp_path / "geocode.sqlite")))
+    with FakeBanServer() as server:
+        monkeypatch.setattr(extraction_pip, "get_url_ban_filter_on_adresse", server.url_for_adresse)
+        assert extraction_pip.geocode_adresses(["A", "1 RUE DU TEST"], n_threads=1)[0] is None
+        assert server.n_requests == 2
+        extraction_pip.geocode_adresses(["A"], n_threads=1)
+        assert server.n_requests == 2
+    assert extraction_pip.ban_failed_adresses == set()
+
+
+def test_ban_checkpoint_resumes_only_missing_adresses(extraction_pip, monkeypatch, tmp_path):
+    """A failed geocoding pass is resumed from the batch journal : only the failed addresses are re-sent."""
+    from src.dpe_enedis_ademe_etl_engine.scripts.checkpoint import CheckpointStore
+    from src.dpe_enedis_ademe_etl_engine.scripts.http_client import RetryPolicy
+    monkeypatch.setattr(extraction_pip, "geocode_cache", None)
+    monkeypatch.setattr(extraction_pip, "checkpoints", CheckpointStore(str(tmp_path), "batch-test", flush_every=5))
+    monkeypatch.setattr(extraction_pip.http, "retry_policy", RetryPolicy(max_retries=1, backoff=0))
+    monkeypatch.setattr(extraction_pip.http, "adaptive", False) # pas de circuit breaker sur les 503 simulés
+    adresses = [f"{i} RUE DE LA REPRISE 69259 Vénissieux" for i in range(30)]
+    with FakeBanServer(fail_adresses=adresses[-3:]) as server:
+        monkeypatch.setattr(extraction_pip, "ban_base_url", server.url)
+        first = extraction_pip.geocode_adresses(adresses, n_threads=1)
+        assert first[-3:] == [None] * 3 and extraction_pip.ban_failed_adresses == set(adresses[-3:])
+        server.fail_adresses = set()
+        n_requests = server.n_requests
+        second = extraction_pip.geocode_adresses(adresses, n_threads=1)
+        assert server.n_requests - n_requests == 3
+    assert second[:-3] == first[:-3] and all(r is not None for r in second)
+    assert len(extraction_pip.checkpoints.journal("ban").load()) == 30
+
+
+def test_extract_by_chunks_matches_full_merge(extraction_pip, monkeypatch, tmp_path, test_data_folder):
+    """The streaming mode writes one silver part per chunk, their union is the full in-memory merge."""
+    from standins import FakeBanServer, FakeAdemeServer
+    monkeypatch.setattr(extraction_pip, "geocode_cache", None)
+    monkeypatch.setattr(extraction_pip, "PATH_DATA_SILVER", str(tmp_path / "silver"))
+    monkeypatch.setattr(extraction_pip, "PATH_DATA_BRONZE", str(tmp_path / "bronze"))
+    with FakeBanServer() as ban, FakeAdemeServer() as ademe:
+        monkeypatch.setattr(extraction_pip, "ban_base_url", ban.url)
+        monkeypatch.setattr(extraction_pip, "ademe_base_url", ademe.url)
+        records = pd.read_csv(os.path.join(test_data_folder, "example_extract_input.csv"), dtype=str, index_col=0)
+        records = pd.concat([records.assign(adresse=f"{k} " + records["adresse"]) for k in range(15)], ignore_index=True)
+        # adresses en double : jamais coupées entre deux chunks
+        monkeypatch.setattr(extraction_pip, "input", pd.concat([records, records.head(10)], ignore_index=True))
+        extraction_pip.add_enedis_columns()
+        enedis_data = extraction_pip.input.copy()
+        chunks = list(extraction_pip.iter_enedis_chunks(enedis_data, 7))
+        assert sum(len(c) for c in chunks) == len(enedis_data)
+        assert sum(c['full_adress'].nunique() for c in chunks) == enedis_data['full_adress'].nunique()
+
+        monkeypatch.setattr(extraction_pip, "input", enedis_data.copy())
+        extraction_pip.get_ban_data(1).merge_and_save_enedis_with_ban_as_output().get_ademe_data(1).merge_all_as_output()
+        full = extraction_pip.output
+        monkeypatch.setattr(extraction_pip, "input", enedis_data.copy())
+        extraction_pip.extract_by_chunks(7, 1)
+        output_parts = extraction_pip.output_parts
+        # layout hive : chaque chunk s'ajoute aux partitions du batch dans le dataset extraction
+        monkeypatch.setattr(extraction_pip, "lake_layout", "hive")
+        monkeypatch.setattr(extraction_pip, "input", enedis_data.copy())
+        extraction_pip.extract_by_chunks(7, 1)
+    lake = extraction_pip.load_dataset(str(tmp_path / "silver"), "extraction", filters=[("batch_id", "==", extraction_pip.batch_id)])
+    assert lake.num_rows == len(full) and len(extraction_pip.output_parts) == len(output_parts)
+    assert len(output_parts) > 1
+    chunked = pd.concat([pd.read_parquet(p) for p in output_parts], ignore_index=True)
+    assert set(chunked.columns) == set(full.columns)
+    key = ["_id_ademe", "adresse_enedis"] if "_id_ademe" in full.columns else list(full.columns[:2])
+    assert len(chunked) == len(full)
+    assert sorted(map(tuple, chunked[key].astype(str).values)) == sorted(map(tuple, full[key].astype(str).values))
+
+
+def test_enedis_with_ban_handoff_stays_in_memory_under_budget(extraction_pip, monkeypatch, tmp_path, test_data_folder):
+    """No bronze round-trip under the memory budget without checkpoint, same final merge as the spilled handoff."""
+    from standins import FakeBanServer, FakeAdemeServer
+    monkeypatch.setattr(extraction_pip, "geocode_cache", None)
+    monkeypatch.setattr(extraction_pip, "checkpoints", None)
+    monkeypatch.setattr(extraction_pip, "PATH_DATA_SILVER", str(tmp_path / "silver"))
+    monkeypatch.setattr(extraction_pip, "PATH_DATA_BRONZE", str(tmp_path / "bronze"))
+    with FakeBanServer() as ban, FakeAdemeServer() as ademe:
+        monkeypatch.setattr(extraction_pip, "ban_base_url", ban.url)
+        monkeypatch.setattr(extraction_pip, "ademe_base_url", ademe.url)
+        monkeypatch.setattr(extraction_pip, "input", pd.read_csv(
+            os.path.join(test_data_folder, "example_extract_input.csv"), dtype=str, index_col=0))
+        extraction_pip.add_enedis_columns()
+        enedis_data = extraction_pip.input.copy()
+        outputs = {}
+        for budget_mb in (1024, 0):
+            monkeypatch.setattr(extraction_pip, "handoff_memory_budget_mb", budget_mb)
+            monkeypatch.setattr(extraction_pip, "input", enedis_data.copy())
+            extraction_pip.get_ban_data(1).merge_and_save_enedis_with_ban_as_output()
+            spilled = os.path.exists(tmp_path / "bronze") and len(os.listdir(tmp_path / "bronze")) > 0
+            assert spilled == (budget_mb == 0) == extraction_pip.enedis_with_ban_spilled
+            assert (extraction_pip.enedis_with_ban is None) == spilled
+            extraction_pip.get_ademe_data(1).merge_all_as_output()
+            assert extraction_pip.enedis_with_ban is None
+            outputs[budget_mb] = extraction_pip.output
+    pd.testing.assert_frame_equal(outputs[1024], outputs[0])
+
+
+def test_stage_pipeline_order_backpressure_and_errors():
+    from src.dpe_enedis_ademe_etl_engine.scripts.pipeline import StagePipeline
+    produced = []
+
+    def source(n):
+        for i in range(n):
+            produced.append(i)
+            yield i
+
+    pipeline = StagePipeline([("double", lambda x: 2 * x), ("plus_one", lambda x: x + 1)], queue_size=1)
+    outputs = pipeline.run(source(50))
+    assert next(outputs) == 1
+    time.sleep(0.3)
+    # consommateur arreté : 1 item consommé, 3 queues pleines, 1 item en main par thread (source + 2 etages)
+    assert len(produced) <= 1 + 3 + 3
+    assert list(outputs) == [2 * i + 1 for i in range(1, 50)]
+    assert pipeline.stats["double"]["items"] == 50
+    # un etage qui renvoie None ecarte l'item
+    assert list(StagePipeline([("odd", lambda x: None if x % 2 else x)]).run(range(10))) == [0, 2, 4, 6, 8]
+
+    def boom(x):
+        if x == 3:
+            raise RuntimeError("stage failure")
+        return x
+    with pytest.raises(RuntimeError, match="stage failure"):
+        list(StagePipeline([("boom", boom)]).run(range(10)))
+
+
+def test_pipelined_chunks_overlap_ban_and_ademe(extraction_pip, monkeypatch, tmp_path, test_data_folder):
+    """BAN geocoding of the next chunk overlaps the Ademe fetch of the current one : same parts, less wall time."""
+    from standins import FakeBanServer, FakeAdemeServer
+    monkeypatch.setattr(extraction_pip, "geocode_cache", None)
+    monkeypatch.setattr(extraction_pip, "PATH_DATA_SILVER", str(tmp_path / "silver"))
+    records = pd.read_csv(os.path.join(test_data_folder, "example_extract_input.csv"), dtype=str, index_col=0)
+    monkeypatch.setattr(extraction_pip, "input", pd.concat([records.assign(adresse=f"{k} " + records["adresse"]) for k in range(20)], ignore_index=True))
+    extraction_pip.add_enedis_columns()
+    enedis_data = extraction_pip.input.copy()
+    timings, parts = {}, {}
+    with FakeBanServer(latency=0.1) as ban, FakeAdemeServer(latency=0.15) as ademe:
+        monkeypatch.setattr(extraction_pip, "ban_base_url", ban.url)
+        monkeypatch.setattr(extraction_pip, "ademe_base_url", ademe.url)
+        for pipelined in (False, True):
+            monkeypatch.setattr(extraction_pip, "meta", f"pipelined_{pipelined}")
+            monkeypatch.setattr(extraction_pip, "input", enedis_data.copy())
+            t0 = time.perf_counter()
+            extraction_pip.extract_by_chunks(6, 1, pipelined=pipelined)
+            timings[pipelined] = time.perf_counter() - t0
+            parts[pipelined] = pd.concat([pd.read_parquet(p) for p in extraction_pip.output_parts], ignore_index=True)
+    pd.testing.assert_frame_equal(parts[True].drop(columns="batch_id"), parts[False].drop(columns="batch_id"))
+    assert timings[True] < 0.8 * timings[False], timings
+
+
+def test_async_ademe_fetch_deduplicates_and_retries(extraction_pip, monkeypatch):
+    from standins import FakeAdemeServer
+    ids = ["69259_0120_00013", "69259_0120_00015", "69259_0120_00013", None]
+    with FakeAdemeServer(fail_once={"69259_0120_00015"}) as server:
+        monkeypatch.setattr(extraction_pip, "ademe_base_url", server.url)
+        monkeypatch.setattr(extraction_pip, "id_BAN_list", ids, raising=False)
+        monkeypatch.setattr(extraction_pip, "save_parquet_file", lambda **kwargs: None)
+        extraction_pip.get_ademe_data(1, "async")
+    assert sorted(server.requested_ids) == ["69259_0120_00013", "69259_0120_00015", "69259_0120_00015"]
+    assert len(extraction_pip.ademe_data) == 4
+    assert set(extraction_pip.ademe_data["identifiant_ban_ademe"]) == {"69259_0120_00013", "69259_0120_00015"}
+
+
+def test_batched_ademe_queries(extraction_pip, monkeypatch):
+    from standins import FakeAdemeServer
+    ids = [f"69259_0120_{i:05d}" for i in range(25)] + ["INCONNU_1"]
+    batches = list(extraction_pip.iter_id_ban_batches(ids, batch_size=10))
+    assert [len(b) for b in batches] == [10, 10, 6]
+    # la longueur d'url plafonne aussi la taille des lots
+    assert all(len(b) < 10 for b in extraction_pip.iter_id_ban_batches(ids, batch_size=10, max_url_length=300))
+    with FakeAdemeServer(lines_per_id=3) as server:
+        monkeypatch.setattr(extraction_pip, "ademe_base_url", server.url) # urls construites par le code de prod
+        monkeypatch.setattr(extraction_pip, "ademe_page_size", 7) # force la pagination
+        res = extraction_pip.request_ademe_batched(ids, batch_size=10)
+        n_requests = server.n_requests
+    assert n_requests == 5 + 5 + 3 # 30, 30, 15 lignes par pages de 7
+    assert res[-1] is None
+    assert all(len(r) == 3 and {l["identifiant_ban"] for l in r} == {_id} for r, _id in zip(res[:-1], ids))
+
+
+def test_ademe_department_mirror(tmp_path):
+    from standins import FakeAdemeServer, ademe_lines
+    from src.dpe_enedis_ademe_etl_engine.scripts.ademe_mirror import AdemeDepartmentMirror
+    lines = [
+        {**line, "code_departement_ban": "69", "date_derniere_modification_dpe": "2025-01-01"}
+        for i in range(30) for line in ademe_lines(f"69259_0120_{i:05d}")
+    ]
+    with FakeAdemeServer(department_lines=lines) as server:
+        mirror = AdemeDepartmentMirror(str(tmp_path), base_url=server.url + "/lines", page_size=7, part_rows=20)
+        assert mirror.sync(69) == 60
+        # sync incrementale : seules les lignes modifiées depuis la derniere sync sont telechargées
+        server.department_lines[0] = {**lines[0], "etiquette_dpe": "A", "date_derniere_modification_dpe": "2025-02-01"}
+        server.department_lines.append({**lines[2], "_id": "new", "date_derniere_modification_dpe": "2025-02-01"})
+        assert mirror.sync("69") == 61 # lignes de la date max (>=) re-telechargées, dedup sur _id
+        n_parts = len(list(tmp_path.glob("code_departement=69/part-*.parquet")))
+        assert mirror.sync("69") == 2
+        # rien n'a changé : pas de nouvelle part
+        assert len(list(tmp_path.glob("code_departement=69/part-*.parquet"))) == n_parts
+        n_requests = server.n_requests
+    res = mirror.lookup(69, ["69259_0120_00000", "69259_0120_00001", "absent"])
+    assert n_requests == 9 + 9 + 1
+    assert len(res) == 5
+    assert res.loc[res["_id"] == lines[0]["_id"], "etiquette_dpe"].tolist() == ["A"]
+
+
+def test_ademe_department_mirror_retries_and_resumes(tmp_path):
+    """Transient errors are retried, a sync aborted mid-way resumes from its last saved part."""
+    from standins import FakeAdemeServer, ademe_lines
+    from src.dpe_enedis_ademe_etl_engine.scripts.ademe_mirror import AdemeDepartmentMirror
+    lines = [
+        {**line, "code_departement_ban": "69", "date_derniere_modification_dpe": "2025-01-01"}
+        for i in range(30) for line in ademe_lines(f"69259_0120_{i:05d}")
+    ]
+    with FakeAdemeServer(department_lines=lines, fail_pages={7: 1, 35: 10}) as server:
+        mirror = AdemeDepartmentMirror(str(tmp_path), base_url=server.url + "/lines", page_size=7, part_rows=14, max_retries=2, backoff=0)
+        with pytest.raises(Exception):
+            mirror.sync(69)
+        assert mirror.load_state(69)["resume_url"].endswith("after=28")
+        server.fail_pages = {}
+        n_requests = server.n_requests
+        assert mirror.sync(69) == 60 - 28
+        assert server.n_requests - n_requests == 5
+    assert mirror.load_state(69)["max_modification_date"] == "2025-01-01"
+    assert len(mirror.load_index(69)) == 60
+
+
+def test_golden_projection_of_ademe_and_ban_fields(extraction_pip, monkeypatch, tmp_path, test_schemas_folder):
+    """Only the fields needed by the golden schema, the transformer and the join keys are requested / kept."""
+    from standins import FakeBanServer, FakeAdemeServer, ademe_lines
+    from src.dpe_enedis_ademe_etl_engine.scripts.projection import SourceProjection
+    from src.dpe_enedis_ademe_etl_engine.scripts.ademe_mirror import AdemeDepartmentMirror
+    projection = SourceProjection.from_golden_schema(
+        os.path.join(test_schemas_folder, "schema_golden_data.json"), extra_columns=extraction_pip.merge_dedup_keys)
+    assert {"_id", "identifiant_ban", "etiquette_dpe", "conso_5_usages_par_m2_ef", "code_postal_ban"} <= set(projection.ademe_fields)
+    assert {"id", "label", "city", "lon", "lat", "full_adress"} <= set(projection.ban_properties)
+    assert "context" not in projection.ban_properties
+    monkeypatch.setattr(extraction_pip, "projection", projection)
+    monkeypatch.setattr(extraction_pip, "geocode_cache", None)
+    monkeypatch.setattr(extraction_pip, "checkpoints", None)
+    ids = [f"69259_0120_{i:05d}" for i in range(5)]
+    lines_by_id = {_id: [{**line, "champ_inutile": "x" * 100} for line in ademe_lines(_id)] for _id in ids}
+    with FakeBanServer() as ban, FakeAdemeServer(lines_by_id=lines_by_id) as ademe:
+        monkeypatch.setattr(extraction_pip, "ban_base_url", ban.url)
+        monkeypatch.setattr(extraction_pip, "ademe_base_url", ademe.url)
+        ban_data = extraction_pip.get_ban_dataframe(["1 RUE DE LA PROJECTION 69259 Vénissieux"], 1)
+        for engine in ("batch", "async"):
+            ademe_data = extraction_pip.get_ademe_dataframe(ids, 1, engine)
+            assert len(ademe_data) == 10 and "champ_inutile" not in ademe_data.columns
+            assert {"_id", "identifiant_ban", "etiquette_dpe"} <= set(ademe_data.columns)
+    assert set(ban_data.columns) <= set(projection.ban_properties) and {"id", "label", "city"} <= set(ban_data.columns)
+
+    lines = [{**line, "code_departement_ban": "69", "date_derniere_modification_dpe": "2025-01-01"} for line in lines_by_id[ids[0]]]
+    with FakeAdemeServer(department_lines=lines) as server:
+        mirror = AdemeDepartmentMirror(str(tmp_path), base_url=server.url + "/lines", select=["etiquette_dpe"])
+        assert mirror.sync(69) == 2
+        assert set(mirror.lookup(69, ids).columns) == set(mirror.selected_fields())
+        mirror.select = None # autre selection : le miroir est reconstruit
+        assert mirror.sync(69) == 2
+        assert "champ_inutile" in mirror.lookup(69, ids).columns
+    assert len(list(tmp_path.glob("code_departement=69/part-*.parquet"))) == 1
+
+
+def test_columnar_builder_types_and_sparse_fields(extraction_pip):
+    import pyarrow as pa
+    from src.dpe_enedis_ademe_etl_engine.scripts.decoder import ColumnarBuilder, loads
+    records = loads(b'[{"_id": "a", "surface": "40.5", "n": 1}, {"_id": "b", "n": "2", "late": [1, 2]}, {"_id": "c", "surface": 12}]')
+    builder = ColumnarBuilder(pa.schema([("surface", pa.float64())]), columns=["_id", "surface", "n", "late"])
+    df = builder.extend(records).to_pandas()
+    assert len(builder) == 0 # vidé par to_pandas
+    assert df["surface"].dtype == "float64" and df["surface"].tolist()[::2] == [40.5, 12.0] and pd.isna(df["surface"][1])
+    assert df["n"].tolist()[:2] == ["1", "2"] and pd.isna(df["n"][2]) # types mélangés : texte
+    assert list(df["late"][1]) == [1, 2] and df["late"].isna().tolist() == [True, False, True] # champ apparu tard
+    assert ColumnarBuilder().extend([]).to_pandas().empty
+    # ademe : types du schema golden (entiers json -> float64), champs hors projection ignorés
+    ademe = ColumnarBuilder(extraction_pip.ademe_schema).extend([{"_id": 1, "surface_habitable_logement": 40}]).to_pandas()
+    assert ademe["_id"].tolist() == ["1"] and ademe["surface_habitable_logement"].dtype == "float64"
+
+
+def test_read_enedis_csv_typed_by_blocks_and_filtered(extraction_pip, monkeypatch, tmp_path, test_data_folder, test_schemas_folder):
+    """pyarrow block reader : codes kept as text, schema columns only, other departments dropped while reading."""
+    import io
+    monkeypatch.setenv("SCHEMA_INPUT_DATA_FILEPATH", os.path.join(test_schemas_folder, "schema_input_data.json"))
+    records = pd.read_csv(os.path.join(test_data_folder, "example_extract_input.csv"), dtype=str, index_col=0)
+    other = records.assign(code_iris="2A0040101", code_departement="2A", code_commune="2A004", nom_commune="Ajaccio")
+    records = pd.concat([records, other] * 200, ignore_index=True).rename(columns={"adresse": "Adresse", "code_iris": "Code IRIS"})
+    records["colonne_inconnue"] = "x"
+    fpath = tmp_path / "conso_enedis.csv"
+    records.to_csv(fpath, sep=";")
+    df = extraction_pip.read_enedis_csv(str(fpath), code_departement=6, block_size_mb=0.01)
+    assert len(df) == 600 and df["Code IRIS"].str.startswith("060").all()
+    assert "colonne_inconnue" not in df.columns and "" not in df.columns
+    assert df["nombre_de_logements"].dtype == "int64" and df["consommation_annuelle_totale_de_l_adresse_mwh"].dtype == "float64"
+    # flux binaire (reponse S3), sans filtre
+    assert len(extraction_pip.read_enedis_csv(io.BytesIO(fpath.read_bytes()))) == 1200
+
+    monkeypatch.setattr(extraction_pip, "PATH_FILE_INPUT_ENEDIS_CSV", str(fpath))
+    monkeypatch.setattr(extraction_pip, "input", pd.DataFrame())
+    extraction_pip.load_batch_input(6)
+    extraction_pip.add_enedis_columns()
+    res = extraction_pip.input
+    assert (res["code_departement"] == 6).all()
+    assert (res["full_adress"] == res["adresse"] + " " + res["code_commune"] + " " + res["nom_commune"]).all()
+    assert res["full_adress"].iloc[0] == "13 RUE LACOUR 06029 Cannes"
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "csv", "jsonl"])
+def test_enedis_export_streaming(extraction_pip, monkeypatch, test_data_folder, fmt):
+    from standins import FakeEnedisServer
+    records = pd.read_csv(os.path.join(test_data_folder, "example_extract_input.csv"), dtype=str, index_col=0)
+    with FakeEnedisServer(records) as server:
+        monkeypatch.setattr(extraction_pip, "enedis_base_url", server.url)
+        df = extraction_pip.get_enedis_export(2022, 6, fmt)
+        assert extraction_pip.get_enedis_export(2022, 75, fmt).empty
+    assert len(df) == len(records)
+    assert df["code_iris"].dtype == "string" and df["code_iris"].str.startswith("06").all()
+    assert df["nombre_de_logements"].dtype == "Int64"
+    assert df["consommation_annuelle_totale_de_l_adresse_mwh"].dtype == "float64"
+
+
+def test_enedis_partitioned_records_beyond_offset_cap(extraction_pip, monkeypatch):
+    """A commune above the offset cap is split per iris, every record is fetched once."""
+    from standins import FakeEnedisServer
+    rows = [("06029", f"06029000{k % 3}") for k in range(30)] + [("06029", None)] * 2 \
+        + [("06088", "060880101")] * 7 + [(None, None)] * 3 # clés nulles : partitions "is null"
+    records = pd.DataFrame({
+        "annee": "2022",
+        "code_departement": "06",
+        "code_commune": [c for c, _ in rows],
+        "code_iris": [i for _, i in rows],
+        "adresse": [f"{k} RUE DU TEST" for k in range(len(rows))],
+        "tri_des_adresses": [str(k) for k in range(len(rows))],
+        "nombre_de_logements": "1",
+    })
+    with FakeEnedisServer(records, offset_cap=20) as server:
+        monkeypatch.setattr(extraction_pip, "enedis_base_url", server.url) # urls construites par le code de prod
+        monkeypatch.setattr(extraction_pip, "enedis_offset_cap", 20)
+        monkeypatch.setattr(extraction_pip, "enedis_page_size", 5)
+        monkeypatch.setattr(extraction_pip, "enedis_rate_limit", 1000)
+        partitions = extraction_pip.plan_enedis_partitions(2022, 6)
+        df = extraction_pip.get_enedis_records_partitioned(2022, 6)
+    assert len(partitions) == 6 and sum(n for _, n in partitions) == len(records)
+    assert sorted(df["adresse"]) == sorted(records["adresse"])
+    assert df["nombre_de_logements"].dtype == "Int64"
+
+
+def test_extract_end_to_end_on_seeded_standins(extraction_pip, monkeypatch, test_data_folder, tmp_path):
+    """extract() offline : stand-ins seeded from the example output, with 503 injected on the BAN."""
+    from standins import StandinDataset, FakeEnedisServer, FakeAdemeServer
+    from src.dpe_enedis_ademe_etl_engine.scripts.http_client import HttpClientRegistry, RetryPolicy
+    example = pd.read_parquet(os.path.join(test_data_folder, "example_extract_output.parquet"))
+    dataset = StandinDataset.from_extract_output(os.path.join(test_data_folder, "example_extract_output.parquet")).scaled(5)
+    monkeypatch.setattr(extraction_pip, "geocode_cache", None)
+    monkeypatch.setattr(extraction_pip, "PATH_DATA_SILVER", str(tmp_path / "silver"))
+    monkeypatch.setattr(extraction_pip, "PATH_DATA_BRONZE", str(tmp_path / "bronze"))
+    monkeypatch.setattr(extraction_pip, "http", HttpClientRegistry(retry_policy=RetryPolicy(max_retries=4, backoff=0.01)))
+    with FakeEnedisServer(dataset.enedis, latency=0.01) as enedis, \
+            FakeBanServer(features=dataset.ban_features, error_rate=0.1, seed=1, latency=0.01) as ban, \
+            FakeAdemeServer(lines_by_id=dataset.ademe_lines, latency=0.01) as ademe:
+        for name, server in (("enedis", enedis), ("ban", ban), ("ademe", ademe)):
+            monkeypatch.setattr(extraction_pip, f"{name}_base_url", server.url)
+        extraction_pip.extract(code_departement=69, annee=2023, rows=-1, save_schema=False, ademe_engine="batch", checkpoint=False)
+    output = extraction_pip.output
+    assert ban.status_counts[503] > 0 and ban.status_counts[200] == 10
+    assert len(output) == 5 * len(example)
+    assert set(example["_id_ademe"]) < set(output["_id_ademe"])
+    original = output[output["_id_ademe"].isin(example["_id_ademe"])].set_index("_id_ademe").sort_index()
+    expected = example.set_index("_id_ademe").sort_index()
+    assert (original["full_adress_enedis"] == expected["full_adress_enedis"]).all()
+    assert (original["id_ban"].astype(str) == expected["id_ban"].astype(str)).all()
+
+
+def test_hash_join_matches_pandas_merge_and_dedup():
+    from src.dpe_enedis_ademe_etl_engine.scripts.join_engine import hash_join, drop_duplicates_hashed
+    ademe = pd.DataFrame({
+        "_id_ademe": [f"l{i}" for i in range(8)],
+        "identifiant_ban_ademe": pd.array(["a", "b", "a", "c", "zz", "b", "c", "a"], dtype="string"),
+        "surface_ademe": np.arange(8, dtype=float),
+    })
+    enedis = pd.DataFrame({
+        "id_BAN": pd.array(["a", "b", "b", "c", "a", None], dtype="string"),
+        "full_adress_enedis": ["1 RUE A", "2 RUE B", "2 RUE B", "3 RUE C", "1 BIS RUE A", "4 RUE D"],
+        "conso_enedis": [1.0, 2.0, 2.0, 3.0, 4.0, 5.0],
+    })
+    expected = pd.merge(ademe, enedis, how="left", left_on="identifiant_ban_ademe", right_on="id_BAN")
+    joined = hash_join(ademe, enedis, "identifiant_ban_ademe", "id_BAN", how="left", dedup_subset=None)
+    pd.testing.assert_frame_equal(joined, expected)
+    # dedup sur le hash des clés declarées = drop_duplicates complet (la ligne enedis "2 RUE B" est en double)
+    dedup = hash_join(ademe, enedis, "identifiant_ban_ademe", "id_BAN", dedup_subset=["_id_ademe", "full_adress_enedis"])
+    pd.testing.assert_frame_equal(dedup, expected.drop_duplicates().reset_index(drop=True))
+    assert dedup["id_BAN"].isna().sum() == 1 # "zz" sans correspondance gardé (left join)
+    inner = hash_join(ademe, enedis, "identifiant_ban_ademe", "id_BAN", how="inner")
+    assert len(inner) == len(expected) - 1
+    pd.testing.assert_frame_equal(drop_duplicates_hashed(enedis), enedis.drop_duplicates())
+
+
+def test_s3_parquet_multipart_upload_and_ranged_read(monkeypatch):
+    """Non-LOCAL storage : typed parquet written by multipart parts, read back by parallel ranged GETs."""
+    from standins import FakeS3Server
+    from src.dpe_enedis_ademe_etl_engine.scripts.filestorage_helper import FileStorageConnexion
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "valeur": rng.random(900_000), # incompressible : ~7 MiB de parquet
+        "code_iris": pd.array([f"{i % 1000:09d}" for i in range(900_000)], dtype="string"),
+        "nombre_de_logements": pd.array(np.where(np.arange(900_000) % 7 == 0, None, 3), dtype="Int64"),
+    })
+    with FakeS3Server() as s3:
+        monkeypatch.setenv("ENV", "NOLOCAL")
+        monkeypatch.setenv("S3_ENDPOINT_URL", s3.endpoint)
+        monkeypatch.setenv("BATCH_CORRELATION_ID", "test-s3")
+        monkeypatch.setenv("S3_MULTIPART_PART_SIZE_MB", "5")
+        monkeypatch.setenv("S3_RANGE_GET_SIZE_MB", "1")
+        storage = FileStorageConnexion()
+        storage.save_parquet_file(df, "bronze/", "data.parquet")
+        assert s3.ops["create_multipart"] == 1 and s3.ops["upload_part"] == 2 and s3.ops["put"] == 0
+        assert s3.objects[(storage.BUCKET_NAME, "bronze/data.parquet")][:4] == b"PAR1"
+        entry = storage.catalog.latest("other", "data", "test-s3")
+        assert entry["path"] == "bronze/data.parquet" and entry["n_rows"] == len(df)
+        assert entry["n_bytes"] == len(s3.objects[(storage.BUCKET_NAME, "bronze/data.parquet")])
+        res = storage.load_parquet_file("bronze/", "data.parquet")
+        assert s3.ops["get_range"] >= 7 and s3.ops["get"] == 0
+        pd.testing.assert_frame_equal(res, df)
+        # objets json des versions précédentes toujours relus
+        s3.objects[(storage.BUCKET_NAME, "bronze/old.json")] = df.head(3).to_json(orient="records", lines=True).encode()
+        s3.mtimes[(storage.BUCKET_NAME, "bronze/old.json")] = time.time()
+        assert len(storage.load_parquet_file("bronze/", "old.parquet")) == 3
+        # writer en échec : l'upload est abandonné, aucun objet tronqué
+        monkeypatch.setattr(storage, "s3_parquet_compression", "codec-inconnu")
+        with pytest.raises(Exception, match="Unsupported compression"):
+            storage.save_parquet_file(df, "bronze/", "broken.parquet")
+        assert (storage.BUCKET_NAME, "bronze/broken.parquet") not in s3.objects
+
+
+def test_read_parquet_table_projection_and_filters(extraction_pip, monkeypatch, tmp_path):
+    """Arrow read path : projected columns and filtered rows only, local (memory-mapped) or S3, handoff of the merge."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from standins import FakeS3Server
+    from src.dpe_enedis_ademe_etl_engine.scripts.filestorage_helper import FileStorageConnexion
+    from src.dpe_enedis_ademe_etl_engine.utils.fonctions import get_today_date
+    df = pd.DataFrame({
+        "id_BAN": pd.array([f"69259_{i:05d}" for i in range(5000)], dtype="string"),
+        "conso": np.arange(5000, dtype=float),
+        "adresse": "1 RUE DU TEST",
+    })
+    ids = ["69259_00010", "69259_04999", "inconnu"]
+    pq.write_table(pa.Table.from_pandas(df), tmp_path / "data.parquet", row_group_size=1000)
+    table = extraction_pip.read_parquet_table(str(tmp_path), "data.parquet", columns=["id_BAN", "conso", "absente"], filters=[("id_BAN", "in", ids)])
+    assert table.column_names == ["id_BAN", "conso"] and table["conso"].to_pylist() == [10.0, 4999.0]
+    res = extraction_pip.load_parquet_file(str(tmp_path), "data.parquet", columns=["conso"], dtype_backend="pyarrow")
+    assert isinstance(res["conso"].dtype, pd.ArrowDtype) and len(res) == 5000
+
+    # merge final : seules les lignes enedis+ban des id_ban ademe sont materialisées (memoire ou spill)
+    monkeypatch.setattr(extraction_pip, "enedis_with_ban", pa.Table.from_pandas(df, preserve_index=False))
+    assert extraction_pip.take_enedis_with_ban(ids)["conso"].tolist() == [10.0, 4999.0]
+    monkeypatch.setattr(extraction_pip, "PATH_DATA_BRONZE", str(tmp_path))
+    extraction_pip.save_parquet_file(df, str(tmp_path), f"enedis_with_ban_data_tmp_{get_today_date()}.parquet")
+    monkeypatch.setattr(extraction_pip, "enedis_with_ban", None)
+    assert extraction_pip.take_enedis_with_ban(ids)["id_BAN"].tolist() == ids[:2]
+    assert len(extraction_pip.take_enedis_with_ban()) == 5000
+
+    with FakeS3Server() as s3:
+        monkeypatch.setenv("ENV", "NOLOCAL")
+        monkeypatch.setenv("S3_ENDPOINT_URL", s3.endpoint)
+        monkeypatch.setenv("BATCH_CORRELATION_ID", "test-s3")
+        storage = FileStorageConnexion()
+        storage.save_parquet_file(df, "gold/", "data.parquet")
+        table = storage.read_parquet_table("gold/", "data.parquet", columns=["conso", "absente"], filters=[("id_BAN", "in", ids)])
+        assert table.column_names == ["conso"] and table["conso"].to_pylist() == [10.0, 4999.0]
+        s3.objects[(storage.BUCKET_NAME, "gold/old.json")] = df.to_json(orient="records", lines=True).encode()
+        s3.mtimes[(storage.BUCKET_NAME, "gold/old.json")] = time.time()
+        table = storage.read_parquet_table("gold/", "old.parquet", columns=["id_BAN", "conso"], filters=[("id_BAN", "in", ids)])
+        assert table.column_names == ["id_BAN", "conso"] and table["id_BAN"].to_pylist() == ids[:2]
+
+
+def test_hive_partitioned_datasets_prune_partitions(extraction_pip, transformation_pip, monkeypatch, tmp_path):
+    """Lake layout : annee=/code_departement=/batch_id= partitions, retried batch replaced, reads pruned by filters."""
+    import pyarrow.dataset as ds
+    from standins import FakeS3Server
+    from src.dpe_enedis_ademe_etl_engine.scripts.filestorage_helper import FileStorageConnexion, LAKE_PARTITIONING
+
+    def silver(n, dept, annee):
+        return pd.DataFrame({
+            "_id_ademe": [f"{dept}-{annee}-{i}" for i in range(n)],
+            "annee_enedis": str(annee),
+            "code_departement_enedis": dept,
+            "conso": np.arange(n, dtype=float),
+        })
+
+    def write_batches(storage, root):
+        for batch_id, dept, annee in [("b1", 69, 2022), ("b2", 69, 2023), ("b3", 6, 2023)]:
+            monkeypatch.setattr(storage, "batch_id", batch_id)
+            storage.save_dataset(silver(100, dept, annee), root, "extraction", partition_values={"batch_id": batch_id},
+                                 partition_columns={"annee": "annee_enedis", "code_departement": "code_departement_enedis"})
+        # batch relancé : ses partitions sont remplacées, pas dupliquées
+        storage.save_dataset(silver(50, 6, 2023), root, "extraction", partition_values={"batch_id": "b3"},
+                             partition_columns={"annee": "annee_enedis", "code_departement": "code_departement_enedis"})
+
+    write_batches(extraction_pip, str(tmp_path))
+    assert (tmp_path / "extraction" / "annee=2023" / "code_departement=06" / "batch_id=b3" / "part-b3-0.parquet").exists()
+    dataset = ds.dataset(str(tmp_path / "extraction"), format="parquet", partitioning=ds.partitioning(LAKE_PARTITIONING, flavor="hive"))
+    assert len(list(dataset.get_fragments(filter=ds.field("annee") == 2023))) == 2 # partitions élaguées avant lecture
+    res = extraction_pip.load_dataset(str(tmp_path), "extraction", filters=[("code_departement", "==", "06")])
+    assert res.num_rows == 50 and set(res["batch_id"].to_pylist()) == {"b3"}
+    res = extraction_pip.load_dataset(str(tmp_path), "extraction", columns=["_id_ademe", "annee"], filters=[("annee", "==", 2023), ("conso", "<", 10)])
+    assert res.column_names == ["_id_ademe", "annee"] and res.num_rows == 20
+    with pytest.raises(ValueError):
+        extraction_pip.save_dataset(silver(1, 69, 2023), str(tmp_path), "extraction")
+    # tables gold : partition du batch deduite des lignes silver
+    values = transformation_pip.batch_partition_values()
+    assert (values["annee"], values["code_departement"]) == ("2023", "69")
+
+    with FakeS3Server() as s3:
+        monkeypatch.setenv("ENV", "NOLOCAL")
+        monkeypatch.setenv("S3_ENDPOINT_URL", s3.endpoint)
+        monkeypatch.setenv("BATCH_CORRELATION_ID", "test-s3")
+        storage = FileStorageConnexion()
+        write_batches(storage, "silver/")
+        assert (storage.BUCKET_NAME, "silver/extraction/annee=2022/code_departement=69/batch_id=b1/part-b1-0.parquet") in s3.objects
+        res = storage.load_dataset("silver/", "extraction", filters=[("code_departement", "==", "69")])
+        assert res.num_rows == 200 and sorted(set(res["annee"].to_pylist())) == [2022, 2023]
+        assert storage.load_dataset("silver/", "extraction", filters=[("batch_id", "==", "b3")]).num_rows == 50
+
+
+def test_lake_catalog_lookup_and_statistics_skipping(extraction_pip, monkeypatch, tmp_path):
+    """Every saved file is registered : lookup by (zone, table, batch_id), files skipped on their min/max."""
+    from src.dpe_enedis_ademe_etl_engine.scripts.catalog import LakeCatalog
+    from src.dpe_enedis_ademe_etl_engine.utils.fonctions import get_today_date
+    catalog = LakeCatalog(str(tmp_path / "catalog.sqlite"))
+    monkeypatch.setattr(extraction_pip, "catalog", catalog)
+    monkeypatch.setattr(extraction_pip, "PATH_DATA_GOLD", str(tmp_path / "gold"))
+    for k, dept in enumerate([69, 6, 75]):
+        df = pd.DataFrame({"id_ban": [f"{dept:02d}000_{i:04d}" for i in range(100)], "code_departement_enedis": dept, "conso": np.arange(100.0)})
+        # fichier d'un batch écrit la veille : le nom ne peut pas etre deviné depuis la date du jour
+        extraction_pip.save_parquet_file(df, str(tmp_path / "gold"), f"logements_2024_01_0{k + 1}_batch{k}.parquet")
+    entry = catalog.latest("gold", "logements")
+    assert entry["fname"] == "logements_2024_01_03_batch2.parquet" and entry["n_rows"] == 100
+    assert entry["n_bytes"] == os.path.getsize(tmp_path / "gold" / entry["fname"])
+    assert entry["stats"]["code_departement_enedis"] == [75, 75] and entry["stats"]["id_ban"] == ["75000_0000", "75000_0099"]
+    assert "conso" not in entry["stats"] and len(entry["schema_hash"]) == 16
+
+    monkeypatch.setattr(extraction_pip, "batch_id", "run-minuit")
+    extraction_pip.save_parquet_file(df.head(5), str(tmp_path / "gold"), "logements_2024_01_31_run-minuit.parquet")
+    dir, fname = extraction_pip.locate_file(str(tmp_path / "gold"), f"logements_{get_today_date()}_run-minuit.parquet")
+    assert fname == "logements_2024_01_31_run-minuit.parquet"
+    assert extraction_pip.locate_file(str(tmp_path / "gold"), "villes_2024_01_31_x.parquet") == (str(tmp_path / "gold"), "villes_2024_01_31_x.parquet")
+
+    assert len(catalog.files("gold", "logements", filters=[("code_departement_enedis", "==", 6)])) == 1
+    res = extraction_pip.read_catalog_table("gold", "logements", columns=["id_ban", "conso"], filters=[("code_departement_enedis", "in", [6, 69]), ("conso", "<", 10)])
+    assert res.num_rows == 20 and res.column_names == ["id_ban", "conso"]
+    # datasets : un fichier par partition, remplacés avec leur batch
+    extraction_pip.save_dataset(df, str(tmp_path / "gold"), "logements_lake", partition_values={"annee": 2023, "batch_id": "b1"},
+                                partition_columns={"code_departement": "code_departement_enedis"})
+    extraction_pip.save_dataset(df, str(tmp_path / "gold"), "logements_lake", partition_values={"annee": 2023, "batch_id": "b1"},
+                                partition_columns={"code_departement": "code_departement_enedis"})
+    files = catalog.files("gold", "logements_lake", batch_id="b1")
+    assert len(files) == 1 and files[0]["fname"] == "part-run-minuit-0.parquet" and os.path.exists(files[0]["path"])
+
+
+def test_lake_compaction_retention_and_purge(monkeypatch, tmp_path):
+    """Small files merged per partition and swapped atomically, replaced files kept for the readers until vacuum, retention, purge."""
+    from src.dpe_enedis_ademe_etl_engine.scripts.housekeeping import LakeHousekeeper
+    for zone in ["bronze", "silver", "gold", "archive"]:
+        monkeypatch.setenv(f"PATH_DATA_{zone.upper()}" if zone != "archive" else "PATH_ARCHIVE_DIR", str(tmp_path / zone))
+    monkeypatch.setenv("PATH_LAKE_CATALOG", str(tmp_path / "catalog.sqlite"))
+    monkeypatch.setenv("BATCH_CORRELATION_ID", "test-housekeeping")
+    monkeypatch.setenv("COMPACTION_MIN_AGE_MINUTES", "0")
+    hk = LakeHousekeeper()
+    monkeypatch.setattr(hk, "grace_seconds", 0.5)
+    silver = str(tmp_path / "silver")
+    df = lambda n, dept, start=0: pd.DataFrame({"_id_ademe": [f"{dept}-{i}" for i in range(start, start + n)], "code_departement": dept, "conso": np.arange(n, dtype=float)})
+    # batch en streaming : une part par chunk dans la meme partition
+    for part in range(5):
+        hk.save_dataset(df(100, "69", part * 100), silver, "extraction", partition_values={"annee": 2023, "batch_id": "b1"}, part=part)
+    hk.save_dataset(df(10, "06"), silver, "extraction", partition_values={"annee": 2023, "batch_id": "b1"})
+    for k in range(3):
+        monkeypatch.setattr(hk, "batch_id", f"b{k}")
+        hk.save_parquet_file(df(20, "69", k * 20), str(tmp_path / "gold"), f"logements_2024_01_0{k + 1}_b{k}.parquet")
+    leaf = tmp_path / "silver" / "extraction" / "annee=2023" / "code_departement=69" / "batch_id=b1"
+
+    assert hk.compact("silver", "extraction") == 5 # partition 06 : un seul fichier, laissée telle quelle
+    assert len(hk.catalog.files("silver", "extraction")) == 2 and len(list(leaf.iterdir())) == 6
+    # fichiers remplacés encore sur disque pour les lecteurs en cours : lus une seule fois
+    res = hk.load_dataset(silver, "extraction")
+    assert res.num_rows == 510 and len(set(res["_id_ademe"].to_pylist())) == 510
+    assert hk.compact("gold", "logements") == 3
+    entry = hk.catalog.latest("gold", "logements")
+    assert entry["n_rows"] == 60 and entry["batch_id"] is None and entry["fname"].startswith("logements_")
+    assert hk.read_catalog_table("gold", "logements", batch_id="b1")["_id_ademe"].to_pylist() == [f"69-{i}" for i in range(20, 40)]
+    # ecrit par un autre job entre-temps : pas de double swap
+    assert not hk.catalog.replace_files(hk.catalog.files("gold", "logements") + [{"path": "absent", "dir": "", "fname": "absent"}], [])
+    assert hk.vacuum() == 0
+    time.sleep(0.6)
+    assert hk.vacuum() == 8 and len(list(leaf.iterdir())) == 1
+    assert hk.load_dataset(silver, "extraction", filters=[("code_departement", "==", "69")]).num_rows == 500
+
+    hk.save_parquet_file(df(5, "69"), str(tmp_path / "bronze"), "enedis_with_ban_data_tmp_2024_01_01.parquet")
+    monkeypatch.setattr(hk, "retention_days", {"bronze": 0, "silver": 0, "gold": -1, "archive": 30})
+    assert hk.apply_retention() == {"bronze": 1, "silver": 2, "archive": 0}
+    assert (tmp_path / "archive" / "silver" / "extraction" / "annee=2023" / "code_departement=69" / "batch_id=b1").exists()
+    assert hk.load_dataset(silver, "extraction").num_rows == 0 and len(hk.catalog.files("archive")) == 2
+    time.sleep(0.6)
+    assert hk.vacuum() == 3 and not (tmp_path / "bronze" / "enedis_with_ban_data_tmp_2024_01_01.parquet").exists()
+    assert len(hk.catalog.files("gold", "logements")) == 1 # gold gardé (-1)
+
+    # archive non vide : vidée et recréée
+    hk.purge_archive_dir()
+    assert (tmp_path / "archive").is_dir() and not list((tmp_path / "archive").iterdir())
+    assert hk.catalog.files("archive") == []
+
+
+def test_lake_housekeeping_on_s3(monkeypatch, tmp_path):
+    """Same jobs against S3 : multipart compacted objects, server-side copies to the archive, prefix purge."""
+    from standins import FakeS3Server
+    from src.dpe_enedis_ademe_etl_engine.scripts.housekeeping import LakeHousekeeper
+    df = lambda n, start=0: pd.DataFrame({"_id_ademe": [f"69-{i}" for i in range(start, start + n)], "conso": np.arange(n, dtype=float)})
+    with FakeS3Server() as s3:
+        monkeypatch.setenv("ENV", "NOLOCAL")
+        monkeypatch.setenv("S3_ENDPOINT_URL", s3.endpoint)
+        monkeypatch.setenv("BATCH_CORRELATION_ID", "test-s3")
+        for zone in ["bronze", "silver", "gold"]:
+            monkeypatch.setenv(f"PATH_DATA_{zone.upper()}", f"{zone}/")
+        monkeypatch.setenv("PATH_ARCHIVE_DIR", "archive/")
+        monkeypatch.setenv("PATH_LAKE_CATALOG", str(tmp_path / "catalog.sqlite"))
+        monkeypatch.setenv("COMPACTION_MIN_AGE_MINUTES", "0")
+        monkeypatch.setenv("COMPACTION_GRACE_MINUTES", "0")
+        hk = LakeHousekeeper()
+        for k in range(3):
+            monkeypatch.setattr(hk, "batch_id", f"b{k}")
+            hk.save_parquet_file(df(20, k * 20), "gold/", f"logements_2024_01_0{k + 1}_b{k}.parquet")
+            hk.save_dataset(df(20, k * 20), "silver/", "extraction", partition_values={"annee": 2023, "code_departement": "69", "batch_id": "b1"}, part=k)
+        assert hk.compact("gold", "logements") == 3 and hk.compact("silver", "extraction") == 3
+        assert hk.load_dataset("silver/", "extraction").num_rows == 60
+        assert hk.vacuum() == 6
+        keys = sorted(k for b, k in s3.objects if not k.endswith("/")) # marqueurs de dossier de pyarrow exclus
+        assert len(keys) == 2 and keys[0].startswith("gold/logements_") and "/batch_id=b1/compacted-" in keys[1]
+        assert hk.read_catalog_table("gold", "logements", batch_id="b2").num_rows == 20
+
+        monkeypatch.setattr(hk, "retention_days", {"gold": 0})
+        assert hk.apply_retention() == {"gold": 1} and s3.ops["copy"] == 1
+        hk.vacuum()
+        assert [k for b, k in s3.objects if k.startswith("gold/")] == []
+        hk.purge_archive_dir()
+        assert [k for b, k in s3.objects if k.startswith("archive/")] == [] and hk.catalog.files("archive") == []
+        assert len([k for b, k in s3.objects if not k.endswith("/")]) == 1 # dataset silver intact
+
+
+def test_write_profiles_per_zone(monkeypatch, tmp_path):
+    """Codec and level, row groups, dictionary and statistics columns of the write profile of each zone."""
+    import pyarrow.parquet as pq
+    from src.dpe_enedis_ademe_etl_engine.scripts.filestorage_helper import FileStorageConnexion
+    from src.dpe_enedis_ademe_etl_engine.scripts.write_profiles import resolve_profile
+    for zone in ["bronze", "silver", "gold"]:
+        monkeypatch.setenv(f"PATH_DATA_{zone.upper()}", str(tmp_path / zone))
+    monkeypatch.setenv("PATH_LAKE_CATALOG", str(tmp_path / "catalog.sqlite"))
+    monkeypatch.setenv("BATCH_CORRELATION_ID", "test-profiles")
+    (tmp_path / "profiles.json").write_text(json.dumps({"gold": {"base": "zstd-9", "row_group_size": 1000, "dictionary": ["code_iris"]}}))
+    monkeypatch.setenv("PATH_LAKE_WRITE_PROFILES", str(tmp_path / "profiles.json"))
+    monkeypatch.setenv("LAKE_WRITE_PROFILE_BRONZE", "lz4")
+    storage = FileStorageConnexion()
+    df = pd.DataFrame({
+        "id_ban": [f"69259_{i:05d}" for i in range(3000)],
+        "code_iris": [f"69259{i % 10:04d}" for i in range(3000)],
+        "conso": np.arange(3000, dtype=float),
+    })
+
+    def written(zone):
+        storage.save_parquet_file(df, str(tmp_path / zone), "data.parquet")
+        return pq.ParquetFile(tmp_path / zone / "data.parquet").metadata
+
+    bronze, silver, gold = written("bronze"), written("silver"), written("gold")
+    assert bronze.row_group(0).column(0).compression.startswith("LZ4")
+    assert silver.row_group(0).column(0).compression == "ZSTD" and silver.num_row_groups == 1
+    # "auto" : dictionnaire pour les colonnes répétées seulement
+    assert "RLE_DICTIONARY" in silver.row_group(0).column(1).encodings and "RLE_DICTIONARY" not in silver.row_group(0).column(0).encodings
+    assert gold.num_row_groups == 3 and "RLE_DICTIONARY" not in gold.row_group(0).column(0).encodings
+    # "keys" : statistiques des colonnes du catalogue seulement
+    assert gold.row_group(0).column(0).is_stats_set and not gold.row_group(0).column(2).is_stats_set
+    pd.testing.assert_frame_equal(storage.load_parquet_file(str(tmp_path / "gold"), "data.parquet"), df)
+    with pytest.raises(ValueError, match="Unknown write profile"):
+        resolve_profile("brotli-42")
+
+
+def test_autotune_recommends_a_profile_per_zone(monkeypatch, tmp_path):
+    """Autotune : profiles measured on the last batch of each zone, best weighted score recommended and saved."""
+    from src.dpe_enedis_ademe_etl_engine.scripts.autotune import LakeWriteAutotuner, recommend, ZONE_WEIGHTS
+    from src.dpe_enedis_ademe_etl_engine.scripts.filestorage_helper import FileStorageConnexion
+    measures = {"a": {"write_s": 1.0, "read_s": 1.0, "n_bytes": 10}, "b": {"write_s": 1.2, "read_s": 1.1, "n_bytes": 5}}
+    assert recommend(measures, ZONE_WEIGHTS["bronze"]) == "a" and recommend(measures, ZONE_WEIGHTS["gold"]) == "b"
+
+    for zone in ["bronze", "silver", "gold"]:
+        monkeypatch.setenv(f"PATH_DATA_{zone.upper()}", str(tmp_path / zone))
+    monkeypatch.setenv("PATH_LAKE_CATALOG", str(tmp_path / "catalog.sqlite"))
+    monkeypatch.setenv("BATCH_CORRELATION_ID", "test-autotune")
+    tuner = LakeWriteAutotuner()
+    df = pd.read_parquet(os.path.join(os.path.dirname(__file__), "data", "example_extract_output.parquet"))
+    for batch_id in ["b1", "b2"]:
+        monkeypatch.setattr(tuner, "batch_id", batch_id)
+        tuner.save_parquet_file(df, str(tmp_path / "gold"), f"logements_2024_01_01_{batch_id}.parquet")
+        tuner.save_parquet_file(df.head(10), str(tmp_path / "gold"), f"villes_2024_01_01_{batch_id}.parquet")
+    assert tuner.sample_batch("gold")["villes"].num_rows == 10
+    res = tuner.autotune(["silver", "gold"], profiles=["gzip", "snappy", "zstd-3"], repeats=1)
+    assert list(res) == ["gold"] # pas de batch silver dans le catalogue
+    assert set(res["gold"]["measures"]) == {"gzip", "snappy", "zstd-3"} and res["gold"]["recommended"] in res["gold"]["measures"]
+    assert all(m["n_bytes"] > 0 and m["write_s"] > 0 for m in res["gold"]["measures"].values())
+    tuner.save_recommendations(res, str(tmp_path / "profiles.json"))
+    monkeypatch.setenv("PATH_LAKE_WRITE_PROFILES", str(tmp_path / "profiles.json"))
+    assert FileStorageConnexion().write_profiles["gold"]["name"] == res["gold"]["recommended"]